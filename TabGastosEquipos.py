@@ -1,20 +1,43 @@
 import sqlite3
 from PyQt6.QtWidgets import (
-    QWidget, QVBoxLayout, QHBoxLayout, QLabel, QComboBox, QTableWidget, QTableWidgetItem,
+    QWidget, QVBoxLayout, QHBoxLayout, QLabel, QComboBox, QTableView, QAbstractItemView,
     QLineEdit, QDateEdit, QPushButton, QMessageBox, QHeaderView
 )
 from PyQt6.QtCore import QDate, Qt
+from modelo_tabla import ColumnaTabla, ModeloListadoPaginado, ajustar_totales
+from carga_async import CargadorDatos, IndicadorCarga
+from barra_filtros import ControladorFiltros, rellenar_combo
+from eventos_datos import ALTA, EDICION, MAX_FILAS_POR_AVISO
 from DialogoGastoEquipo import DialogoGastoEquipo
 
+COLUMNAS_GASTOS = [
+    ColumnaTabla("Fecha", "fecha"),
+    ColumnaTabla("Cuenta", "cuenta"),
+    ColumnaTabla("Categoría", "categoria"),
+    ColumnaTabla("Subcategoría", "subcategoria"),
+    ColumnaTabla("Equipo", "equipo"),
+    ColumnaTabla("Descripción", "descripcion"),
+    ColumnaTabla("Monto", "monto", lambda valor, fila: f"RD$ {valor or 0:,.2f}", numerica=True),
+    ColumnaTabla("Comentario", "comentario"),
+]
+
+
 class TabGastosEquipos(QWidget):
     def __init__(self, db_manager, proyecto_id=8, parent=None):
         super().__init__(parent)
         self.db = db_manager
         self.proyecto_id = proyecto_id
+        self.cargador = CargadorDatos(self, nombre="gastos")
+        # Filtros y totales de lo que hay en pantalla (para aplicar cambios de una fila)
+        self._filtros_mostrados = None
+        self._totales = {}
+        self.control_filtros = ControladorFiltros(self._filtros_actuales, self._consultar_gastos, parent=self)
 
         self._build_ui()
         self._cargar_filtros()
         self._cargar_gastos()
+        # Altas/ediciones/bajas hechas aquí o en cualquier otra vista
+        self.destroyed.connect(self.db.cambios.suscribir(self._on_cambio_datos, tablas=("transacciones",)))
 
     def _build_ui(self):
         layout = QVBoxLayout(self)
@@ -55,15 +78,12 @@ class TabGastosEquipos(QWidget):
         layout.addLayout(btn_layout)
 
         # Tabla (sin columna ID)
-        self.tabla = QTableWidget()
-        self.tabla.setColumnCount(8)
-        self.tabla.setHorizontalHeaderLabels([
-            "Fecha", "Cuenta", "Categoría", "Subcategoría", "Equipo",
-            "Descripción", "Monto", "Comentario"
-        ])
-        self.tabla.setEditTriggers(QTableWidget.EditTrigger.NoEditTriggers)
-        self.tabla.setSelectionBehavior(QTableWidget.SelectionBehavior.SelectRows)
-        self.tabla.setSelectionMode(QTableWidget.SelectionMode.SingleSelection)
+        self.modelo = ModeloListadoPaginado(COLUMNAS_GASTOS, parent=self)
+        self.tabla = QTableView()
+        self.tabla.setModel(self.modelo)
+        self.tabla.setEditTriggers(QAbstractItemView.EditTrigger.NoEditTriggers)
+        self.tabla.setSelectionBehavior(QAbstractItemView.SelectionBehavior.SelectRows)
+        self.tabla.setSelectionMode(QAbstractItemView.SelectionMode.SingleSelection)
 
         header = self.tabla.horizontalHeader()
         header.setSectionResizeMode(QHeaderView.ResizeMode.Interactive)
@@ -85,7 +105,18 @@ class TabGastosEquipos(QWidget):
 
         # Resumen abajo
         self.lbl_resumen = QLabel("Total Gastos: RD$ 0.00")
-        layout.addWidget(self.lbl_resumen)
+        resumen_layout = QHBoxLayout()
+        resumen_layout.addWidget(self.lbl_resumen)
+        resumen_layout.addWidget(IndicadorCarga(self.cargador, parent=self))
+        resumen_layout.addStretch(1)
+        layout.addLayout(resumen_layout)
+        self.cargador.cargando.connect(lambda cargando: self.tabla.setEnabled(not cargando))
+
+        # CONEXIONES DE FILTROS (una sola consulta cuando dejan de cambiar)
+        self.categoria_cb.currentIndexChanged.connect(self._on_categoria_change)
+        # (la categoría pasa por _on_categoria_change, que recarga las subcategorías)
+        self.control_filtros.vigilar(self.cuenta_cb, self.subcategoria_cb, self.equipo_cb,
+                                     self.fecha_desde, self.fecha_hasta, self.buscar_edit)
 
         # CONEXIONES DE BOTONES
         self.btn_aniadir.clicked.connect(self._nuevo_gasto)
@@ -113,12 +144,14 @@ class TabGastosEquipos(QWidget):
         for c in cuentas:
             self.cuenta_cb.addItem(c["nombre"], c["id"])
 
+        self.categoria_cb.blockSignals(True)
         self.categoria_cb.clear()
         self.categoria_cb.addItem("Todas", None)
         cats = self.db.obtener_categorias_por_proyecto(self.proyecto_id, tipo="Gasto")
         for c in cats:
             self.categoria_cb.addItem(c["nombre"], c["id"])
         self.categoria_cb.setCurrentIndex(0)  # Selecciona "Todas" al iniciar
+        self.categoria_cb.blockSignals(False)
 
         self._on_categoria_change()
 
@@ -129,24 +162,46 @@ class TabGastosEquipos(QWidget):
             self.equipo_cb.addItem(e["nombre"], e["id"])
 
     def _on_categoria_change(self):
+        self.subcategoria_cb.blockSignals(True)
         self.subcategoria_cb.clear()
         self.subcategoria_cb.addItem("Todas", None)
+        for s in self._subcategorias():
+            self.subcategoria_cb.addItem(s["nombre"], s["id"])
+        self.subcategoria_cb.setCurrentIndex(0)
+        self.subcategoria_cb.blockSignals(False)
+        self.control_filtros.programar()
+
+    def _subcategorias(self):
         cat_id = self.categoria_cb.currentData()
         if cat_id is None:
             # Si "Todas", muestra todas las subcategorías posibles
-            subcats = self.db.fetchall(
+            return self.db.fetchall(
                 "SELECT DISTINCT id, nombre FROM subcategorias WHERE id IN (SELECT subcategoria_id FROM transacciones WHERE proyecto_id = ? AND tipo = 'Gasto') ORDER BY nombre",
                 (self.proyecto_id,)
             )
+        return self.db.obtener_subcategorias_por_categoria(cat_id)
+
+    def _refrescar_combos(self):
+        """
+        Las listas de los filtros solo traen lo ya usado en el proyecto: tras
+        guardar un gasto con otra cuenta, categoría o equipo se vuelven a llenar.
+        """
+        cambio = rellenar_combo(self.cuenta_cb, "Todas", self.db.obtener_cuentas_por_proyecto(self.proyecto_id))
+        if rellenar_combo(self.categoria_cb, "Todas",
+                          self.db.obtener_categorias_por_proyecto(self.proyecto_id, tipo="Gasto")):
+            self._on_categoria_change()
         else:
-            subcats = self.db.obtener_subcategorias_por_categoria(cat_id)
-        for s in subcats:
-            self.subcategoria_cb.addItem(s["nombre"], s["id"])
-        self.subcategoria_cb.setCurrentIndex(0)
-        self._cargar_gastos()
+            cambio |= rellenar_combo(self.subcategoria_cb, "Todas", self._subcategorias())
+        cambio |= rellenar_combo(self.equipo_cb, "Todos", self.db.obtener_equipos_por_proyecto(self.proyecto_id))
+        if cambio:
+            self.control_filtros.programar()
 
     def _cargar_gastos(self):
-        filtros = {
+        """Consulta ya con los filtros actuales (tras guardar o cambiar de proyecto)."""
+        self.control_filtros.refrescar_ahora()
+
+    def _filtros_actuales(self):
+        return {
             "cuenta_id": self.cuenta_cb.currentData(),
             "categoria_id": self.categoria_cb.currentData(),
             "subcategoria_id": self.subcategoria_cb.currentData(),
@@ -155,57 +210,96 @@ class TabGastosEquipos(QWidget):
             "fecha_hasta": self.fecha_hasta.date().toString("yyyy-MM-dd"),
             "texto": self.buscar_edit.text().strip() or None,
         }
-        self._gastos_actuales = self.db.obtener_gastos_equipo(self.proyecto_id, filtros)
-        self.tabla.setRowCount(0)
-        total = 0.0
-        for row in self._gastos_actuales:
-            idx = self.tabla.rowCount()
-            self.tabla.insertRow(idx)
-            self.tabla.setItem(idx, 0, QTableWidgetItem(str(row["fecha"])))
-            self.tabla.setItem(idx, 1, QTableWidgetItem(str(row["cuenta"] or "")))
-            self.tabla.setItem(idx, 2, QTableWidgetItem(str(row["categoria"] or "")))
-            self.tabla.setItem(idx, 3, QTableWidgetItem(str(row["subcategoria"] or "")))
-            self.tabla.setItem(idx, 4, QTableWidgetItem(str(row["equipo"] or "")))
-            self.tabla.setItem(idx, 5, QTableWidgetItem(str(row["descripcion"] or "")))
-            self.tabla.setItem(idx, 6, QTableWidgetItem(f"RD$ {row['monto']:,.2f}"))
-            self.tabla.setItem(idx, 7, QTableWidgetItem(str(row["comentario"] or "")))
-            total += row["monto"] or 0.0
+
+    def _consultar_gastos(self, filtros):
+        proyecto_id = self.proyecto_id
+        limite = self.modelo.tam_pagina
+
+        def consultar():
+            return (self.db.obtener_pagina_gastos_equipo(proyecto_id, filtros, None, limite),
+                    self.db.obtener_totales_gastos_equipo(proyecto_id, filtros))
+
+        self.cargador.solicitar(consultar, lambda resultado: self._mostrar_gastos(proyecto_id, filtros, resultado),
+                                self._error_carga)
+
+    def _mostrar_gastos(self, proyecto_id, filtros, resultado):
+        primera_pagina, totales = resultado
+
+        def cargar_pagina(ultima, limite):
+            despues_de = (ultima['fecha'], ultima['id']) if ultima is not None else None
+            return self.db.obtener_pagina_gastos_equipo(proyecto_id, filtros, despues_de, limite)
+
+        self.modelo.reiniciar(cargar_pagina, primera_pagina)
+        self._filtros_mostrados = filtros
+        self._totales = totales or {}
+        self._mostrar_total()
+
+    def _mostrar_total(self):
+        total = self._totales.get('total') or 0.0
         self.lbl_resumen.setText(f"Total Gastos: RD$ {total:,.2f}")
-        self.tabla.resizeRowsToContents()
+
+    def _on_cambio_datos(self, cambio):
+        """Aviso de db.cambios: aplica solo los cambios que caen en lo que se muestra."""
+        if cambio.operacion in (ALTA, EDICION) and cambio.es_del_proyecto(self.proyecto_id):
+            self._refrescar_combos()
+        filtros = self._filtros_mostrados
+        if filtros is None or not cambio.afecta(self.proyecto_id, filtros["fecha_desde"], filtros["fecha_hasta"]):
+            return
+        if not cambio.claves or len(cambio.claves) > MAX_FILAS_POR_AVISO:
+            self._cargar_gastos()
+            return
+        for clave in cambio.claves:
+            anterior, conocida = self.modelo.fila_por_clave(clave)
+            self._actualizar_fila(clave, anterior, conocida)
+
+    def _actualizar_fila(self, id_gasto, anterior=None, anterior_conocida=True):
+        """
+        Aplica el alta/edición/baja de un gasto a la tabla y al total sin recargar.
+        Si no se sabe cómo estaba (fila aún sin cargar), el total se vuelve a consultar.
+        """
+        if not id_gasto or self._filtros_mostrados is None or self.cargador.ocupado:
+            self._cargar_gastos()
+            return
+        nueva = self.db.obtener_fila_gasto_equipo(self.proyecto_id, id_gasto, self._filtros_mostrados)
+        self.modelo.aplicar_cambio(id_gasto, nueva)
+        if anterior_conocida:
+            self._totales = ajustar_totales(
+                self._totales, lambda fila: {'filas': 1, 'total': fila.get('monto') or 0}, anterior, nueva
+            )
+        else:
+            self._totales = self.db.obtener_totales_gastos_equipo(self.proyecto_id, self._filtros_mostrados) or {}
+        self._mostrar_total()
+
+    def _error_carga(self, mensaje):
+        QMessageBox.warning(self, "Error", f"No se pudieron cargar los gastos:\n{mensaje}")
+
+    def _gasto_seleccionado(self):
+        return self.modelo.fila(self.tabla.currentIndex().row())
 
     def _nuevo_gasto(self):
         dialogo = DialogoGastoEquipo(self.db, self.proyecto_id, self)
-        if dialogo.exec():
-            self._cargar_filtros()
-            self._cargar_gastos()
+        dialogo.exec()  # la tabla se actualiza con el aviso de db.cambios
 
     def _editar_gasto(self):
-        fila = self.tabla.currentRow()
-        if fila < 0 or fila >= len(self._gastos_actuales):
+        gasto = self._gasto_seleccionado()
+        if gasto is None:
             QMessageBox.warning(self, "Edición", "Selecciona un gasto para editar.")
             return
-        gasto = self._gastos_actuales[fila]
         dialogo = DialogoGastoEquipo(self.db, self.proyecto_id, self, gasto=gasto)
-        if dialogo.exec():
-            self._cargar_filtros()
-            self._cargar_gastos()
+        dialogo.exec()
 
     def _eliminar_gasto(self):
-        fila = self.tabla.currentRow()
-        if fila < 0 or fila >= len(self._gastos_actuales):
+        gasto = self._gasto_seleccionado()
+        if gasto is None:
             QMessageBox.warning(self, "Eliminación", "Selecciona un gasto para eliminar.")
             return
-        gasto = self._gastos_actuales[fila]
         reply = QMessageBox.question(
             self, "Eliminar Gasto",
             f"¿Seguro que deseas eliminar el gasto?\n\n{gasto['descripcion']}\nMonto: RD$ {gasto['monto']:,.2f}",
             QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No
         )
         if reply == QMessageBox.StandardButton.Yes:
-            exito = self.db.eliminar_gasto_equipo(gasto['id'])
-            if exito:
-                self._cargar_filtros()
-                self._cargar_gastos()
+            if self.db.eliminar_gasto_equipo(gasto['id']):
                 QMessageBox.information(self, "Eliminado", "Gasto eliminado correctamente.")
             else:
                 QMessageBox.warning(self, "Error", "No se pudo eliminar el gasto.")
\ No newline at end of file
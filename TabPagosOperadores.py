@@ -1,19 +1,42 @@
 from PyQt6.QtWidgets import (
-    QWidget, QVBoxLayout, QHBoxLayout, QLabel, QComboBox, QTableWidget, QTableWidgetItem,
+    QWidget, QVBoxLayout, QHBoxLayout, QLabel, QComboBox, QTableView, QAbstractItemView,
     QLineEdit, QDateEdit, QPushButton, QMessageBox, QHeaderView
 )
 from PyQt6.QtCore import QDate, Qt
+from modelo_tabla import ColumnaTabla, ModeloListadoPaginado, ajustar_totales
+from carga_async import CargadorDatos, IndicadorCarga
+from barra_filtros import ControladorFiltros, rellenar_combo
+from eventos_datos import ALTA, EDICION, MAX_FILAS_POR_AVISO
 from DialogoPagoOperador import DialogoPagoOperador
 
+COLUMNAS_PAGOS = [
+    ColumnaTabla("Fecha", "fecha"),
+    ColumnaTabla("Cuenta", "cuenta"),
+    ColumnaTabla("Operador", "operador"),
+    ColumnaTabla("Equipo", "equipo"),
+    ColumnaTabla("Horas", "horas", lambda valor, fila: f"{float(valor or 0):.2f}", numerica=True),
+    ColumnaTabla("Descripción", "descripcion"),
+    ColumnaTabla("Monto", "monto", lambda valor, fila: f"RD$ {valor or 0:,.2f}", numerica=True),
+    ColumnaTabla("Comentario", "comentario"),
+]
+
+
 class TabPagosOperadores(QWidget):
     def __init__(self, db_manager, proyecto_id=8, parent=None):
         super().__init__(parent)
         self.db = db_manager
         self.proyecto_id = proyecto_id
+        self.cargador = CargadorDatos(self, nombre="pagos")
+        # Filtros y totales de lo que hay en pantalla (para aplicar cambios de una fila)
+        self._filtros_mostrados = None
+        self._totales = {}
+        self.control_filtros = ControladorFiltros(self._filtros_actuales, self._consultar_pagos, parent=self)
 
         self._build_ui()
         self._cargar_filtros()
         self._cargar_pagos()
+        # Altas/ediciones/bajas hechas aquí o en cualquier otra vista
+        self.destroyed.connect(self.db.cambios.suscribir(self._on_cambio_datos, tablas=("transacciones",)))
 
     def _build_ui(self):
         layout = QVBoxLayout(self)
@@ -51,15 +74,12 @@ class TabPagosOperadores(QWidget):
         layout.addLayout(btn_layout)
 
         # Tabla
-        self.tabla = QTableWidget()
-        self.tabla.setColumnCount(8)
-        self.tabla.setHorizontalHeaderLabels([
-            "Fecha", "Cuenta", "Operador", "Equipo", "Horas", "Descripción",
-            "Monto", "Comentario"
-        ])
-        self.tabla.setEditTriggers(QTableWidget.EditTrigger.NoEditTriggers)
-        self.tabla.setSelectionBehavior(QTableWidget.SelectionBehavior.SelectRows)
-        self.tabla.setSelectionMode(QTableWidget.SelectionMode.SingleSelection)
+        self.modelo = ModeloListadoPaginado(COLUMNAS_PAGOS, parent=self)
+        self.tabla = QTableView()
+        self.tabla.setModel(self.modelo)
+        self.tabla.setEditTriggers(QAbstractItemView.EditTrigger.NoEditTriggers)
+        self.tabla.setSelectionBehavior(QAbstractItemView.SelectionBehavior.SelectRows)
+        self.tabla.setSelectionMode(QAbstractItemView.SelectionMode.SingleSelection)
 
         header = self.tabla.horizontalHeader()
         header.setSectionResizeMode(QHeaderView.ResizeMode.Interactive)
@@ -81,7 +101,16 @@ class TabPagosOperadores(QWidget):
 
         # Resumen abajo
         self.lbl_resumen = QLabel("Total Pagado: RD$ 0.00")
-        layout.addWidget(self.lbl_resumen)
+        resumen_layout = QHBoxLayout()
+        resumen_layout.addWidget(self.lbl_resumen)
+        resumen_layout.addWidget(IndicadorCarga(self.cargador, parent=self))
+        resumen_layout.addStretch(1)
+        layout.addLayout(resumen_layout)
+        self.cargador.cargando.connect(lambda cargando: self.tabla.setEnabled(not cargando))
+
+        # CONEXIONES DE FILTROS (una sola consulta cuando dejan de cambiar)
+        self.control_filtros.vigilar(self.cuenta_cb, self.operador_cb, self.equipo_cb,
+                                     self.fecha_desde, self.fecha_hasta, self.buscar_edit)
 
         # CONEXIONES DE BOTONES
         self.btn_aniadir.clicked.connect(self._nuevo_pago)
@@ -121,8 +150,23 @@ class TabPagosOperadores(QWidget):
         for e in equipos:
             self.equipo_cb.addItem(e["nombre"], e["id"])
 
+    def _refrescar_combos(self):
+        """
+        Las listas de los filtros solo traen lo ya usado en el proyecto: tras
+        guardar un pago con otra cuenta, operador o equipo se vuelven a llenar.
+        """
+        cambio = rellenar_combo(self.cuenta_cb, "Todas", self.db.obtener_cuentas_por_proyecto(self.proyecto_id))
+        cambio |= rellenar_combo(self.operador_cb, "Todos", self.db.obtener_operadores_por_proyecto(self.proyecto_id))
+        cambio |= rellenar_combo(self.equipo_cb, "Todos", self.db.obtener_equipos_por_proyecto(self.proyecto_id))
+        if cambio:
+            self.control_filtros.programar()
+
     def _cargar_pagos(self):
-        filtros = {
+        """Consulta ya con los filtros actuales (tras guardar o cambiar de proyecto)."""
+        self.control_filtros.refrescar_ahora()
+
+    def _filtros_actuales(self):
+        return {
             "cuenta_id": self.cuenta_cb.currentData(),
             "operador_id": self.operador_cb.currentData(),
             "equipo_id": self.equipo_cb.currentData(),
@@ -130,62 +174,96 @@ class TabPagosOperadores(QWidget):
             "fecha_hasta": self.fecha_hasta.date().toString("yyyy-MM-dd"),
             "texto": self.buscar_edit.text().strip() or None,
         }
-        self._pagos_actuales = self.db.obtener_pagos_a_operadores(self.proyecto_id, filtros)
-        self.tabla.setRowCount(0)
-        total = 0.0
-        for row in self._pagos_actuales:
-            idx = self.tabla.rowCount()
-            self.tabla.insertRow(idx)
-            self.tabla.setItem(idx, 0, QTableWidgetItem(str(row["fecha"])))
-            self.tabla.setItem(idx, 1, QTableWidgetItem(str(row["cuenta"] or "")))
-            self.tabla.setItem(idx, 2, QTableWidgetItem(str(row["operador"] or "")))
-            self.tabla.setItem(idx, 3, QTableWidgetItem(str(row["equipo"] or "")))
-            # CORRECCIÓN: si 'horas' es None o no numérico, muestra 0.00
-            horas_valor = row.get("horas")
-            try:
-                horas_float = float(horas_valor) if horas_valor is not None else 0.0
-            except Exception:
-                horas_float = 0.0
-            self.tabla.setItem(idx, 4, QTableWidgetItem(f"{horas_float:.2f}"))
-            self.tabla.setItem(idx, 5, QTableWidgetItem(str(row["descripcion"] or "")))
-            self.tabla.setItem(idx, 6, QTableWidgetItem(f"RD$ {row['monto']:,.2f}"))
-            self.tabla.setItem(idx, 7, QTableWidgetItem(str(row["comentario"] or "")))
-            total += row["monto"] or 0.0
+
+    def _consultar_pagos(self, filtros):
+        proyecto_id = self.proyecto_id
+        limite = self.modelo.tam_pagina
+
+        def consultar():
+            return (self.db.obtener_pagina_pagos_a_operadores(proyecto_id, filtros, None, limite),
+                    self.db.obtener_totales_pagos_a_operadores(proyecto_id, filtros))
+
+        self.cargador.solicitar(consultar, lambda resultado: self._mostrar_pagos(proyecto_id, filtros, resultado),
+                                self._error_carga)
+
+    def _mostrar_pagos(self, proyecto_id, filtros, resultado):
+        primera_pagina, totales = resultado
+
+        def cargar_pagina(ultima, limite):
+            despues_de = (ultima['fecha'], ultima['id']) if ultima is not None else None
+            return self.db.obtener_pagina_pagos_a_operadores(proyecto_id, filtros, despues_de, limite)
+
+        self.modelo.reiniciar(cargar_pagina, primera_pagina)
+        self._filtros_mostrados = filtros
+        self._totales = totales or {}
+        self._mostrar_total()
+
+    def _mostrar_total(self):
+        total = self._totales.get('total') or 0.0
         self.lbl_resumen.setText(f"Total Pagado: RD$ {total:,.2f}")
-        self.tabla.resizeRowsToContents()
+
+    def _on_cambio_datos(self, cambio):
+        """Aviso de db.cambios: aplica solo los cambios que caen en lo que se muestra."""
+        if cambio.operacion in (ALTA, EDICION) and cambio.es_del_proyecto(self.proyecto_id):
+            self._refrescar_combos()
+        filtros = self._filtros_mostrados
+        if filtros is None or not cambio.afecta(self.proyecto_id, filtros["fecha_desde"], filtros["fecha_hasta"]):
+            return
+        if not cambio.claves or len(cambio.claves) > MAX_FILAS_POR_AVISO:
+            self._cargar_pagos()
+            return
+        for clave in cambio.claves:
+            anterior, conocida = self.modelo.fila_por_clave(clave)
+            self._actualizar_fila(clave, anterior, conocida)
+
+    def _actualizar_fila(self, id_pago, anterior=None, anterior_conocida=True):
+        """
+        Aplica el alta/edición/baja de un pago a la tabla y al total sin recargar.
+        Si no se sabe cómo estaba (fila aún sin cargar), el total se vuelve a consultar.
+        """
+        if not id_pago or self._filtros_mostrados is None or self.cargador.ocupado:
+            self._cargar_pagos()
+            return
+        nueva = self.db.obtener_fila_pago_a_operador(self.proyecto_id, id_pago, self._filtros_mostrados)
+        self.modelo.aplicar_cambio(id_pago, nueva)
+        if anterior_conocida:
+            self._totales = ajustar_totales(
+                self._totales, lambda fila: {'filas': 1, 'total': fila.get('monto') or 0}, anterior, nueva
+            )
+        else:
+            self._totales = self.db.obtener_totales_pagos_a_operadores(self.proyecto_id, self._filtros_mostrados) or {}
+        self._mostrar_total()
+
+    def _error_carga(self, mensaje):
+        QMessageBox.warning(self, "Error", f"No se pudieron cargar los pagos:\n{mensaje}")
+
+    def _pago_seleccionado(self):
+        return self.modelo.fila(self.tabla.currentIndex().row())
+
     def _nuevo_pago(self):
         dialogo = DialogoPagoOperador(self.db, self.proyecto_id, self)
-        if dialogo.exec():
-            self._cargar_filtros()
-            self._cargar_pagos()
+        dialogo.exec()  # la tabla se actualiza con el aviso de db.cambios
 
     def _editar_pago(self):
-        fila = self.tabla.currentRow()
-        if fila < 0 or fila >= len(self._pagos_actuales):
+        pago = self._pago_seleccionado()
+        if pago is None:
             QMessageBox.warning(self, "Edición", "Selecciona un pago para editar.")
             return
-        pago = self._pagos_actuales[fila]
         dialogo = DialogoPagoOperador(self.db, self.proyecto_id, self, pago=pago)
-        if dialogo.exec():
-            self._cargar_filtros()
-            self._cargar_pagos()
+        dialogo.exec()
 
     def _eliminar_pago(self):
-        fila = self.tabla.currentRow()
-        if fila < 0 or fila >= len(self._pagos_actuales):
+        pago = self._pago_seleccionado()
+        if pago is None:
             QMessageBox.warning(self, "Eliminación", "Selecciona un pago para eliminar.")
             return
-        pago = self._pagos_actuales[fila]
         reply = QMessageBox.question(
             self, "Eliminar Pago",
             f"¿Seguro que deseas eliminar el pago?\n\n{pago['descripcion']}\nMonto: RD$ {pago['monto']:,.2f}",
             QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No
         )
         if reply == QMessageBox.StandardButton.Yes:
-            exito = self.db.eliminar_pago_operador(pago['id'])
-            if exito:
-                self._cargar_filtros()
-                self._cargar_pagos()
+            if self.db.eliminar_pago_operador(pago['id']):
                 QMessageBox.information(self, "Eliminado", "Pago eliminado correctamente.")
             else:
                 QMessageBox.warning(self, "Error", "No se pudo eliminar el pago.")
\ No newline at end of file
@@ -1,10 +1,12 @@
 from PyQt6.QtWidgets import (
-    QApplication, QMainWindow, QTabWidget, QFileDialog, QMessageBox, QMenuBar, QMenu
+    QApplication, QMainWindow, QTabWidget, QFileDialog, QMessageBox, QMenuBar, QMenu, QWidget, QVBoxLayout
 )
 from PyQt6.QtGui import QAction
-from PyQt6.QtCore import QTimer
+from PyQt6.QtCore import QTimer, Qt
 import shutil
+import logging
 from datetime import datetime
+from perfil_arranque import medir_arranque
 from dashboard_tab import DashboardTab
 from registro_alquileres_tab import RegistroAlquileresTab
 from ventana_gestion_entidad import VentanaGestionEntidad
@@ -17,27 +19,51 @@ from estado_cuenta_dialog import EstadoCuentaDialog
 import sys
 from logic import DatabaseManager
 from config_manager import cargar_configuracion, guardar_configuracion
-from reportes_tab import ReportesTab
 import config_manager
 from filtros_modal import FiltrosReporteDialog
 from DialogoPagoOperador import DialogoPagoOperador
 from estado_cuenta_dialog import EstadoCuentaDialog
 from PyQt6.QtWidgets import QMessageBox
-from report_generator import ReportGenerator
 from PyQt6.QtWidgets import QFileDialog, QMessageBox
-from report_generator import ReportGenerator
 from estado_cuenta_dialog import EstadoCuentaDialog
 import unicodedata
 from datetime import datetime
 from utils_nombre import generar_nombre_archivo
 from PyQt6.QtWidgets import QMessageBox
 from dialogo_reporte_detallado import DialogoReporteDetallado
-from reporte_detallado_pdf import ReporteDetalladoPDF
 import os
 from dialogo_reporte_operadores import DialogoReporteOperadores
-from reporte_operadores import ReporteOperadores
 from TabGastosEquipos import TabGastosEquipos
 from TabPagosOperadores import TabPagosOperadores
+from trabajos_reportes import ServicioReportes, PanelReportes, TERMINADO
+from cache_reportes import CacheReportes
+# report_generator, reporte_detallado_pdf y reporte_operadores (pandas, fpdf,
+# reportlab, openpyxl) se importan al generar el primer reporte, no al arrancar.
+
+logger = logging.getLogger(__name__)
+
+
+class PestanaDiferida(QWidget):
+    """
+    Contenedor de una pestaña que se construye (y carga sus datos) la primera
+    vez que se activa. 'crear()' devuelve el widget real; 'atributo' es el
+    nombre con el que AppGUI lo expone (self.registro_tab, ...).
+    """
+
+    def __init__(self, atributo, crear, parent=None):
+        super().__init__(parent)
+        self.atributo = atributo
+        self._crear = crear
+        self.widget = None
+        layout = QVBoxLayout(self)
+        layout.setContentsMargins(0, 0, 0, 0)
+
+    def construir(self):
+        if self.widget is None:
+            self.widget = self._crear()
+            self.layout().addWidget(self.widget)
+        return self.widget
+
 
 class AppGUI(QMainWindow):
     def __init__(self, db_manager, config):
@@ -45,8 +71,13 @@ class AppGUI(QMainWindow):
         self.db = db_manager
         self.config = config
         print(f"[DEBUG] AppGUI recibe config: {self.config}")
-        self.report_generator = ReportGenerator()
         self.proyecto_actual = None
+        # Con 'pestanas_diferidas' (por defecto) cada pestaña se construye al activarla
+        self.pestanas_diferidas = bool((config or {}).get("pestanas_diferidas", True))
+        self.registro_tab = None
+        self.gastos_equipos_tab = None
+        self.pagos_operadores_tab = None
+        self.dashboard_tab = None
 
         # Inicialización de atributos
         self.clientes_mapa = {}
@@ -61,36 +92,74 @@ class AppGUI(QMainWindow):
         self.resize(1366, 768)
         self.restart_required = False
 
-        # 1. Crear los tabs primero
-        self._create_tabs()
+        # Los reportes se generan en segundo plano y se siguen en este panel
+        self.servicio_reportes = ServicioReportes(self)
+        self.servicio_reportes.trabajo_agregado.connect(
+            lambda trabajo: trabajo.cambiado.connect(self._on_reporte_cambiado)
+        )
+        self.panel_reportes = PanelReportes(self.servicio_reportes, self)
+        self.addDockWidget(Qt.DockWidgetArea.BottomDockWidgetArea, self.panel_reportes)
+        self.panel_reportes.hide()
+        # Reportes ya generados con los mismos filtros y sin cambios en los datos
+        self.cache_reportes = CacheReportes()
+
+        # 1. Crear los tabs primero (vacíos si son diferidos)
+        with medir_arranque("pestañas"):
+            self._create_tabs()
 
-        # 2. Crear el menú (usa self.reportes_tab)
-        self._create_menu_bar()
+        # 2. Crear el menú
+        with medir_arranque("menú"):
+            self._create_menu_bar()
 
         # 3. Cargar configuración
         self.config = config_manager.cargar_configuracion()
 
-        # 4. Cargar proyecto inicial al arranque
-        self.cargar_proyecto_inicial()
-        QTimer.singleShot(100, self.cargar_proyecto_inicial)
+        # 4. Cargar proyecto inicial cuando la ventana ya se mostró
+        QTimer.singleShot(0, self._cargar_proyecto_arranque)
+
+    def _cargar_proyecto_arranque(self):
+        with medir_arranque("proyecto inicial"):
+            self.cargar_proyecto_inicial()
 
     def _create_tabs(self):
         self.tabs = QTabWidget()
         self.setCentralWidget(self.tabs)
 
-        self.registro_tab = RegistroAlquileresTab(self.db, self.proyecto_actual, config=self.config)
-        self.tabs.addTab(self.registro_tab, "Registro de Alquileres")
-
-        self.gastos_equipos_tab = TabGastosEquipos(self.db, proyecto_id=8)
-        self.tabs.addTab(self.gastos_equipos_tab, "Gastos Equipos")
-
-        self.pagos_operadores_tab = TabPagosOperadores(self.db, proyecto_id=8)
-        self.tabs.addTab(self.pagos_operadores_tab, "Pagos a Operadores")
-
-        self.dashboard_tab = DashboardTab(self.db, self.proyecto_actual)
-        self.tabs.addTab(self.dashboard_tab, "Dashboard")
+        self._agregar_pestana("registro_tab", "Registro de Alquileres",
+                              lambda: RegistroAlquileresTab(self.db, self.proyecto_actual, config=self.config))
+        self._agregar_pestana("gastos_equipos_tab", "Gastos Equipos",
+                              lambda: TabGastosEquipos(self.db, proyecto_id=self._proyecto_id_pestanas()))
+        self._agregar_pestana("pagos_operadores_tab", "Pagos a Operadores",
+                              lambda: TabPagosOperadores(self.db, proyecto_id=self._proyecto_id_pestanas()))
+        self._agregar_pestana("dashboard_tab", "Dashboard", self._crear_dashboard_tab)
 
+        self.tabs.currentChanged.connect(self._on_pestana_activada)
         self.tabs.setCurrentIndex(0)
+        self._on_pestana_activada(0)
+
+    def _agregar_pestana(self, atributo, titulo, crear):
+        contenedor = PestanaDiferida(atributo, crear)
+        self.tabs.addTab(contenedor, titulo)
+        if not self.pestanas_diferidas:
+            self._construir_pestana(contenedor, titulo)
+
+    def _on_pestana_activada(self, indice):
+        contenedor = self.tabs.widget(indice)
+        if isinstance(contenedor, PestanaDiferida) and contenedor.widget is None:
+            self._construir_pestana(contenedor, self.tabs.tabText(indice))
+
+    def _construir_pestana(self, contenedor, titulo):
+        with medir_arranque(f"pestaña '{titulo}'"):
+            setattr(self, contenedor.atributo, contenedor.construir())
+
+    def _proyecto_id_pestanas(self):
+        return self.proyecto_actual['id'] if self.proyecto_actual else 8
+
+    def _crear_dashboard_tab(self):
+        tab = DashboardTab(self.db, self.proyecto_actual)
+        if self.proyecto_actual:
+            tab.configurar_filtros()
+        return tab
         
     def _create_menu_bar(self):
         menubar = self.menuBar()
@@ -120,6 +189,14 @@ class AppGUI(QMainWindow):
             "Estado de Cuenta General (PDF)",
             self.generar_estado_cuenta_general_pdf
         )
+        reportes_menu.addAction(
+            "Estados de Cuenta por Cliente (Lote)...",
+            self.generar_estados_cuenta_lote
+        )
+        reportes_menu.addSeparator()
+        accion_panel = self.panel_reportes.toggleViewAction()
+        accion_panel.setText("Reportes en curso")
+        reportes_menu.addAction(accion_panel)
 
         gestion_menu = menubar.addMenu("Gestión")
         gestion_menu.addAction("Clientes", lambda: self._abrir_ventana_gestion("Cliente"))
@@ -140,7 +217,7 @@ class AppGUI(QMainWindow):
             self.config['database_path'] = archivo
             guardar_configuracion(self.config)
             QMessageBox.information(self, "Configuración", f"¡Ruta guardada!\n{archivo}")
-            self.db_manager = DatabaseManager(archivo)
+            self.db_manager = DatabaseManager(archivo, usar_pool=bool(self.config.get("usar_pool_conexiones", False)))
             # Opcional: refrescar las vistas/tabs
 
     def seleccionar_carpeta_conduces(self):
@@ -162,19 +239,21 @@ class AppGUI(QMainWindow):
         proyecto_target = next((p for p in proyectos if p['nombre'] == "EQUIPOS PESADOS ZOEC"), None)
         if proyecto_target:
             self.proyecto_actual = proyecto_target
-            # Actualiza los tabs que dependen del proyecto
-            self.dashboard_tab.proyecto_actual = self.proyecto_actual
-            self.registro_tab.proyecto_actual = self.proyecto_actual
-            self.dashboard_tab.configurar_filtros()
-            self.registro_tab.poblar_filtros()
-            self.registro_tab.refrescar_tabla()
+            # Actualiza los tabs ya construidos; los diferidos tomarán el proyecto al crearse
+            if self.dashboard_tab is not None:
+                self.dashboard_tab.proyecto_actual = self.proyecto_actual
+                self.dashboard_tab.configurar_filtros()
+            if self.registro_tab is not None:
+                self.registro_tab.proyecto_actual = self.proyecto_actual
+                self.registro_tab.poblar_filtros()
+                self.registro_tab.refrescar_tabla()
             self.setWindowTitle(f"Gestor de Alquileres - {self.proyecto_actual['nombre']}")
             # --- INTEGRACIÓN DEL NUEVO TAB DE GASTOS (si existe) ---
-            if hasattr(self, "gastos_equipos_tab"):
+            if self.gastos_equipos_tab is not None:
                 self.gastos_equipos_tab.proyecto_id = self.proyecto_actual['id']
                 self.gastos_equipos_tab._cargar_filtros()
                 self.gastos_equipos_tab._cargar_gastos()
-            if hasattr(self, "pagos_operadores_tab"):
+            if self.pagos_operadores_tab is not None:
                 self.pagos_operadores_tab.proyecto_id = self.proyecto_actual['id']
                 self.pagos_operadores_tab._cargar_filtros()
                 self.pagos_operadores_tab._cargar_pagos()
@@ -183,10 +262,12 @@ class AppGUI(QMainWindow):
 
     def cargar_proyecto(self, proyecto_id):
         self.proyecto_actual = self.db.obtener_proyecto_por_id(proyecto_id)
-        self.dashboard_tab.proyecto_actual = self.proyecto_actual
-        self.dashboard_tab.configurar_filtros()
-        self.registro_tab.proyecto_actual = self.proyecto_actual
-        self.registro_tab.refrescar_tabla()
+        if self.dashboard_tab is not None:
+            self.dashboard_tab.proyecto_actual = self.proyecto_actual
+            self.dashboard_tab.configurar_filtros()
+        if self.registro_tab is not None:
+            self.registro_tab.proyecto_actual = self.proyecto_actual
+            self.registro_tab.refrescar_tabla()
         self.setWindowTitle(f"Gestor de Alquileres - {self.proyecto_actual['nombre']}")
 
     # Métodos de backup/restauración
@@ -227,13 +308,14 @@ class AppGUI(QMainWindow):
             QMessageBox.information(self, "Base de Datos", f"Seleccionada: {db_path}")
 
             # 1. Inicializa el nuevo gestor de base de datos
-            self.db = DatabaseManager(db_path)
+            self.db = DatabaseManager(db_path, usar_pool=bool(self.config.get("usar_pool_conexiones", False)))
 
-            # 2. Asegura que las tablas núcleo existan **ANTES** de consultar cualquier dato
-            if hasattr(self.db, "crear_tablas_nucleo"):
-                self.db.crear_tablas_nucleo()
-            elif hasattr(self.db, "verificar_estructura"):
-                self.db.verificar_estructura()
+            # 2. Asegura el esquema **ANTES** de consultar cualquier dato
+            try:
+                self.db.asegurar_esquema()
+            except Exception as e:
+                QMessageBox.critical(self, "Error BD", f"No se pudo preparar la base de datos:\n{e}")
+                return
 
             # 3. Refresca el proyecto inicial y los tabs
             self.cargar_proyecto_inicial()
@@ -259,24 +341,19 @@ class AppGUI(QMainWindow):
             if not ruta_guardar:
                 return
 
-            report_gen = ReporteDetalladoPDF(self.db)
-            if formato == "pdf":
-                ok, resultado = report_gen.exportar(
-                    self.proyecto_actual['id'], filtros, cliente_nombre, moneda,
-                    nombre_archivo=os.path.basename(ruta_guardar),
-                    ruta_forzada=ruta_guardar
-                )
-            elif formato == "excel":
-                ok, resultado = report_gen.exportar_excel(
-                    self.proyecto_actual['id'], filtros, cliente_nombre, moneda,
+            from reporte_detallado_pdf import ReporteDetalladoPDF
+            report_gen = ReporteDetalladoPDF(self.db, cache=self.cache_reportes)
+            exportar = report_gen.exportar if formato == "pdf" else report_gen.exportar_excel
+            proyecto_id = self.proyecto_actual['id']
+            self.servicio_reportes.lanzar(
+                f"Detallado {cliente_nombre} ({os.path.basename(ruta_guardar)})",
+                lambda progreso: exportar(
+                    proyecto_id, filtros, cliente_nombre, moneda,
                     nombre_archivo=os.path.basename(ruta_guardar),
-                    ruta_forzada=ruta_guardar
+                    ruta_forzada=ruta_guardar,
+                    progreso=progreso
                 )
-            if ok:
-                from PyQt6.QtWidgets import QMessageBox
-                QMessageBox.information(self, "Éxito", f"Reporte generado en:\n{resultado}")
-            else:
-                QMessageBox.warning(self, "Error al generar reporte", str(resultado))
+            )
 
 
     def generar_reporte_operadores(self):
@@ -303,25 +380,21 @@ class AppGUI(QMainWindow):
         if not ruta_guardar:
             return
 
-        # 3. Ejecuta el reporte
-        report_gen = ReporteOperadores(self.db)
+        # 3. Lanza el reporte en segundo plano (el resultado se ve en "Reportes en curso")
+        from reporte_operadores import ReporteOperadores
+        report_gen = ReporteOperadores(self.db, cache=self.cache_reportes)
         if formato == "pdf":
-            ok, resultado = report_gen.exportar_pdf(
-                self.proyecto_actual['id'], filtros, ruta_guardar, moneda
-            )
+            exportar = report_gen.exportar_pdf
         elif formato == "excel":
-            ok, resultado = report_gen.exportar_excel(
-                self.proyecto_actual['id'], filtros, ruta_guardar, moneda
-            )
+            exportar = report_gen.exportar_excel
         else:
             QMessageBox.warning(self, "Error", "Formato de reporte no soportado.")
             return
-
-        # 4. Muestra el resultado
-        if ok:
-            QMessageBox.information(self, "Éxito", f"Reporte generado en:\n{resultado}")
-        else:
-            QMessageBox.warning(self, "Error al generar reporte", str(resultado))
+        proyecto_id = self.proyecto_actual['id']
+        self.servicio_reportes.lanzar(
+            f"Operadores ({os.path.basename(ruta_guardar)})",
+            lambda progreso: exportar(proyecto_id, filtros, ruta_guardar, moneda, progreso=progreso)
+        )
 
     def generar_estado_cuenta_cliente_pdf(self):
         if not self.proyecto_actual:
@@ -338,48 +411,43 @@ class AppGUI(QMainWindow):
             QMessageBox.warning(self, "Cliente Requerido", "Por favor, seleccione un cliente.")
             return
 
+        # Las facturas no se cargan aquí: to_pdf las recorre por lotes desde la BD
+        # (ordenadas por equipo); aquí solo se piden su cantidad y su total.
         if filtros['cliente_id'] is None:
-            # Todos los clientes (reporte global)
-            facturas, abonos = self.db.obtener_datos_estado_cuenta_general_global(
-                filtros['fecha_inicio'],
-                filtros['fecha_fin']
-            )
+            # Todos los clientes del proyecto
+            proyecto_id = self.proyecto_actual['id']
             title = "ESTADO DE CUENTA GENERAL"
             project_name = self.proyecto_actual['nombre']
             cliente_nombre = "GENERAL"
-            total_facturado = sum(float(row.get('monto', 0)) for row in facturas)
+            abonos = self.db.obtener_abonos_estado_cuenta(
+                None, filtros['fecha_inicio'], filtros['fecha_fin'], proyecto_id
+            )
             total_abonado = sum(float(row.get('monto', 0)) for row in abonos)
         else:
             # Reporte individual
-            facturas, abonos = self.db.obtener_datos_estado_cuenta_cliente_global(
-                filtros['cliente_id'],
-                filtros['fecha_inicio'],
-                filtros['fecha_fin']
-            )
+            proyecto_id = None
             title = f"ESTADO DE CUENTA - {filtros['cliente_nombre']}"
             project_name = self.proyecto_actual['nombre']
             cliente_nombre = filtros.get('cliente_nombre', 'Cliente')
-            total_facturado = sum(float(row.get('monto', 0)) for row in facturas)
+            abonos = self.db.obtener_abonos_estado_cuenta(
+                filtros['cliente_id'], filtros['fecha_inicio'], filtros['fecha_fin']
+            )
             total_abonado = self.db.obtener_total_abonos_cliente(
                 self.proyecto_actual['id'],
                 filtros['cliente_id'],
                 filtros['fecha_inicio'],
                 filtros['fecha_fin']
             )
+        cantidad, total_facturado = self.db.obtener_resumen_facturas_estado_cuenta(
+            filtros['cliente_id'], filtros['fecha_inicio'], filtros['fecha_fin'], proyecto_id
+        )
 
         saldo = total_facturado - total_abonado
 
-        if not facturas:
+        if not cantidad:
             QMessageBox.information(self, "Sin datos", "No hay datos para el período o filtros seleccionados.")
             return
 
-        # --- ¡Asegurarse de que "conduce" y "ubicacion" estén siempre presentes! ---
-        for row in facturas:
-            if 'conduce' not in row or row['conduce'] is None:
-                row['conduce'] = ''
-            if 'ubicacion' not in row or row['ubicacion'] is None:
-                row['ubicacion'] = ''
-
         column_map = {
             'fecha': 'Fecha',
             'conduce': 'Conduce',
@@ -387,10 +455,9 @@ class AppGUI(QMainWindow):
             'equipo_nombre': 'Equipo',
             'horas': 'Horas',
             'monto': 'Monto',
-            'conduce_adjunto_path': 'ConduceAdjunto'
+            'conduce_adjunto_path': 'ConduceAdjunto',
+            'cliente_nombre': 'Cliente'
         }
-        if facturas and 'cliente_nombre' in facturas[0]:
-            column_map['cliente_nombre'] = 'Cliente'
 
         date_range = f"{filtros['fecha_inicio']} a {filtros['fecha_fin']}"
 
@@ -400,14 +467,15 @@ class AppGUI(QMainWindow):
         if not file_path:
             return
 
+        from report_generator import ReportGenerator
         carpeta_conduces = self.config.get('carpeta_conduces')
         print(f"[DEBUG] (generar_estado_cuenta_cliente_pdf) carpeta_conduces: {carpeta_conduces}")
         print(f"[DEBUG] column_map: {column_map}")
-        if facturas:
-            print(f"[DEBUG] Primeros facturas: {facturas[:2]}")
 
         rg = ReportGenerator(
-            data=facturas,
+            lotes=self.db.iterar_facturas_estado_cuenta(
+                filtros['cliente_id'], filtros['fecha_inicio'], filtros['fecha_fin'], proyecto_id
+            ),
             title=title,
             project_name=project_name,
             date_range=date_range,
@@ -419,12 +487,70 @@ class AppGUI(QMainWindow):
             total_abonado=total_abonado,
             saldo=saldo
         )
-        ok, error = rg.to_pdf(file_path)
-        if ok:
-            QMessageBox.information(self, "Éxito", f"Reporte generado en:\n{file_path}")
+        self.servicio_reportes.lanzar(
+            f"{title} ({os.path.basename(file_path)})",
+            lambda progreso: rg.to_pdf(file_path, progreso=progreso)
+        )
+
+    def generar_estados_cuenta_lote(self):
+        """Un estado de cuenta por cliente del proyecto, generados en paralelo."""
+        if not self.proyecto_actual:
+            QMessageBox.warning(self, "Proyecto no cargado", "Debe cargar un proyecto para generar reportes.")
+            return
+
+        dialog = EstadoCuentaDialog(self.db, self.proyecto_actual, self)
+        dialog.setWindowTitle("Estados de Cuenta por Cliente (Lote)")
+        dialog.combo_cliente.setCurrentText("Todos")
+        dialog.combo_cliente.setEnabled(False)
+        if not dialog.exec():
+            return
+        filtros = dialog.get_filtros()
+
+        destino = QFileDialog.getExistingDirectory(self, "Carpeta donde guardar los estados de cuenta")
+        if not destino:
+            return
+        comprimir = QMessageBox.question(
+            self, "Estados de Cuenta en Lote", "¿Guardar los estados de cuenta en un archivo ZIP?"
+        ) == QMessageBox.StandardButton.Yes
+
+        from estados_cuenta_lote import generar_estados_cuenta_lote
+        proyecto = dict(self.proyecto_actual)
+        carpeta_conduces = self.config.get('carpeta_conduces')
+        self.servicio_reportes.lanzar(
+            f"Estados de cuenta en lote ({filtros['fecha_inicio']} a {filtros['fecha_fin']})",
+            lambda progreso: generar_estados_cuenta_lote(
+                self.db, proyecto, filtros['fecha_inicio'], filtros['fecha_fin'], destino,
+                carpeta_conduces=carpeta_conduces, comprimir=comprimir, progreso=progreso
+            )
+        )
+
+    def _on_reporte_cambiado(self, trabajo):
+        """Avisa en la barra de estado cuando un reporte en segundo plano termina."""
+        if trabajo.activo:
+            return
+        if trabajo.estado == TERMINADO:
+            self.statusBar().showMessage(f"Reporte generado: {trabajo.resultado}", 10000)
         else:
-            QMessageBox.critical(self, "Error", f"No se pudo generar el reporte:\n{error}")
-            
+            self.statusBar().showMessage(f"{trabajo.titulo}: {trabajo.estado.lower()} - {trabajo.seccion}", 10000)
+
+    def closeEvent(self, event):
+        if self.servicio_reportes.hay_activos():
+            respuesta = QMessageBox.question(
+                self, "Reportes en curso",
+                "Hay reportes generándose. ¿Cancelarlos y salir?"
+            )
+            if respuesta != QMessageBox.StandardButton.Yes:
+                event.ignore()
+                return
+            self.servicio_reportes.cancelar_todos()
+            self.servicio_reportes.esperar(10000)
+        try:
+            # Mantiene al día las estadísticas con las que SQLite elige índices
+            self.db.actualizar_estadisticas()
+        except Exception as e:
+            logger.warning("No se pudieron actualizar las estadísticas de la base: %s", e)
+        super().closeEvent(event)
+
 
     def generar_estado_cuenta_general_pdf(self):
         if not self.proyecto_actual:
@@ -470,6 +596,7 @@ class AppGUI(QMainWindow):
 
         # 4. Configurar y crear la instancia de ReportGenerator
         column_map = {'fecha': 'Fecha', 'conduce': 'Conduce', 'cliente_nombre': 'Cliente', 'equipo_nombre': 'Equipo', 'monto': 'Monto', 'horas': 'Horas'}
+        from report_generator import ReportGenerator
         
         rg = ReportGenerator(
             data=facturas,
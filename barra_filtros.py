@@ -0,0 +1,99 @@
+"""
+Controlador de las barras de filtros de las pestañas.
+
+Cada cambio en un combo, una fecha o un cuadro de texto reinicia un
+temporizador corto; la consulta se lanza una sola vez cuando los filtros
+llevan 'demora_ms' sin cambiar. Girar la rueda del ratón sobre una fecha o
+escribir en la búsqueda produce así una consulta por estado final, no una por
+cada paso intermedio. Además, si el estado final coincide con el último
+aplicado (p. ej. se cambió un combo y se volvió al valor anterior), no se
+consulta nada.
+
+Uso típico:
+
+    self.control_filtros = ControladorFiltros(self.get_current_filters, self._cargar, parent=self)
+    self.control_filtros.vigilar(self.combo_cliente, self.fecha_inicio, self.fecha_fin)
+    ...
+    self.control_filtros.refrescar_ahora()   # tras guardar o cambiar de proyecto
+
+'leer_filtros()' debe devolver un valor comparable con == (dict, tupla...).
+"""
+from PyQt6.QtCore import QObject, QTimer
+from PyQt6.QtWidgets import QAbstractButton, QAbstractSpinBox, QComboBox, QDateEdit, QLineEdit
+
+DEMORA_FILTROS_MS = 250
+
+# Marca "todavía no se aplicó ningún filtro" (distinta de cualquier valor real)
+_NINGUNO = object()
+
+
+def rellenar_combo(combo, texto_todos, filas):
+    """
+    Vuelve a llenar un combo de filtro ("Todos" + filas con 'id' y 'nombre')
+    sin emitir señales y conservando lo seleccionado si sigue en la lista.
+    Devuelve True si la selección tuvo que volver a "Todos".
+    """
+    actual = combo.currentData()
+    combo.blockSignals(True)
+    combo.clear()
+    combo.addItem(texto_todos, None)
+    for fila in filas:
+        combo.addItem(fila["nombre"], fila["id"])
+    indice = combo.findData(actual) if actual is not None else 0
+    combo.setCurrentIndex(max(indice, 0))
+    combo.blockSignals(False)
+    return indice < 0
+
+
+class ControladorFiltros(QObject):
+    """Agrupa los cambios de una barra de filtros y aplica solo el estado asentado."""
+
+    def __init__(self, leer_filtros, aplicar, demora_ms=DEMORA_FILTROS_MS, parent=None):
+        super().__init__(parent)
+        self._leer_filtros = leer_filtros
+        self._aplicar = aplicar
+        self._ultimos = _NINGUNO
+        self._temporizador = QTimer(self)
+        self._temporizador.setSingleShot(True)
+        self._temporizador.setInterval(demora_ms)
+        self._temporizador.timeout.connect(self._asentar)
+
+    def vigilar(self, *widgets):
+        """Conecta la señal de cambio de cada widget de la barra."""
+        for widget in widgets:
+            if isinstance(widget, QComboBox):
+                widget.currentIndexChanged.connect(self.programar)
+            elif isinstance(widget, QDateEdit):
+                widget.dateChanged.connect(self.programar)
+            elif isinstance(widget, QLineEdit):
+                widget.textChanged.connect(self.programar)
+            elif isinstance(widget, QAbstractSpinBox):
+                widget.valueChanged.connect(self.programar)
+            elif isinstance(widget, QAbstractButton):
+                widget.toggled.connect(self.programar)
+            else:
+                raise TypeError(f"Widget de filtro no soportado: {type(widget).__name__}")
+
+    def programar(self, *args):
+        """Anota un cambio: (re)inicia la espera antes de consultar."""
+        self._temporizador.start()
+
+    def refrescar_ahora(self):
+        """
+        Aplica los filtros actuales de inmediato, aunque no hayan cambiado
+        (los datos sí pueden haber cambiado: alta, edición, otro proyecto...).
+        """
+        self._temporizador.stop()
+        self._ultimos = self._leer_filtros()
+        self._aplicar(self._ultimos)
+
+    def invalidar(self):
+        """Olvida el último estado aplicado: el próximo cambio siempre consulta."""
+        self._ultimos = _NINGUNO
+
+    def _asentar(self):
+        filtros = self._leer_filtros()
+        if filtros == self._ultimos:
+            return
+        self._ultimos = filtros
+        self._aplicar(filtros)
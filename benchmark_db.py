@@ -0,0 +1,417 @@
+"""
+Benchmark de consultas de DatabaseManager sobre bases sintéticas.
+
+1) Genera (de forma determinista, por semilla) una base con el mismo esquema que
+   progain_database-qt.db y el tamaño pedido de 'transacciones', con sus pagos,
+   equipos_alquiler_meta, equipos_entidades, equipos y mantenimientos.
+2) Mide los listados, KPIs y consultas de reportes y guarda los tiempos en JSON
+   para comparar entre commits.
+
+Uso:
+    python benchmark_db.py --tamano 10k
+    python benchmark_db.py --tamano 100k --repeticiones 5 --salida antes.json
+    python benchmark_db.py --tamano 100k --comparar antes.json
+
+Las bases generadas se guardan en el directorio temporal y se reutilizan si ya
+existen con el mismo tamaño y semilla (--regenerar para forzar).
+"""
+import argparse
+import itertools
+import json
+import os
+import platform
+import random
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+from datetime import date, datetime, timedelta
+
+from logic import DatabaseManager
+
+PLANTILLA = os.path.join(os.path.dirname(os.path.abspath(__file__)), "progain_database-qt.db")
+
+TAMANOS = {"10k": 10_000, "100k": 100_000, "1m": 1_000_000}
+
+FECHA_INICIO = date(2022, 1, 1)
+DIAS_RANGO = 4 * 365
+
+PROYECTO_ID = 1
+CATEGORIA_ALQUILER = "ALQUILERES"
+CATEGORIA_PAGO_OPERADOR = "PAGO HRS OPERADOR"
+CATEGORIAS_GASTO = ("COMBUSTIBLE", "PIEZAS Y LUBRICANTES", "MANTENIMIENTO", "TRANSPORTE", "SUELDOS", "GASTOS")
+TIPOS_EQUIPO = ("RETROPALA", "EXCAVADORA", "MINICARGADOR", "CAMION VOLTEO", "RODILLO", "TIJERILLA")
+UBICACIONES = ("SANTO DOMINGO", "SANTIAGO", "LA VEGA", "BAVARO", "SAN CRISTOBAL", "AZUA", "BANI")
+LOTE_INSERCION = 20_000
+
+
+# --- GENERADOR ---
+
+def _copiar_esquema(conn, plantilla):
+    """Crea en 'conn' las tablas, índices y vistas de la base plantilla."""
+    origen = sqlite3.connect(plantilla)
+    try:
+        objetos = origen.execute("""
+            SELECT type, sql FROM sqlite_master
+            WHERE sql IS NOT NULL AND name NOT LIKE 'sqlite_%'
+            ORDER BY CASE type WHEN 'table' THEN 0 WHEN 'index' THEN 1 WHEN 'view' THEN 2 ELSE 3 END
+        """).fetchall()
+    finally:
+        origen.close()
+    for _, sql in objetos:
+        conn.execute(sql)
+
+
+def _fecha(rng):
+    return (FECHA_INICIO + timedelta(days=rng.randrange(DIAS_RANGO))).isoformat()
+
+
+def _insertar_por_lotes(conn, sql, filas):
+    filas = iter(filas)
+    while True:
+        lote = list(itertools.islice(filas, LOTE_INSERCION))
+        if not lote:
+            break
+        conn.executemany(sql, lote)
+
+
+def generar_bd(destino, n_transacciones, semilla=1234, plantilla=PLANTILLA):
+    """
+    Crea 'destino' con n_transacciones movimientos sintéticos. Con la misma
+    semilla y tamaño el contenido es siempre idéntico.
+    """
+    rng = random.Random(semilla)
+    for sufijo in ("", "-wal", "-shm", "-journal"):
+        if os.path.exists(destino + sufijo):
+            os.remove(destino + sufijo)
+
+    conn = sqlite3.connect(destino)
+    conn.execute("PRAGMA journal_mode = OFF")
+    conn.execute("PRAGMA synchronous = OFF")
+    if os.path.exists(plantilla):
+        _copiar_esquema(conn, plantilla)
+
+    n_equipos = max(10, min(200, n_transacciones // 500))
+    n_clientes = max(20, n_transacciones // 200)
+    n_operadores = max(10, n_transacciones // 1000)
+
+    conn.execute("INSERT INTO proyectos (id, nombre, moneda) VALUES (?, ?, 'RD$')",
+                 (PROYECTO_ID, "PROYECTO BENCHMARK"))
+    cuentas = [(i, f"CUENTA {i}") for i in range(1, 7)]
+    conn.executemany("INSERT INTO cuentas (id, nombre) VALUES (?, ?)", cuentas)
+    conn.executemany("INSERT INTO proyecto_cuentas (proyecto_id, cuenta_id, is_principal) VALUES (?, ?, ?)",
+                     [(PROYECTO_ID, cid, int(cid == 1)) for cid, _ in cuentas])
+
+    nombres_categoria = (CATEGORIA_ALQUILER, CATEGORIA_PAGO_OPERADOR) + CATEGORIAS_GASTO
+    categorias = {nombre: i for i, nombre in enumerate(nombres_categoria, start=1)}
+    conn.executemany("INSERT INTO categorias (id, nombre) VALUES (?, ?)",
+                     [(cid, nombre) for nombre, cid in categorias.items()])
+    subcategorias = {}
+    sub_id = 1
+    for nombre, cid in categorias.items():
+        subcategorias[cid] = []
+        for j in range(3):
+            conn.execute("INSERT INTO subcategorias (id, nombre, categoria_id) VALUES (?, ?, ?)",
+                         (sub_id, f"{nombre} {j + 1}", cid))
+            subcategorias[cid].append(sub_id)
+            sub_id += 1
+
+    equipos = []
+    for i in range(1, n_equipos + 1):
+        tipo = rng.choice(TIPOS_EQUIPO)
+        trigger = rng.choice((("HORAS", 250.0), ("HORAS", 500.0), ("KM", 5000.0), ("DIAS", 180.0)))
+        conn.execute("""
+            INSERT INTO equipos (id, proyecto_id, nombre, marca, modelo, categoria, activo,
+                                 mantenimiento_trigger_tipo, mantenimiento_trigger_valor)
+            VALUES (?, ?, ?, ?, ?, ?, 1, ?, ?)
+        """, (i, PROYECTO_ID, f"{tipo} {i:03d}", "MARCA", f"M{i}", tipo, trigger[0], trigger[1]))
+        equipos.append(i)
+
+    entidades = [(i, PROYECTO_ID, f"CLIENTE {i:05d}", "Cliente") for i in range(1, n_clientes + 1)]
+    entidades += [(n_clientes + i, PROYECTO_ID, f"OPERADOR {i:04d}", "Operador")
+                  for i in range(1, n_operadores + 1)]
+    conn.executemany("INSERT INTO equipos_entidades (id, proyecto_id, nombre, tipo, activo) VALUES (?, ?, ?, ?, 1)",
+                     entidades)
+    clientes = list(range(1, n_clientes + 1))
+    operadores = list(range(n_clientes + 1, n_clientes + n_operadores + 1))
+
+    mantenimientos = []
+    for equipo_id in equipos:
+        for _ in range(rng.randint(1, 3)):
+            mantenimientos.append((equipo_id, _fecha(rng), "Servicio sintético", "PREVENTIVO",
+                                   round(rng.uniform(5000, 50000), 2),
+                                   round(rng.uniform(0, 5000), 1), round(rng.uniform(0, 80000), 1)))
+    conn.executemany("""
+        INSERT INTO mantenimientos (equipo_id, fecha, descripcion, tipo, valor, odometro_horas, odometro_km)
+        VALUES (?, ?, ?, ?, ?, ?, ?)
+    """, mantenimientos)
+
+    transacciones, metas, pagos = [], [], []
+    cat_gasto = [categorias[n] for n in CATEGORIAS_GASTO]
+    for i in range(n_transacciones):
+        tid = str(uuid.UUID(int=rng.getrandbits(128)))
+        fecha = _fecha(rng)
+        cuenta_id = rng.randint(1, len(cuentas))
+        equipo_id = rng.choice(equipos)
+        r = rng.random()
+        if r < 0.10:
+            # Alquiler (Ingreso) con su fila META y, según el caso, sus abonos
+            cliente_id, operador_id = rng.choice(clientes), rng.choice(operadores)
+            horas = round(rng.uniform(1, 10) * 2) / 2
+            precio = float(rng.randrange(1500, 4501, 250))
+            monto = round(horas * precio, 2)
+            conduce, ubicacion = f"{rng.randrange(1, 99999):05d}", rng.choice(UBICACIONES)
+            estado = rng.random()
+            pagado = 0
+            if estado < 0.6:
+                partes = [monto] if rng.random() < 0.5 else [round(monto / 2, 2), monto - round(monto / 2, 2)]
+                pagado = 1
+            elif estado < 0.8:
+                partes = [round(monto * rng.uniform(0.2, 0.8), 2)]
+            else:
+                partes = []
+            for parte in partes:
+                fecha_pago = min(date.fromisoformat(fecha) + timedelta(days=rng.randrange(0, 60)),
+                                 FECHA_INICIO + timedelta(days=DIAS_RANGO))
+                pagos.append((tid, cuenta_id, fecha_pago.isoformat(), parte, "Abono sintético"))
+            cat_id = categorias[CATEGORIA_ALQUILER]
+            transacciones.append((tid, PROYECTO_ID, cuenta_id, cat_id, rng.choice(subcategorias[cat_id]),
+                                  "Ingreso", f"Alquiler {conduce}", None, monto, fecha,
+                                  cliente_id, operador_id, conduce, ubicacion, horas, precio, pagado, 0.0, equipo_id))
+            metas.append((tid, PROYECTO_ID, cliente_id, operador_id, horas, precio, conduce, ubicacion, equipo_id))
+        elif r < 0.19:
+            # Pago de horas a operador
+            operador_id = rng.choice(operadores)
+            horas = round(rng.uniform(1, 10) * 2) / 2
+            cat_id = categorias[CATEGORIA_PAGO_OPERADOR]
+            transacciones.append((tid, PROYECTO_ID, cuenta_id, cat_id, None, "Gasto",
+                                  f"Pago operador {horas} hrs", None, round(horas * 300, 2), fecha,
+                                  None, operador_id, None, None, horas, None, 0, 0.0, equipo_id))
+        else:
+            cat_id = rng.choice(cat_gasto)
+            transacciones.append((tid, PROYECTO_ID, cuenta_id, cat_id, rng.choice(subcategorias[cat_id]),
+                                  "Gasto", f"Gasto {i}", "sintético" if rng.random() < 0.3 else None,
+                                  round(rng.uniform(200, 60000), 2), fecha,
+                                  None, None, None, None, None, None, 0,
+                                  round(rng.uniform(0, 300), 1) if rng.random() < 0.2 else 0.0,
+                                  equipo_id if rng.random() < 0.8 else None))
+
+    _insertar_por_lotes(conn, """
+        INSERT INTO transacciones (id, proyecto_id, cuenta_id, categoria_id, subcategoria_id, tipo,
+                                   descripcion, comentario, monto, fecha, cliente_id, operador_id,
+                                   conduce, ubicacion, horas, precio_por_hora, pagado, kilometros, equipo_id)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    """, transacciones)
+    _insertar_por_lotes(conn, """
+        INSERT INTO equipos_alquiler_meta (transaccion_id, proyecto_id, cliente_id, operador_id, horas,
+                                           precio_por_hora, conduce, ubicacion, equipo_id)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+    """, metas)
+    _insertar_por_lotes(conn, """
+        INSERT INTO pagos (transaccion_id, cuenta_id, fecha, monto, comentario) VALUES (?, ?, ?, ?, ?)
+    """, pagos)
+    conn.commit()
+    conn.close()
+
+    # Columnas derivadas, triggers, resúmenes e índices igual que en la app
+    db = DatabaseManager(destino)
+    try:
+        db.asegurar_esquema()
+        db.execute("ANALYZE")
+    finally:
+        db.cerrar()
+    return {"transacciones": n_transacciones, "equipos": n_equipos, "clientes": n_clientes,
+            "operadores": n_operadores, "alquileres": len(metas), "pagos": len(pagos)}
+
+
+# --- CASOS ---
+
+def _contexto(db):
+    """Valores de filtro representativos tomados de la propia base."""
+    cliente = db.fetchone("""
+        SELECT cliente_id FROM transacciones
+        WHERE tipo = 'Ingreso' AND cliente_id IS NOT NULL
+        GROUP BY cliente_id ORDER BY COUNT(*) DESC LIMIT 1
+    """)
+    operador = db.fetchone("SELECT MIN(id) AS id FROM equipos_entidades WHERE tipo = 'Operador'")
+    equipo = db.fetchone("SELECT MIN(id) AS id FROM equipos WHERE proyecto_id = ?", (PROYECTO_ID,))
+    cuenta = db.fetchone("SELECT MIN(id) AS id FROM cuentas")
+    ultima = db.fetchone("SELECT MAX(fecha) AS f FROM transacciones")['f']
+    fin = date.fromisoformat(ultima[:10])
+    return {
+        "proyecto_id": PROYECTO_ID,
+        "cliente_id": cliente['cliente_id'] if cliente else None,
+        "operador_id": operador['id'] if operador else None,
+        "equipo_id": equipo['id'] if equipo else None,
+        "cuenta_id": cuenta['id'] if cuenta else None,
+        "anio": fin.year,
+        "mes": fin.month,
+        "mes_inicio": fin.replace(day=1).isoformat(),
+        "anio_inicio": fin.replace(month=1, day=1).isoformat(),
+        "fin": fin.isoformat(),
+    }
+
+
+def _consumir(generador):
+    return sum(len(lote) for lote in generador)
+
+
+def _tamano(resultado):
+    if isinstance(resultado, (list, tuple)):
+        return sum(_tamano(r) for r in resultado) if resultado and isinstance(resultado[0], list) else len(resultado)
+    if isinstance(resultado, dict):
+        return len(resultado)
+    return resultado if isinstance(resultado, int) else 1
+
+
+def casos(c):
+    """Lista de (nombre, función(db)) a medir."""
+    p = c["proyecto_id"]
+    mes = {"fecha_inicio": c["mes_inicio"], "fecha_fin": c["fin"]}
+    return [
+        ("alquileres_todos", lambda db: db.obtener_transacciones_por_proyecto(p)),
+        ("alquileres_todos_compacto", lambda db: db.obtener_transacciones_por_proyecto(p, compacto=True)),
+        ("alquileres_mes", lambda db: db.obtener_transacciones_por_proyecto(p, mes)),
+        ("alquileres_cliente", lambda db: db.obtener_transacciones_por_proyecto(p, {"cliente_id": c["cliente_id"]})),
+        ("alquileres_equipo_anio", lambda db: db.obtener_transacciones_por_proyecto(
+            p, {"equipo_id": c["equipo_id"], "fecha_inicio": c["anio_inicio"], "fecha_fin": c["fin"]})),
+        ("alquileres_iterar", lambda db: _consumir(db.iterar_transacciones_por_proyecto(p))),
+        ("alquileres_primera_pagina", lambda db: db.obtener_pagina_transacciones_por_proyecto(p)),
+        ("alquileres_totales", lambda db: db.obtener_totales_transacciones_por_proyecto(p)),
+        ("gastos_todos", lambda db: db.obtener_gastos_equipo(p, {})),
+        ("gastos_mes", lambda db: db.obtener_gastos_equipo(
+            p, {"fecha_desde": c["mes_inicio"], "fecha_hasta": c["fin"]})),
+        ("gastos_cuenta_texto", lambda db: db.obtener_gastos_equipo(
+            p, {"cuenta_id": c["cuenta_id"], "texto": "sintético"})),
+        ("gastos_iterar", lambda db: _consumir(db.iterar_gastos_equipo(p, {}))),
+        ("pagos_operadores_todos", lambda db: db.obtener_pagos_a_operadores(p, {})),
+        ("pagos_operadores_operador", lambda db: db.obtener_pagos_a_operadores(
+            p, {"operador_id": c["operador_id"]})),
+        ("kpis_mes", lambda db: db.obtener_kpis_dashboard(p, c["anio"], c["mes"])),
+        ("kpis_anio", lambda db: db.obtener_kpis_dashboard(p, c["anio"], None)),
+        ("kpis_mes_equipo", lambda db: db.obtener_kpis_dashboard(p, c["anio"], c["mes"], c["equipo_id"])),
+        ("estado_mantenimiento", lambda db: db.obtener_estado_mantenimiento_equipos(p)),
+        ("lista_abonos", lambda db: db.obtener_lista_abonos(p, {})),
+        ("pendientes_cliente", lambda db: db.obtener_transacciones_pendientes_cliente(p, c["cliente_id"])),
+        ("estado_cuenta_cliente", lambda db: db.obtener_datos_estado_cuenta_cliente_global(
+            c["cliente_id"], c["anio_inicio"], c["fin"])),
+        ("estado_cuenta_general", lambda db: db.obtener_datos_estado_cuenta_general_global(
+            p, c["anio_inicio"], c["fin"])),
+        ("total_abonos_cliente", lambda db: db.obtener_total_abonos_cliente(
+            p, c["cliente_id"], c["anio_inicio"], c["fin"])),
+        ("horas_por_operador", lambda db: db.analisis_horas_por_operador(p)),
+        ("anios_transacciones", lambda db: db.obtener_anios_transacciones(p)),
+        ("cuentas_proyecto", lambda db: db.obtener_cuentas_por_proyecto(p)),
+        ("categorias_proyecto", lambda db: db.obtener_categorias_por_proyecto(p)),
+    ]
+
+
+def medir(db_path, repeticiones=5, filtro=None, usar_pool=False):
+    db = DatabaseManager(db_path, usar_pool=usar_pool)
+    resultados = {}
+    try:
+        contexto = _contexto(db)
+        for nombre, funcion in casos(contexto):
+            if filtro and filtro not in nombre:
+                continue
+            filas = _tamano(funcion(db))  # calentamiento (caché de páginas y sentencias)
+            tiempos = []
+            for _ in range(repeticiones):
+                # Sin la caché de referencias (cuentas, categorías...) se mediría
+                # un dict en memoria en lugar de la consulta
+                db.invalidar_referencias()
+                inicio = time.perf_counter()
+                funcion(db)
+                tiempos.append((time.perf_counter() - inicio) * 1000)
+            resultados[nombre] = {
+                "filas": filas,
+                "min_ms": round(min(tiempos), 3),
+                "mediana_ms": round(statistics.median(tiempos), 3),
+                "media_ms": round(statistics.mean(tiempos), 3),
+            }
+            print(f"  {nombre:<28} {resultados[nombre]['mediana_ms']:>10.2f} ms  ({filas} filas)")
+    finally:
+        db.cerrar()
+    return resultados
+
+
+def _commit_actual():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__)), check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def comparar(actual, anterior_path):
+    with open(anterior_path, encoding="utf-8") as f:
+        anterior = json.load(f)["resultados"]
+    print(f"\nComparación con {anterior_path} (mediana):")
+    for nombre, datos in actual.items():
+        if nombre not in anterior:
+            continue
+        antes, ahora = anterior[nombre]["mediana_ms"], datos["mediana_ms"]
+        factor = ahora / antes if antes else float("inf")
+        marca = "  <-- más lento" if factor > 1.2 else ""
+        print(f"  {nombre:<28} {antes:>10.2f} -> {ahora:>10.2f} ms  x{factor:.2f}{marca}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark de consultas de DatabaseManager.")
+    parser.add_argument("--tamano", default="10k",
+                        help="10k, 100k, 1m o un número de transacciones (por defecto 10k)")
+    parser.add_argument("--semilla", type=int, default=1234)
+    parser.add_argument("--bd", help="Usar esta base existente en lugar de generar una")
+    parser.add_argument("--directorio", default=tempfile.gettempdir(),
+                        help="Dónde guardar las bases generadas")
+    parser.add_argument("--regenerar", action="store_true", help="Regenerar aunque la base ya exista")
+    parser.add_argument("--repeticiones", type=int, default=5)
+    parser.add_argument("--filtro", help="Medir solo los casos cuyo nombre contenga este texto")
+    parser.add_argument("--pool", action="store_true", help="Abrir la base en modo pool (WAL)")
+    parser.add_argument("--salida", help="Archivo JSON de resultados")
+    parser.add_argument("--comparar", help="JSON de una corrida anterior para comparar")
+    args = parser.parse_args(argv)
+
+    generacion = None
+    if args.bd:
+        db_path = args.bd
+    else:
+        n = TAMANOS.get(args.tamano.lower()) or int(args.tamano)
+        db_path = os.path.join(args.directorio, f"progain_bench_{n}_{args.semilla}.db")
+        if args.regenerar or not os.path.exists(db_path):
+            print(f"Generando {n} transacciones en {db_path} ...")
+            inicio = time.perf_counter()
+            generacion = generar_bd(db_path, n, semilla=args.semilla)
+            generacion["segundos"] = round(time.perf_counter() - inicio, 2)
+            print(f"✅ Base generada en {generacion['segundos']} s: {generacion}")
+
+    print(f"Midiendo {db_path} ({args.repeticiones} repeticiones):")
+    resultados = medir(db_path, args.repeticiones, args.filtro, args.pool)
+
+    informe = {
+        "fecha": datetime.now().isoformat(timespec="seconds"),
+        "commit": _commit_actual(),
+        "python": platform.python_version(),
+        "sqlite": sqlite3.sqlite_version,
+        "bd": db_path,
+        "tamano": args.tamano if not args.bd else None,
+        "semilla": args.semilla,
+        "pool": args.pool,
+        "generacion": generacion,
+        "resultados": resultados,
+    }
+    salida = args.salida or f"benchmark_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+    with open(salida, "w", encoding="utf-8") as f:
+        json.dump(informe, f, indent=2, ensure_ascii=False)
+    print(f"✅ Resultados guardados en {salida}")
+
+    if args.comparar:
+        comparar(resultados, args.comparar)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
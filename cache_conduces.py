@@ -0,0 +1,134 @@
+"""
+Caché de conduces a resolución de impresión para los anexos de los reportes.
+
+Los conduces se guardan como fotos de hasta varios megapíxeles; incrustarlos
+tal cual obliga a fpdf a decodificar y meter la foto entera en cada reporte
+donde aparece el mismo conduce. Aquí se guarda, una sola vez, una versión
+reducida y recomprimida (JPEG) de cada adjunto:
+
+    versiones = preparar_conduces(rutas)          # construye en paralelo las que falten
+    pdf.image(versiones.get(ruta, ruta), w=...)
+
+La clave de cada entrada es la ruta absoluta más el mtime y el tamaño del
+original: si el conduce se reemplaza, la versión vieja se descarta y se crea
+otra. Si Pillow no está disponible o el archivo no es una imagen, se usa el
+original.
+"""
+import hashlib
+import logging
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+CARPETA_CACHE = "cache_conduces"
+
+# Ancho útil de la hoja carta (~185 mm) a unos 200 dpi; el alto permite
+# conduces en vertical sin pasar de una página.
+ANCHO_MAX_PX = 1500
+ALTO_MAX_PX = 2000
+CALIDAD_JPEG = 75
+
+EXTENSIONES_IMAGEN = {".jpg", ".jpeg", ".png", ".bmp", ".tiff", ".webp"}
+
+# Con menos entradas por construir que esto no compensa arrancar procesos
+MIN_PARA_PARALELO = 3
+
+
+def _prefijo(ruta_original):
+    return hashlib.sha1(os.path.abspath(ruta_original).encode("utf-8")).hexdigest()
+
+
+def ruta_en_cache(ruta_original, carpeta_cache=CARPETA_CACHE):
+    """Ruta de la versión reducida de 'ruta_original' (exista o no). None si no aplica."""
+    if os.path.splitext(ruta_original)[1].lower() not in EXTENSIONES_IMAGEN:
+        return None
+    try:
+        st = os.stat(ruta_original)
+    except OSError:
+        return None
+    return os.path.join(carpeta_cache, f"{_prefijo(ruta_original)}_{st.st_mtime_ns}_{st.st_size}.jpg")
+
+
+def _construir(ruta_original, destino):
+    """Escribe la versión reducida; devuelve True si quedó en la caché."""
+    try:
+        from PIL import Image, ImageOps
+    except ImportError:
+        return False
+    carpeta = os.path.dirname(destino)
+    temporal = f"{destino}.{os.getpid()}.tmp"
+    try:
+        os.makedirs(carpeta, exist_ok=True)
+        with Image.open(ruta_original) as img:
+            img = ImageOps.exif_transpose(img).convert("RGB")
+            img.thumbnail((ANCHO_MAX_PX, ALTO_MAX_PX), Image.LANCZOS)
+            img.save(temporal, format="JPEG", quality=CALIDAD_JPEG, optimize=True)
+        # Se publica de golpe: otro proceso nunca ve una entrada a medias
+        os.replace(temporal, destino)
+    except Exception as e:
+        logger.warning("No se pudo reducir el conduce %s: %s", ruta_original, e)
+        if os.path.exists(temporal):
+            os.remove(temporal)
+        return False
+
+    # Versiones anteriores del mismo archivo (otro mtime/tamaño)
+    prefijo = os.path.basename(destino).split("_", 1)[0] + "_"
+    for nombre in os.listdir(carpeta):
+        if nombre.startswith(prefijo) and nombre.endswith(".jpg") and nombre != os.path.basename(destino):
+            try:
+                os.remove(os.path.join(carpeta, nombre))
+            except OSError:
+                pass
+    return True
+
+
+def _construir_tarea(par):
+    ruta_original, destino = par
+    return ruta_original, _construir(ruta_original, destino)
+
+
+def preparar_conduces(rutas, carpeta_cache=CARPETA_CACHE, procesos=None, progreso=None):
+    """
+    Devuelve {ruta original: ruta a incrustar} para las rutas existentes,
+    construyendo antes (en un pool de procesos si son varias) las versiones
+    reducidas que falten. 'procesos=1' construye en el propio proceso.
+    'progreso(hechos, total)' se llama tras cada construcción.
+    """
+    versiones = {}
+    pendientes = []
+    for ruta in dict.fromkeys(rutas):
+        destino = ruta_en_cache(ruta, carpeta_cache)
+        if destino is None:
+            versiones[ruta] = ruta
+        elif os.path.exists(destino):
+            versiones[ruta] = destino
+        else:
+            versiones[ruta] = ruta
+            pendientes.append((ruta, destino))
+    if not pendientes:
+        return versiones
+
+    destinos = dict(pendientes)
+    procesos = min(procesos or os.cpu_count() or 1, len(pendientes))
+    if procesos == 1 or len(pendientes) < MIN_PARA_PARALELO:
+        resultados = map(_construir_tarea, pendientes)
+        pool = None
+    else:
+        # "spawn" como en estados_cuenta_lote: se llama desde hilos de una aplicación Qt
+        pool = ProcessPoolExecutor(max_workers=procesos, mp_context=multiprocessing.get_context("spawn"))
+        resultados = pool.map(_construir_tarea, pendientes)
+    nuevas = 0
+    try:
+        for hechos, (ruta, ok) in enumerate(resultados, 1):
+            if ok:
+                versiones[ruta] = destinos[ruta]
+                nuevas += 1
+            if progreso:
+                progreso(hechos, len(pendientes))
+    finally:
+        if pool is not None:
+            pool.shutdown(wait=True, cancel_futures=True)
+    logger.info("Caché de conduces: %d de %d versiones nuevas construidas", nuevas, len(pendientes))
+    return versiones
@@ -0,0 +1,146 @@
+"""
+Caché de reportes ya generados (PDF / XLSX).
+
+Los mismos reportes se piden muchas veces con los mismos filtros. Cada
+resultado se guarda bajo una clave que combina el tipo de reporte, los
+parámetros normalizados y la huella de datos de las tablas que lee
+(DatabaseManager.huella_datos: contadores de cambios mantenidos por triggers).
+Mientras esas tablas no cambien, la misma petición se resuelve copiando el
+archivo guardado:
+
+    cache = CacheReportes()
+    ok, ruta = cache.obtener_o_generar(
+        db, "detallado_pdf", (proyecto_id, filtros, cliente_nombre, moneda), ruta_destino,
+        lambda ruta: generar(ruta))
+
+Las entradas más viejas que MAX_DIAS se borran, y si la carpeta pasa de
+MAX_BYTES se borran las menos usadas.
+"""
+import datetime as _dt
+import hashlib
+import json
+import logging
+import os
+import shutil
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+CARPETA_CACHE = "cache_reportes"
+MAX_BYTES = 200 * 1024 * 1024
+MAX_DIAS = 30
+
+# Tablas que lee cada tipo de reporte: un cambio en cualquiera invalida sus entradas
+TABLAS_POR_REPORTE = {
+    "detallado_pdf": ("transacciones", "equipos", "equipos_entidades"),
+    "detallado_excel": ("transacciones", "equipos", "equipos_entidades"),
+    "operadores_pdf": ("transacciones", "equipos", "equipos_entidades", "cuentas", "categorias"),
+    "operadores_excel": ("transacciones", "equipos", "equipos_entidades", "cuentas", "categorias"),
+}
+
+
+def _normalizar(valor):
+    """Forma canónica de los parámetros: fechas en ISO, dicts sin claves vacías."""
+    if isinstance(valor, (_dt.date, _dt.datetime)):
+        return valor.isoformat()
+    if isinstance(valor, dict):
+        return {str(k): _normalizar(v) for k, v in sorted(valor.items(), key=lambda kv: str(kv[0]))
+                if v not in (None, "")}
+    if isinstance(valor, (list, tuple)):
+        return [_normalizar(v) for v in valor]
+    if isinstance(valor, str):
+        return valor.strip()
+    return valor
+
+
+def clave_reporte(tipo, parametros, huella):
+    texto = json.dumps(
+        {"tipo": tipo, "parametros": _normalizar(parametros), "huella": huella},
+        sort_keys=True, default=str, ensure_ascii=False
+    )
+    return hashlib.sha256(texto.encode("utf-8")).hexdigest()
+
+
+class CacheReportes:
+    def __init__(self, carpeta=CARPETA_CACHE, max_bytes=MAX_BYTES, max_dias=MAX_DIAS):
+        self.carpeta = carpeta
+        self.max_bytes = max_bytes
+        self.max_dias = max_dias
+
+    def obtener_o_generar(self, db, tipo, parametros, ruta_destino, generar, progreso=None):
+        """
+        Deja en 'ruta_destino' el reporte pedido y devuelve (ok, resultado)
+        como los métodos de exportación. Si hay una entrada con la misma clave
+        se copia; si no, se llama a generar(ruta_destino) y, si salió bien y
+        los datos no cambiaron mientras tanto, el resultado se guarda.
+        """
+        huella = db.huella_datos(TABLAS_POR_REPORTE[tipo])
+        if huella is None:
+            return generar(ruta_destino)
+
+        extension = os.path.splitext(ruta_destino)[1].lower()
+        entrada = os.path.join(self.carpeta, f"{tipo}_{clave_reporte(tipo, parametros, huella)}{extension}")
+        if os.path.exists(entrada):
+            try:
+                if progreso:
+                    progreso("Copiando desde la caché de reportes", 90)
+                shutil.copyfile(entrada, ruta_destino)
+                os.utime(entrada)  # uso reciente: lo último en desalojarse
+                logger.info("Reporte '%s' servido desde la caché (%s)", tipo, entrada)
+                return True, ruta_destino
+            except PermissionError:
+                return False, "No se pudo guardar el archivo. Asegúrate de que no esté abierto."
+            except OSError as e:
+                logger.warning("No se pudo usar la entrada %s de la caché: %s", entrada, e)
+
+        ok, resultado = generar(ruta_destino)
+        if ok and db.huella_datos(TABLAS_POR_REPORTE[tipo]) == huella:
+            self._guardar(ruta_destino, entrada)
+        return ok, resultado
+
+    def _guardar(self, ruta_generada, entrada):
+        temporal = f"{entrada}.{os.getpid()}_{threading.get_ident()}.tmp"
+        try:
+            os.makedirs(self.carpeta, exist_ok=True)
+            shutil.copyfile(ruta_generada, temporal)
+            os.replace(temporal, entrada)
+        except OSError as e:
+            logger.warning("No se pudo guardar el reporte en la caché: %s", e)
+            if os.path.exists(temporal):
+                os.remove(temporal)
+            return
+        self.podar()
+
+    def podar(self):
+        """Borra las entradas más viejas que max_dias y, si sobra tamaño, las menos usadas."""
+        try:
+            nombres = os.listdir(self.carpeta)
+        except OSError:
+            return
+        limite = time.time() - self.max_dias * 86400
+        entradas = []
+        for nombre in nombres:
+            ruta = os.path.join(self.carpeta, nombre)
+            try:
+                st = os.stat(ruta)
+            except OSError:
+                continue
+            if st.st_mtime < limite:
+                self._borrar(ruta)
+            elif not nombre.endswith(".tmp"):
+                entradas.append((st.st_mtime, st.st_size, ruta))
+
+        total = sum(tamano for _, tamano, _ in entradas)
+        for _, tamano, ruta in sorted(entradas):
+            if total <= self.max_bytes:
+                break
+            self._borrar(ruta)
+            total -= tamano
+
+    @staticmethod
+    def _borrar(ruta):
+        try:
+            os.remove(ruta)
+        except OSError:
+            pass
@@ -0,0 +1,131 @@
+"""
+Carga de datos en segundo plano para las pestañas y ventanas.
+
+Las consultas se ejecutan en el QThreadPool global y el resultado vuelve al
+hilo de la interfaz por señal. Cada petición lleva un número de generación:
+si mientras tanto se pidió otra (p. ej. el usuario cambió un filtro), el
+resultado viejo se descarta al llegar en lugar de pisar al nuevo.
+
+Uso típico en una pestaña:
+
+    self.cargador = CargadorDatos(self)
+    self.cargador.cargando.connect(self.lbl_cargando.setVisible)
+    ...
+    self.cargador.solicitar(lambda: self.db.obtener_algo(filtros), self._mostrar)
+
+La función se ejecuta en otro hilo: solo debe consultar la base (DatabaseManager
+usa una conexión de lectura propia por hilo), nunca tocar widgets.
+"""
+import itertools
+import logging
+import time
+
+from PyQt6.QtCore import QObject, QRunnable, QThreadPool, pyqtSignal
+from PyQt6.QtWidgets import QLabel
+
+import perfil_arranque
+
+logger = logging.getLogger(__name__)
+
+
+class _SenalesTarea(QObject):
+    terminado = pyqtSignal(int, object)
+    fallo = pyqtSignal(int, str)
+
+
+class _TareaConsulta(QRunnable):
+    def __init__(self, generacion, funcion, senales):
+        super().__init__()
+        self.generacion = generacion
+        self.funcion = funcion
+        self.senales = senales
+
+    def run(self):
+        try:
+            resultado = self.funcion()
+        except Exception as e:
+            logger.exception("Error en consulta en segundo plano: %s", e)
+            self.senales.fallo.emit(self.generacion, str(e))
+            return
+        self.senales.terminado.emit(self.generacion, resultado)
+
+
+class CargadorDatos(QObject):
+    """
+    Ejecuta consultas en segundo plano y entrega solo el resultado de la
+    petición más reciente. 'cargando' se emite con True al empezar y con False
+    cuando llega (o falla) la última petición.
+    """
+    cargando = pyqtSignal(bool)
+
+    _contador = itertools.count(1)
+
+    def __init__(self, parent=None, pool=None, nombre=None):
+        super().__init__(parent)
+        self._pool = pool or QThreadPool.globalInstance()
+        self._generacion = 0
+        self._callbacks = None
+        self._pendientes = {}
+        # 'nombre' identifica la primera carga en el perfil de arranque
+        self.nombre = nombre
+        self._inicio = None
+
+    @property
+    def ocupado(self):
+        return self._callbacks is not None
+
+    def solicitar(self, funcion, al_terminar, al_fallar=None):
+        """Lanza 'funcion()' en segundo plano; devuelve la generación asignada."""
+        generacion = next(self._contador)
+        self._generacion = generacion
+        self._callbacks = (al_terminar, al_fallar)
+
+        senales = _SenalesTarea()
+        senales.terminado.connect(self._on_terminado)
+        senales.fallo.connect(self._on_fallo)
+        # Se guarda la referencia hasta que la tarea responda (si no, Python la libera)
+        self._pendientes[generacion] = senales
+        if self._inicio is None:
+            self._inicio = time.perf_counter()
+        self._pool.start(_TareaConsulta(generacion, funcion, senales))
+        self.cargando.emit(True)
+        return generacion
+
+    def cancelar(self):
+        """Descarta el resultado de la petición en curso (la consulta termina igual)."""
+        if self._callbacks is not None:
+            self._callbacks = None
+            self._generacion = next(self._contador)
+            self.cargando.emit(False)
+
+    def _vigente(self, generacion):
+        self._pendientes.pop(generacion, None)
+        if generacion != self._generacion or self._callbacks is None:
+            logger.debug("Resultado obsoleto descartado (generación %s)", generacion)
+            return None
+        callbacks, self._callbacks = self._callbacks, None
+        self.cargando.emit(False)
+        return callbacks
+
+    def _on_terminado(self, generacion, resultado):
+        callbacks = self._vigente(generacion)
+        if callbacks:
+            callbacks[0](resultado)
+            if self.nombre and self._inicio:
+                perfil_arranque.registrar_tramo(f"primera carga '{self.nombre}'", self._inicio)
+                self._inicio = False  # solo la primera
+
+    def _on_fallo(self, generacion, mensaje):
+        callbacks = self._vigente(generacion)
+        if callbacks and callbacks[1]:
+            callbacks[1](mensaje)
+
+
+class IndicadorCarga(QLabel):
+    """Etiqueta 'Cargando...' que se muestra mientras un CargadorDatos trabaja."""
+
+    def __init__(self, cargador, texto="Cargando datos...", parent=None):
+        super().__init__(texto, parent)
+        self.setStyleSheet("color: #777; font-style: italic;")
+        self.setVisible(False)
+        cargador.cargando.connect(self.setVisible)
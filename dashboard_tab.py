@@ -4,7 +4,16 @@ from PyQt6.QtWidgets import (
 )
 from PyQt6.QtCore import Qt
 from PyQt6.QtGui import QFont
+import calendar
 from datetime import datetime
+from barra_filtros import ControladorFiltros
+from grafico_tendencia import GraficoTendencia, SerieTendencia, PALETA
+
+# Views of the trend panel
+VISTA_RESULTADO = "Ingresos, gastos y beneficio"
+VISTA_HORAS = "Horas"
+VISTA_EQUIPOS = "Ingresos por equipo"
+MAX_EQUIPOS_TENDENCIA = 6  # the rest are added up as "Otros"
 
 class DashboardTab(QWidget):
     """
@@ -17,12 +26,20 @@ class DashboardTab(QWidget):
 
         self.meses_mapa = {
             "Enero": 1, "Febrero": 2, "Marzo": 3, "Abril": 4, "Mayo": 5, "Junio": 6,
-            "Julio": 7, "Agosto": 8, "Septiembre": 9, "Octubre": 10, "Noviembre": 11, "Diciembre": 12
+            "Julio": 7, "Agosto": 8, "Septiembre": 9, "Octubre": 10, "Noviembre": 11, "Diciembre": 12,
+            "Año completo": None
         }
         self.equipos_mapa = {}
+        # Trend rows of (project, year); month and equipment switches reuse them
+        self._tendencia = []
+        self._tendencia_clave = None
+        self.control_filtros = ControladorFiltros(self._estado_filtros, lambda _estado: self.refrescar_datos(),
+                                                  parent=self)
 
         self._setup_ui()
         # Initial data load will be triggered by the main app after setting the project
+        self.destroyed.connect(self.db.cambios.suscribir(
+            self._on_cambio_datos, tablas=("transacciones", "pagos", "equipos", "equipos_entidades")))
         
     def _crear_tarjeta_kpi(self, titulo, style_sheet="color: #333;"):
         """Creates a KPI card using QGroupBox and QLabel."""
@@ -93,10 +110,23 @@ class DashboardTab(QWidget):
         # Esto le dice que tome todo el espacio vertical restante.
         main_layout.addLayout(grid_layout, stretch=1)
 
+        # --- Trend panel: the 12 months of the selected year ---
+        tendencia_group = QGroupBox("Tendencia del año")
+        tendencia_layout = QVBoxLayout(tendencia_group)
+        selector_layout = QHBoxLayout()
+        selector_layout.addWidget(QLabel("Ver:"))
+        self.combo_tendencia = QComboBox()
+        self.combo_tendencia.addItems([VISTA_RESULTADO, VISTA_HORAS, VISTA_EQUIPOS])
+        selector_layout.addWidget(self.combo_tendencia)
+        selector_layout.addStretch()
+        tendencia_layout.addLayout(selector_layout)
+        self.grafico_tendencia = GraficoTendencia()
+        tendencia_layout.addWidget(self.grafico_tendencia)
+        main_layout.addWidget(tendencia_group, stretch=1)
+
         # --- Connections ---
-        self.combo_anio.currentIndexChanged.connect(self.refrescar_datos)
-        self.combo_mes.currentIndexChanged.connect(self.refrescar_datos)
-        self.combo_equipo.currentIndexChanged.connect(self.refrescar_datos)
+        self.control_filtros.vigilar(self.combo_anio, self.combo_mes, self.combo_equipo)
+        self.combo_tendencia.currentIndexChanged.connect(lambda _indice: self._mostrar_tendencia())
 
     def configurar_filtros(self):
         """Populates the filter combo boxes with data from the database."""
@@ -116,11 +146,7 @@ class DashboardTab(QWidget):
             self.combo_anio.setCurrentText(str(datetime.now().year))
         
         # Populate Teams
-        self.combo_equipo.clear()
-        equipos = self.db.obtener_todos_los_equipos() or []
-        self.equipos_mapa = {e['nombre']: e['id'] for e in equipos}
-        self.combo_equipo.addItem("Todos", -1) # Use -1 for "All"
-        self.combo_equipo.addItems(sorted(self.equipos_mapa.keys()))
+        self._poblar_equipos()
 
         # Set current month
         nombre_mes_actual = list(self.meses_mapa.keys())[datetime.now().month - 1]
@@ -131,7 +157,58 @@ class DashboardTab(QWidget):
         self.combo_mes.blockSignals(False)
         self.combo_equipo.blockSignals(False)
         
-        self.refrescar_datos()
+        self.control_filtros.refrescar_ahora()
+
+    def _poblar_equipos(self):
+        """Fills the equipment combo, keeping the current selection if it still exists."""
+        seleccion = self.combo_equipo.currentText()
+        bloqueado = self.combo_equipo.blockSignals(True)
+        self.combo_equipo.clear()
+        equipos = self.db.obtener_todos_los_equipos() or []
+        self.equipos_mapa = {e['nombre']: e['id'] for e in equipos}
+        self.combo_equipo.addItem("Todos", -1) # Use -1 for "All"
+        self.combo_equipo.addItems(sorted(self.equipos_mapa.keys()))
+        if seleccion:
+            self.combo_equipo.setCurrentText(seleccion)
+        self.combo_equipo.blockSignals(bloqueado)
+
+    def _periodo_mostrado(self):
+        """('YYYY-MM-DD', 'YYYY-MM-DD') covered by the selected year/month, or None."""
+        if not self.combo_anio.currentText() or not self.combo_mes.currentText():
+            return None
+        anio = int(self.combo_anio.currentText())
+        mes = self.meses_mapa[self.combo_mes.currentText()]
+        if mes is None:
+            return f"{anio}-01-01", f"{anio}-12-31"
+        return f"{anio}-{mes:02d}-01", f"{anio}-{mes:02d}-{calendar.monthrange(anio, mes)[1]:02d}"
+
+    def _on_cambio_datos(self, cambio):
+        """Change notice from db.cambios: refresh only what the change can alter."""
+        if not self.proyecto_actual or not cambio.es_del_proyecto(self.proyecto_actual['id']):
+            return
+        if cambio.tabla == "equipos":
+            self._poblar_equipos()
+        periodo = self._periodo_mostrado()
+        if periodo is None:
+            return
+        anio = periodo[0][:4]
+        if cambio.tabla in ("equipos", "equipos_entidades") or cambio.cruza_rango(f"{anio}-01-01", f"{anio}-12-31"):
+            # The trend panel covers the whole year. Debounced, so the notices
+            # of a single save end up in one refresh
+            self._tendencia_clave = None
+            self.control_filtros.invalidar()
+            self.control_filtros.programar()
+        else:
+            # Outside the selected year only the all-time pending balance can move
+            moneda = self.proyecto_actual.get('moneda', 'RD$')
+            pendiente = self.db.obtener_saldo_pendiente_proyecto(self.proyecto_actual['id'])
+            self.lbl_pendiente.setText(f"{moneda} {pendiente:,.2f}")
+
+    def _estado_filtros(self):
+        """Snapshot of the filter bar, used to skip refreshes that change nothing."""
+        proyecto_id = self.proyecto_actual['id'] if self.proyecto_actual else None
+        return (proyecto_id, self.combo_anio.currentText(), self.combo_mes.currentText(),
+                self.combo_equipo.currentText())
 
     def refrescar_datos(self):
         """Fetches new KPI data from the database and updates the UI."""
@@ -144,6 +221,7 @@ class DashboardTab(QWidget):
         equipo_nombre = self.combo_equipo.currentText()
         equipo_id = self.equipos_mapa.get(equipo_nombre) if equipo_nombre != "Todos" else None
 
+        self._cargar_tendencia(anio)
         kpis = self.db.obtener_kpis_dashboard(self.proyecto_actual['id'], anio, mes, equipo_id)
         if not kpis:
             # If no data, clear the labels
@@ -172,4 +250,57 @@ class DashboardTab(QWidget):
         
         top_operador_horas = kpis.get('top_operador_horas', 0.0)
         top_operador_nombre = kpis.get('top_operador_nombre', 'N/A')
-        self.lbl_top_operador.setText(f"{top_operador_nombre}\n({top_operador_horas:.2f} Horas)")
\ No newline at end of file
+        self.lbl_top_operador.setText(f"{top_operador_nombre}\n({top_operador_horas:.2f} Horas)")
+
+    def _cargar_tendencia(self, anio):
+        """Runs the grouped trend query only when the project or the year changes."""
+        clave = (self.proyecto_actual['id'], anio)
+        if clave != self._tendencia_clave:
+            self._tendencia = self.db.obtener_tendencia_anual(*clave)
+            self._tendencia_clave = clave
+        self._mostrar_tendencia()
+
+    def _mostrar_tendencia(self):
+        """Builds the series of the selected view (honouring the equipment filter) for the chart."""
+        filas = self._tendencia
+        equipo_nombre = self.combo_equipo.currentText()
+        if equipo_nombre != "Todos" and equipo_nombre in self.equipos_mapa:
+            filas = [f for f in filas if f['equipo_id'] == self.equipos_mapa[equipo_nombre]]
+
+        vista = self.combo_tendencia.currentText()
+        if vista == VISTA_EQUIPOS:
+            self.grafico_tendencia.mostrar(self._series_por_equipo(filas))
+            return
+
+        ingresos, gastos, horas = [0.0] * 12, [0.0] * 12, [0.0] * 12
+        for fila in filas:
+            mes = fila['mes'] - 1
+            ingresos[mes] += fila['ingresos'] or 0.0
+            gastos[mes] += fila['gastos'] or 0.0
+            horas[mes] += fila['horas'] or 0.0
+        if vista == VISTA_HORAS:
+            series = [SerieTendencia("Horas", "#8E44AD", horas, barras=True)]
+        else:
+            series = [
+                SerieTendencia("Ingresos", "#2E8B57", ingresos, barras=True),
+                SerieTendencia("Gastos", "#C0392B", gastos, barras=True),
+                SerieTendencia("Beneficio", "#00529B", [i - g for i, g in zip(ingresos, gastos)]),
+            ]
+        self.grafico_tendencia.mostrar(series)
+
+    @staticmethod
+    def _series_por_equipo(filas):
+        """Monthly income per equipment: one line for each top earner, the rest as "Otros"."""
+        por_equipo = {}
+        for fila in filas:
+            if not fila['ingresos']:
+                continue
+            valores = por_equipo.setdefault(fila['equipo'], [0.0] * 12)
+            valores[fila['mes'] - 1] += fila['ingresos']
+        ranking = sorted(por_equipo.items(), key=lambda item: sum(item[1]), reverse=True)
+        series = [SerieTendencia(nombre, PALETA[i % len(PALETA)], valores)
+                  for i, (nombre, valores) in enumerate(ranking[:MAX_EQUIPOS_TENDENCIA])]
+        if len(ranking) > MAX_EQUIPOS_TENDENCIA:
+            otros = [sum(valores[mes] for _, valores in ranking[MAX_EQUIPOS_TENDENCIA:]) for mes in range(12)]
+            series.append(SerieTendencia("Otros", "#AAAAAA", otros))
+        return series
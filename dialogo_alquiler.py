@@ -22,7 +22,9 @@ from PyQt6.QtWidgets import (
 from PyQt6.QtCore import QDate
 from PyQt6.QtGui import QImage
 
-from mini_editor_imagen import MiniEditorImagen  # Debe existir en el proyecto
+from eventos_datos import ALTA
+
+# MiniEditorImagen (y con él Pillow) se importa al abrir el editor, no al cargar el módulo
 
 # Intentar importar guardar_conduce desde utils.adjuntos o desde adjuntos en la raíz
 try:
@@ -237,6 +239,7 @@ class DialogoAlquiler(QDialog):
 
                 if ext in [".jpg", ".jpeg", ".png", ".bmp", ".tiff", ".webp"]:
                     # 2a. Abrir el editor
+                    from mini_editor_imagen import MiniEditorImagen
                     editor = MiniEditorImagen(file_path, width=1200, height=800, parent=self)
                     if not editor.exec():
                         return  # Usuario canceló editor
@@ -399,6 +402,8 @@ class DialogoAlquiler(QDialog):
                 'conduce_adjunto_path': self.adjunto_path,
                 'equipo_id': datos['equipo_id'],
             })
+            # Insert propio (no pasa por DatabaseManager): avisar a las vistas
+            db.notificar_cambio("transacciones", ALTA, (new_id,), datos['proyecto_id'], (datos['fecha'],))
 
             QMessageBox.information(self, "Éxito", "Alquiler registrado correctamente.")
             self.accept()
@@ -467,6 +472,7 @@ class DialogoAlquiler(QDialog):
             temp_file = None
             try:
                 if ext in [".jpg", ".jpeg", ".png", ".bmp", ".tiff", ".webp"]:
+                    from mini_editor_imagen import MiniEditorImagen
                     editor = MiniEditorImagen(file_path, width=1200, height=800, parent=self)
                     if not editor.exec():
                         return
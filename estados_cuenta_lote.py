@@ -0,0 +1,164 @@
+"""
+Estados de cuenta en lote: uno por cada cliente del proyecto en un rango de
+fechas, en una carpeta (o un .zip) con nombres de utils_nombre.
+
+Las facturas y abonos de todos los clientes salen de dos consultas agrupadas
+(DatabaseManager.obtener_estados_cuenta_por_cliente) y cada PDF se construye
+en un proceso del pool, así el lote escala con los núcleos disponibles. Se
+lanza como trabajo de trabajos_reportes:
+
+    self.servicio_reportes.lanzar("Estados de cuenta en lote", lambda progreso:
+        generar_estados_cuenta_lote(self.db, proyecto, desde, hasta, carpeta, progreso=progreso))
+
+Los procesos solo reciben dicts con las filas ya leídas; no abren la base.
+Arrancan con "spawn" en todas las plataformas: el pool se crea desde un hilo
+de una aplicación Qt, que no se puede bifurcar con fork sin riesgo de bloqueo.
+"""
+import logging
+import multiprocessing
+import os
+import shutil
+import zipfile
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+
+from cache_conduces import preparar_conduces
+from utils_nombre import generar_nombre_archivo, limpiar_nombre
+
+logger = logging.getLogger(__name__)
+
+COLUMN_MAP = {
+    'fecha': 'Fecha',
+    'conduce': 'Conduce',
+    'ubicacion': 'Ubicación',
+    'equipo_nombre': 'Equipo',
+    'horas': 'Horas',
+    'monto': 'Monto',
+    'conduce_adjunto_path': 'ConduceAdjunto',
+}
+
+
+def _generar_estado_cuenta(cliente, ruta, encabezado):
+    """Se ejecuta en un proceso del pool: escribe el PDF de un cliente."""
+    from report_generator import ReportGenerator
+
+    total_facturado = sum(float(f['monto'] or 0) for f in cliente['facturas'])
+    total_abonado = sum(float(a['monto'] or 0) for a in cliente['abonos'])
+    rg = ReportGenerator(
+        data=cliente['facturas'],
+        title=f"ESTADO DE CUENTA - {cliente['cliente_nombre']}",
+        cliente=cliente['cliente_nombre'],
+        column_map=COLUMN_MAP,
+        abonos=cliente['abonos'],
+        total_facturado=total_facturado,
+        total_abonado=total_abonado,
+        saldo=total_facturado - total_abonado,
+        procesos_anexos=1,  # los conduces ya se redujeron antes de repartir el lote
+        **encabezado
+    )
+    ok, error = rg.to_pdf(ruta)
+    return cliente['cliente_nombre'], ok, error
+
+
+def _nombres_archivo(clientes):
+    """Un nombre por cliente; si dos limpian igual, el segundo lleva sufijo."""
+    usados = set()
+    nombres = []
+    for cliente in clientes:
+        nombre = generar_nombre_archivo(cliente['cliente_nombre'] or f"Cliente_{cliente['cliente_id']}")
+        base, extension = os.path.splitext(nombre)
+        sufijo = 2
+        while nombre.lower() in usados:
+            nombre = f"{base}_{sufijo}{extension}"
+            sufijo += 1
+        usados.add(nombre.lower())
+        nombres.append(nombre)
+    return nombres
+
+
+def generar_estados_cuenta_lote(
+    db, proyecto, fecha_inicio, fecha_fin, destino,
+    carpeta_conduces=None, comprimir=False, procesos=None, progreso=None
+):
+    """
+    Genera los estados de cuenta de todos los clientes del proyecto.
+    - destino: carpeta donde se crea la subcarpeta (o el .zip) del lote.
+    - procesos: tamaño del pool; por defecto, uno por núcleo.
+    - progreso: progreso(seccion, porcentaje), ver trabajos_reportes.
+    Devuelve (ok, ruta de la carpeta o del zip | mensaje de error).
+    """
+    progreso = progreso or (lambda seccion, porcentaje: None)
+    progreso("Consultando facturas y abonos", 2)
+    clientes = db.obtener_estados_cuenta_por_cliente(proyecto['id'], fecha_inicio, fecha_fin)
+    if not clientes:
+        return False, "No hay facturas de clientes en el período seleccionado."
+
+    if carpeta_conduces:
+        # Todos los conduces del lote se reducen antes, en paralelo; así cada
+        # estado de cuenta solo incrusta versiones ya hechas
+        adjuntos = [
+            os.path.normpath(os.path.join(carpeta_conduces, factura['conduce_adjunto_path']))
+            for cliente in clientes for factura in cliente['facturas'] if factura['conduce_adjunto_path']
+        ]
+        preparar_conduces(
+            [ruta for ruta in adjuntos if os.path.exists(ruta)], procesos=procesos,
+            progreso=lambda hechos, total: progreso(f"Conduces: {hechos} de {total}", 2 + 3 * hechos // total)
+        )
+
+    base = os.path.join(
+        destino,
+        f"Estados_Cuenta_{limpiar_nombre(proyecto['nombre'])}_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+    )
+    carpeta, sufijo = base, 2
+    while os.path.exists(carpeta) or os.path.exists(f"{carpeta}.zip"):
+        carpeta = f"{base}_{sufijo}"
+        sufijo += 1
+    os.makedirs(carpeta)
+    encabezado = {
+        'project_name': proyecto['nombre'],
+        'date_range': f"{fecha_inicio} a {fecha_fin}",
+        'currency_symbol': proyecto.get('moneda', 'RD$'),
+        'carpeta_conduces': carpeta_conduces,
+    }
+    rutas = [os.path.join(carpeta, nombre) for nombre in _nombres_archivo(clientes)]
+
+    procesos = min(procesos or os.cpu_count() or 1, len(clientes))
+    fallidos = []
+
+    try:
+        with ProcessPoolExecutor(max_workers=procesos, mp_context=multiprocessing.get_context("spawn")) as pool:
+            futuros = [
+                pool.submit(_generar_estado_cuenta, cliente, ruta, encabezado)
+                for cliente, ruta in zip(clientes, rutas)
+            ]
+            try:
+                for hechos, futuro in enumerate(as_completed(futuros), 1):
+                    nombre, ok, error = futuro.result()
+                    if not ok:
+                        fallidos.append(f"{nombre}: {error}")
+                    progreso(f"Clientes: {hechos} de {len(futuros)}", 5 + 85 * hechos // len(futuros))
+            except BaseException:
+                pool.shutdown(wait=True, cancel_futures=True)
+                raise
+    except BaseException:
+        # Cancelado o fallido: no se deja un lote a medias
+        shutil.rmtree(carpeta, ignore_errors=True)
+        raise
+
+    for fallo in fallidos:
+        logger.warning("Estado de cuenta en lote no generado: %s", fallo)
+    if len(fallidos) == len(clientes):
+        shutil.rmtree(carpeta, ignore_errors=True)
+        return False, f"No se generó ningún estado de cuenta ({fallidos[0]})"
+
+    if not comprimir:
+        return True, carpeta
+
+    progreso("Comprimiendo", 95)
+    ruta_zip = f"{carpeta}.zip"
+    with zipfile.ZipFile(ruta_zip, "w", zipfile.ZIP_DEFLATED) as archivo_zip:
+        for ruta in rutas:
+            if os.path.exists(ruta):
+                archivo_zip.write(ruta, os.path.basename(ruta))
+    shutil.rmtree(carpeta, ignore_errors=True)
+    return True, ruta_zip
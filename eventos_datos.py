@@ -0,0 +1,106 @@
+"""
+Avisos de cambios en los datos.
+
+Cada método de DatabaseManager que escribe (alta, edición o baja) publica,
+una vez confirmado el cambio, un CambioDatos en db.cambios con la tabla, las
+claves afectadas, el proyecto y el rango de fechas que toca. Las vistas se
+suscriben y solo se refrescan si el cambio cruza lo que muestran:
+
+    self._cancelar_aviso = self.db.cambios.suscribir(self._on_cambio_datos, tablas=("transacciones",))
+    self.destroyed.connect(self._cancelar_aviso)
+
+    def _on_cambio_datos(self, cambio):
+        if cambio.afecta(self.proyecto_id, desde, hasta):
+            ...
+
+Así un abono registrado en la gestión de abonos o un gasto guardado en su
+pestaña llega a las demás vistas sin que una tenga que recargar a mano la otra.
+
+Los suscriptores se llaman en el hilo que escribió; en esta aplicación todas
+las escrituras se hacen desde la interfaz. Un suscriptor que falla se registra
+en el log pero no deshace ni interrumpe la escritura que ya se confirmó.
+"""
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+ALTA = "alta"
+EDICION = "edicion"
+BAJA = "baja"
+
+# A partir de cuántas filas de un mismo aviso conviene recargar la vista entera
+# en lugar de aplicar los cambios fila a fila
+MAX_FILAS_POR_AVISO = 50
+
+
+class CambioDatos:
+    """
+    Un cambio confirmado. 'claves' vacío significa "no se sabe qué filas"
+    (refrescar entero); proyecto_id o fechas en None, que puede tocar cualquiera.
+    """
+
+    __slots__ = ("tabla", "operacion", "claves", "proyecto_id", "fecha_desde", "fecha_hasta")
+
+    def __init__(self, tabla, operacion, claves=(), proyecto_id=None, fecha_desde=None, fecha_hasta=None):
+        self.tabla = tabla
+        self.operacion = operacion
+        self.claves = tuple(claves)
+        self.proyecto_id = proyecto_id
+        self.fecha_desde = fecha_desde
+        self.fecha_hasta = fecha_hasta
+
+    def es_del_proyecto(self, proyecto_id):
+        return self.proyecto_id is None or proyecto_id is None or str(self.proyecto_id) == str(proyecto_id)
+
+    def cruza_rango(self, desde=None, hasta=None):
+        """True si el rango del cambio se solapa con [desde, hasta] ('YYYY-MM-DD')."""
+        if self.fecha_desde is None or self.fecha_hasta is None:
+            return True
+        if hasta and self.fecha_desde > hasta:
+            return False
+        if desde and self.fecha_hasta < desde:
+            return False
+        return True
+
+    def afecta(self, proyecto_id, desde=None, hasta=None):
+        return self.es_del_proyecto(proyecto_id) and self.cruza_rango(desde, hasta)
+
+    def __repr__(self):
+        return (f"CambioDatos({self.tabla}, {self.operacion}, claves={self.claves!r}, "
+                f"proyecto={self.proyecto_id}, {self.fecha_desde}..{self.fecha_hasta})")
+
+
+class BusCambios:
+    """Reparte los CambioDatos entre los suscriptores interesados en cada tabla."""
+
+    def __init__(self):
+        self._suscripciones = []
+        self._lock = threading.Lock()
+
+    def suscribir(self, callback, tablas=None):
+        """
+        Llama a callback(cambio) por cada cambio en 'tablas' (todas si es None).
+        Devuelve una función que cancela la suscripción.
+        """
+        suscripcion = (callback, frozenset(tablas) if tablas else None)
+        with self._lock:
+            self._suscripciones.append(suscripcion)
+
+        def cancelar(*args):
+            with self._lock:
+                if suscripcion in self._suscripciones:
+                    self._suscripciones.remove(suscripcion)
+        return cancelar
+
+    def emitir(self, cambio):
+        with self._lock:
+            suscripciones = list(self._suscripciones)
+        logger.debug("Cambio de datos: %r", cambio)
+        for callback, tablas in suscripciones:
+            if tablas is not None and cambio.tabla not in tablas:
+                continue
+            try:
+                callback(cambio)
+            except Exception:
+                logger.exception("Error en un suscriptor de cambios (%r)", cambio)
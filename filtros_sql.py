@@ -0,0 +1,259 @@
+"""
+Compilador de filtros para los listados del libro de transacciones.
+
+Convierte el diccionario de filtros que arman las pestañas (cliente, equipo,
+cuenta, rango de fechas, texto...) en un predicado SQL que SQLite puede
+resolver con un recorrido por rango de índice:
+
+- Las fechas se comparan contra la columna desnuda (nunca date(t.fecha)).
+  El límite superior se expresa como "< date(:fecha_fin, '+1 day')" para que
+  también incluya valores con hora sin envolver la columna.
+- El texto SQL resultante se guarda en caché por "forma" de filtro (qué claves
+  están activas), así sqlite3 reutiliza la sentencia ya preparada.
+- No se fuerza ningún índice: el planificador de SQLite elige el más
+  selectivo para cada combinación de filtros con las estadísticas de ANALYZE
+  (ver DatabaseManager.actualizar_estadisticas).
+- Los listados pueden pedirse por páginas (keyset): cada página continúa
+  después de la última fila de la anterior, sin OFFSET ni cursores abiertos.
+"""
+import threading
+
+# Operadores soportados por los campos de filtro
+IGUAL = "="
+DESDE = ">="
+HASTA = "<="
+TEXTO = "like"
+
+
+class ConsultaListado:
+    """
+    Describe un listado filtrable: el SELECT base, las condiciones fijas y los
+    filtros opcionales que acepta.
+
+    'campos' mapea la clave del diccionario de filtros a (columnas, operador).
+    Para TEXTO, 'columnas' es una tupla de columnas sobre las que se aplica LIKE;
+    para el resto es el nombre de una única columna de la tabla principal.
+
+    'claves_pagina' son las columnas del ORDER BY (todas descendentes) que
+    identifican la posición de una fila para paginar; deben estar en el SELECT.
+    'totales' es la lista de agregados (SQL) que devuelve compilar_totales().
+    """
+
+    _cache_sql = {}
+    _lock_cache = threading.Lock()
+
+    def __init__(self, nombre, select, tabla, alias, condiciones_fijas,
+                 campos, orden, claves_pagina=("fecha", "id"), totales=None):
+        self.nombre = nombre
+        self.select = select
+        self.tabla = tabla
+        self.alias = alias
+        self.condiciones_fijas = condiciones_fijas
+        self.campos = campos
+        self.orden = orden
+        self.claves_pagina = tuple(claves_pagina)
+        self.totales = totales
+
+    def compilar(self, filtros, params_fijos, despues_de=None, limite=None):
+        """
+        Devuelve (sql, params) para los filtros dados. Un filtro se considera
+        activo si su valor es "verdadero", igual que en los listados originales.
+
+        Con 'limite' se devuelve una sola página de ese tamaño; 'despues_de' es la
+        tupla de valores de claves_pagina de la última fila ya obtenida.
+        """
+        activos, params = self._preparar(filtros, params_fijos)
+        pagina = "continuar" if despues_de is not None else ("primera" if limite else None)
+        sql = self._sql_en_cache((self.nombre, activos, pagina),
+                                 lambda: self._construir_sql(activos, pagina))
+        if pagina:
+            params["_limite"] = int(limite)
+        if despues_de is not None:
+            for columna, valor in zip(self.claves_pagina, despues_de):
+                params[f"_despues_{columna}"] = valor
+        return sql, params
+
+    def compilar_totales(self, filtros, params_fijos):
+        """Devuelve (sql, params) de los agregados 'totales' con los mismos filtros."""
+        activos, params = self._preparar(filtros, params_fijos)
+        sql = self._sql_en_cache((self.nombre, activos, "totales"),
+                                 lambda: self._construir_sql_totales(activos))
+        return sql, params
+
+    def compilar_fila(self, filtros, params_fijos, id_fila):
+        """
+        Devuelve (sql, params) que trae solo la fila 'id_fila' con la forma del
+        listado, o ninguna si ya no cumple los filtros. Va por la clave primaria.
+        """
+        activos, params = self._preparar(filtros, params_fijos)
+        sql = self._sql_en_cache((self.nombre, activos, "fila"),
+                                 lambda: self._construir_sql(activos, "fila"))
+        params["_id_fila"] = id_fila
+        return sql, params
+
+    def _preparar(self, filtros, params_fijos):
+        filtros = filtros or {}
+        activos = tuple(clave for clave in self.campos if filtros.get(clave))
+        params = dict(params_fijos)
+        for clave in activos:
+            columnas, operador = self.campos[clave]
+            valor = filtros[clave]
+            params[clave] = f"%{valor}%" if operador == TEXTO else valor
+        return activos, params
+
+    def _sql_en_cache(self, clave_cache, construir):
+        sql = self._cache_sql.get(clave_cache)
+        if sql is None:
+            sql = construir()
+            with self._lock_cache:
+                self._cache_sql[clave_cache] = sql
+        return sql
+
+    def _desde(self):
+        return f"{self.tabla} {self.alias}"
+
+    def _condiciones(self, activos):
+        a = self.alias
+        condiciones = list(self.condiciones_fijas)
+        for clave in activos:
+            columnas, operador = self.campos[clave]
+            if operador == IGUAL:
+                condiciones.append(f"{a}.{columnas} = :{clave}")
+            elif operador == DESDE:
+                condiciones.append(f"{a}.{columnas} >= :{clave}")
+            elif operador == HASTA:
+                condiciones.append(f"{a}.{columnas} < date(:{clave}, '+1 day')")
+            elif operador == TEXTO:
+                partes = " OR ".join(f"{a}.{col} LIKE :{clave}" for col in columnas)
+                condiciones.append(f"({partes})")
+        return condiciones
+
+    def _condicion_despues_de(self):
+        """
+        Filas posteriores (en orden descendente) a la última de la página anterior.
+        La primera clave se repite como rango simple para que el índice la use.
+        """
+        a = self.alias
+        primera = self.claves_pagina[0]
+        columnas = ", ".join(f"{a}.{c}" for c in self.claves_pagina)
+        valores = ", ".join(f":_despues_{c}" for c in self.claves_pagina)
+        return f"{a}.{primera} <= :_despues_{primera} AND ({columnas}) < ({valores})"
+
+    def _construir_sql(self, activos, pagina=None):
+        condiciones = self._condiciones(activos)
+        if pagina == "continuar":
+            condiciones.append(self._condicion_despues_de())
+        elif pagina == "fila":
+            condiciones.append(f"{self.alias}.id = :_id_fila")
+        sql = self.select.format(desde=self._desde())
+        sql += " WHERE " + " AND ".join(condiciones)
+        if pagina == "fila":
+            return sql
+        sql += " ORDER BY " + self.orden
+        if pagina:
+            sql += " LIMIT :_limite"
+        return sql
+
+    def _construir_sql_totales(self, activos):
+        if not self.totales:
+            raise ValueError(f"El listado '{self.nombre}' no define totales")
+        sql = f"SELECT {', '.join(self.totales)} FROM {self._desde()}"
+        sql += " WHERE " + " AND ".join(self._condiciones(activos))
+        return sql
+
+
+# --- LISTADOS DEL LIBRO ---
+
+ALQUILERES = ConsultaListado(
+    nombre="alquileres",
+    select="""
+        SELECT
+            t.id, t.fecha, t.conduce, t.ubicacion, t.horas, t.precio_por_hora,
+            t.monto, t.pagado, t.monto_pagado, t.conduce_adjunto_path,
+            EQ.nombre AS equipo_nombre,
+            CLI.nombre AS cliente_nombre,
+            OPE.nombre AS operador_nombre
+        FROM {desde}
+        LEFT JOIN equipos EQ ON t.equipo_id = EQ.id
+        LEFT JOIN equipos_entidades CLI ON t.cliente_id = CLI.id
+        LEFT JOIN equipos_entidades OPE ON t.operador_id = OPE.id
+    """,
+    tabla="transacciones",
+    alias="t",
+    condiciones_fijas=("t.proyecto_id = :proyecto_id", "t.tipo = 'Ingreso'"),
+    campos={
+        "cliente_id": ("cliente_id", IGUAL),
+        "operador_id": ("operador_id", IGUAL),
+        "equipo_id": ("equipo_id", IGUAL),
+        "fecha_inicio": ("fecha", DESDE),
+        "fecha_fin": ("fecha", HASTA),
+    },
+    orden="t.fecha DESC, t.id DESC",
+    # 'abonado' es lo cobrado (monto_pagado = suma de 'pagos', mantenida por
+    # triggers; las facturas pagadas antes de existir 'pagos' cuentan completas,
+    # ver DatabaseManager.SQLS_CONCILIAR_PAGADO); 'pendiente' usa la misma
+    # definición que resumen_mensual, así abonado + pendiente = facturado.
+    totales=(
+        "COUNT(*) AS filas",
+        "COALESCE(SUM(t.monto), 0) AS facturado",
+        "COALESCE(SUM(t.monto_pagado), 0) AS abonado",
+        "COALESCE(SUM(CASE WHEN t.pagado = 0 THEN t.monto - t.monto_pagado ELSE 0 END), 0) AS pendiente",
+        "COALESCE(SUM(t.horas), 0) AS horas",
+    ),
+)
+
+GASTOS_EQUIPO = ConsultaListado(
+    nombre="gastos_equipo",
+    select="""
+        SELECT t.id, t.fecha, c.nombre as cuenta, ca.nombre as categoria, s.nombre as subcategoria,
+            eq.nombre as equipo, t.descripcion, t.monto, t.comentario
+        FROM {desde}
+            LEFT JOIN cuentas c ON t.cuenta_id = c.id
+            LEFT JOIN categorias ca ON t.categoria_id = ca.id
+            LEFT JOIN subcategorias s ON t.subcategoria_id = s.id
+            LEFT JOIN equipos eq ON t.equipo_id = eq.id
+    """,
+    tabla="transacciones",
+    alias="t",
+    condiciones_fijas=("t.proyecto_id = :proyecto_id", "t.tipo = 'Gasto'"),
+    campos={
+        "cuenta_id": ("cuenta_id", IGUAL),
+        "categoria_id": ("categoria_id", IGUAL),
+        "subcategoria_id": ("subcategoria_id", IGUAL),
+        "equipo_id": ("equipo_id", IGUAL),
+        "fecha_desde": ("fecha", DESDE),
+        "fecha_hasta": ("fecha", HASTA),
+        "texto": (("descripcion", "comentario"), TEXTO),
+    },
+    orden="t.fecha DESC, t.id DESC",
+    totales=("COUNT(*) AS filas", "COALESCE(SUM(t.monto), 0) AS total"),
+)
+
+PAGOS_OPERADORES = ConsultaListado(
+    nombre="pagos_operadores",
+    select="""
+        SELECT t.id, t.fecha, c.nombre as cuenta, o.nombre as operador, eq.nombre as equipo,
+            t.horas, t.descripcion, t.monto, t.comentario
+        FROM {desde}
+            LEFT JOIN cuentas c ON t.cuenta_id = c.id
+            LEFT JOIN equipos_entidades o ON t.operador_id = o.id AND o.tipo = 'Operador'
+            LEFT JOIN equipos eq ON t.equipo_id = eq.id
+    """,
+    tabla="transacciones",
+    alias="t",
+    condiciones_fijas=(
+        "t.proyecto_id = :proyecto_id",
+        "t.tipo = 'Gasto'",
+        "t.categoria_id IN (SELECT id FROM categorias WHERE nombre = :categoria_nombre)",
+    ),
+    campos={
+        "cuenta_id": ("cuenta_id", IGUAL),
+        "operador_id": ("operador_id", IGUAL),
+        "equipo_id": ("equipo_id", IGUAL),
+        "fecha_desde": ("fecha", DESDE),
+        "fecha_hasta": ("fecha", HASTA),
+        "texto": (("descripcion", "comentario"), TEXTO),
+    },
+    orden="t.fecha DESC, t.id DESC",
+    totales=("COUNT(*) AS filas", "COALESCE(SUM(t.monto), 0) AS total"),
+)
@@ -0,0 +1,148 @@
+"""
+Gráfico de tendencia mensual (12 meses) dibujado con QPainter.
+
+No depende de librerías de gráficos: recibe series ya calculadas y las dibuja
+como barras agrupadas por mes y/o líneas. Se usa en el panel de tendencia del
+dashboard (ver DashboardTab._mostrar_tendencia).
+
+    grafico.mostrar([
+        SerieTendencia("Ingresos", "#2E8B57", ingresos_por_mes, barras=True),
+        SerieTendencia("Beneficio", "#00529B", beneficio_por_mes),
+    ])
+"""
+from PyQt6.QtWidgets import QWidget
+from PyQt6.QtGui import QPainter, QPen, QColor, QFontMetrics, QPolygonF
+from PyQt6.QtCore import Qt, QPointF, QRectF
+
+MESES_CORTOS = ["Ene", "Feb", "Mar", "Abr", "May", "Jun", "Jul", "Ago", "Sep", "Oct", "Nov", "Dic"]
+
+# Colores para series sin color propio (p. ej. una por equipo)
+PALETA = ["#1F77B4", "#FF7F0E", "#2CA02C", "#D62728", "#9467BD", "#8C564B", "#E377C2", "#7F7F7F"]
+
+
+class SerieTendencia:
+    """Una serie de 12 valores (enero a diciembre); 'barras' o línea."""
+
+    def __init__(self, nombre, color, valores, barras=False):
+        self.nombre = nombre
+        self.color = color
+        self.valores = [float(v or 0) for v in valores]
+        self.barras = barras
+
+
+def _abreviar(valor):
+    """1234567 -> '1.2M', 15300 -> '15k' (etiquetas del eje)."""
+    absoluto = abs(valor)
+    if absoluto >= 1_000_000:
+        return f"{valor / 1_000_000:.1f}M"
+    if absoluto >= 1_000:
+        return f"{valor / 1_000:.0f}k"
+    return f"{valor:.0f}"
+
+
+class GraficoTendencia(QWidget):
+    MARGEN_IZQ = 52
+    MARGEN_DER = 12
+    MARGEN_SUP = 26   # espacio para la leyenda
+    MARGEN_INF = 22   # etiquetas de los meses
+    DIVISIONES = 4
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._series = []
+        self._vacio = "Sin datos"
+        self.setMinimumHeight(180)
+
+    def mostrar(self, series, vacio="Sin datos"):
+        self._series = list(series)
+        self._vacio = vacio
+        self.update()
+
+    def _escala(self):
+        valores = [v for s in self._series for v in s.valores]
+        minimo = min(valores + [0.0])
+        maximo = max(valores + [0.0])
+        if maximo == minimo:
+            maximo = minimo + 1.0
+        return minimo, maximo
+
+    def paintEvent(self, event):
+        painter = QPainter(self)
+        painter.setRenderHint(QPainter.RenderHint.Antialiasing)
+        area = QRectF(self.MARGEN_IZQ, self.MARGEN_SUP,
+                      self.width() - self.MARGEN_IZQ - self.MARGEN_DER,
+                      self.height() - self.MARGEN_SUP - self.MARGEN_INF)
+        if area.width() <= 0 or area.height() <= 0:
+            return
+        if not any(any(s.valores) for s in self._series):
+            painter.setPen(QColor("#888888"))
+            painter.drawText(area, Qt.AlignmentFlag.AlignCenter, self._vacio)
+            return
+
+        minimo, maximo = self._escala()
+
+        def y_de(valor):
+            return area.bottom() - (valor - minimo) / (maximo - minimo) * area.height()
+
+        self._dibujar_ejes(painter, area, minimo, maximo, y_de)
+
+        ancho_mes = area.width() / 12
+        barras = [s for s in self._series if s.barras]
+        lineas = [s for s in self._series if not s.barras]
+
+        # Barras agrupadas dentro de cada mes
+        if barras:
+            ancho_barra = ancho_mes * 0.8 / len(barras)
+            y_cero = y_de(0.0)
+            for i, serie in enumerate(barras):
+                painter.setPen(Qt.PenStyle.NoPen)
+                painter.setBrush(QColor(serie.color))
+                for mes, valor in enumerate(serie.valores):
+                    x = area.left() + mes * ancho_mes + ancho_mes * 0.1 + i * ancho_barra
+                    y = y_de(valor)
+                    painter.drawRect(QRectF(x, min(y, y_cero), ancho_barra, abs(y_cero - y)))
+
+        # Líneas con un punto por mes
+        painter.setBrush(Qt.BrushStyle.NoBrush)
+        for serie in lineas:
+            puntos = QPolygonF([QPointF(area.left() + (mes + 0.5) * ancho_mes, y_de(valor))
+                                for mes, valor in enumerate(serie.valores)])
+            painter.setPen(QPen(QColor(serie.color), 2))
+            painter.drawPolyline(puntos)
+            for punto in puntos:
+                painter.drawEllipse(punto, 2.5, 2.5)
+
+        self._dibujar_leyenda(painter)
+
+    def _dibujar_ejes(self, painter, area, minimo, maximo, y_de):
+        metricas = QFontMetrics(self.font())
+        for i in range(self.DIVISIONES + 1):
+            valor = minimo + (maximo - minimo) * i / self.DIVISIONES
+            y = y_de(valor)
+            painter.setPen(QPen(QColor("#DDDDDD"), 1))
+            painter.drawLine(QPointF(area.left(), y), QPointF(area.right(), y))
+            painter.setPen(QColor("#555555"))
+            texto = _abreviar(valor)
+            painter.drawText(QPointF(area.left() - metricas.horizontalAdvance(texto) - 6,
+                                     y + metricas.ascent() / 2), texto)
+        if minimo < 0:
+            painter.setPen(QPen(QColor("#999999"), 1))
+            painter.drawLine(QPointF(area.left(), y_de(0.0)), QPointF(area.right(), y_de(0.0)))
+
+        ancho_mes = area.width() / 12
+        painter.setPen(QColor("#555555"))
+        for mes, nombre in enumerate(MESES_CORTOS):
+            x = area.left() + (mes + 0.5) * ancho_mes - metricas.horizontalAdvance(nombre) / 2
+            painter.drawText(QPointF(x, area.bottom() + metricas.ascent() + 4), nombre)
+
+    def _dibujar_leyenda(self, painter):
+        metricas = QFontMetrics(self.font())
+        x = float(self.MARGEN_IZQ)
+        y = 6.0
+        for serie in self._series:
+            painter.setPen(Qt.PenStyle.NoPen)
+            painter.setBrush(QColor(serie.color))
+            painter.drawRect(QRectF(x, y + 2, 10, 10))
+            painter.setPen(QColor("#333333"))
+            painter.drawText(QPointF(x + 14, y + metricas.ascent()), serie.nombre)
+            x += 14 + metricas.horizontalAdvance(serie.nombre) + 16
@@ -3,7 +3,14 @@ import os
 import uuid
 import logging
 import calendar
+import threading
+import time
+from pathlib import Path
 from datetime import datetime, date
+import filtros_sql
+import migraciones
+from eventos_datos import ALTA, BAJA, EDICION, BusCambios, CambioDatos
+from contextlib import contextmanager
 import uuid # Asegúrate de que esta línea esté al inicio de tu archivo logic.py
 
 
@@ -15,36 +22,358 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+
+class _ReservaLectores:
+    """
+    Conexiones de solo lectura compartidas por los hilos en segundo plano.
+    Cada hilo toma una al hacer su primera lectura y la devuelve cuando Python
+    descarta su estado de hilo: en los hilos de QThreadPool eso pasa al terminar
+    cada QRunnable, así que sin la reserva se abriría una conexión por tarea.
+    Se guardan hasta 'maximo' conexiones libres; las demás se cierran.
+    """
+
+    def __init__(self, abrir, maximo):
+        self._abrir = abrir
+        self._maximo = maximo
+        self._lock = threading.Lock()
+        self._libres = []
+        self._prestadas = 0
+        self._cerrada = False
+
+    def prestar(self):
+        with self._lock:
+            self._prestadas += 1
+            if self._libres:
+                return self._libres.pop()
+        return self._abrir()
+
+    def devolver(self, conn):
+        with self._lock:
+            self._prestadas -= 1
+            if not self._cerrada and len(self._libres) < self._maximo:
+                self._libres.append(conn)
+                return
+        try:
+            conn.close()
+        except sqlite3.Error:
+            pass
+
+    def cerrar(self):
+        """Cierra las conexiones libres; las prestadas se cierran al devolverse."""
+        with self._lock:
+            self._cerrada = True
+            libres, self._libres = self._libres, []
+        for conn in libres:
+            try:
+                conn.close()
+            except sqlite3.Error:
+                pass
+
+    @property
+    def abiertas(self):
+        with self._lock:
+            return self._prestadas + len(self._libres)
+
+
+class _ConexionDelHilo:
+    """Se guarda en el threading.local del hilo; al liberarse devuelve la conexión."""
+
+    def __init__(self, reserva):
+        self.reserva = reserva
+        self.conn = reserva.prestar()
+
+    def __del__(self):
+        self.reserva.devolver(self.conn)
+
+
 class DatabaseManager:
-    def __init__(self, db_path="progain_database.db"):
+    # Parámetros del modo pool (WAL + lectores por hilo + un único escritor)
+    BUSY_TIMEOUT_MS = 5000
+    REINTENTOS_ESCRITURA = 3
+    ESPERA_REINTENTO_SEG = 0.2
+    MAX_LECTORES_LIBRES = 4
+
+    def __init__(self, db_path="progain_database.db", usar_pool=False):
         self.db_path = db_path
+        self.usar_pool = usar_pool
+        # Conexión escritora: todas las escrituras pasan por aquí
         self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
         self._conn.row_factory = sqlite3.Row
+        self._lock_escritura = threading.RLock()
+        self._lectores = threading.local()
+        self._reserva_lectores = _ReservaLectores(self._abrir_conexion_lectura, self.MAX_LECTORES_LIBRES)
+        # Tablas de consulta (clientes, operadores, equipos, cuentas...) por proyecto
+        self._cache_referencias = {}
+        self._version_referencias = 0
+        self._lock_referencias = threading.Lock()
+        # Avisos de cambios confirmados (ver eventos_datos); la caché es el primer suscriptor
+        self.cambios = BusCambios()
+        self.cambios.suscribir(self._on_cambio_referencias)
+        self._diferir_commits = False
+        if self.usar_pool:
+            self._configurar_modo_pool()
+
+    # --- POOL DE CONEXIONES ---
+    def _configurar_modo_pool(self):
+        """
+        Activa WAL en el archivo para que los lectores no bloqueen al escritor
+        (ni viceversa). Con WAL, synchronous=NORMAL es seguro ante caídas de la
+        aplicación y evita un fsync por cada commit en la carpeta sincronizada.
+        """
+        self._conn.execute(f"PRAGMA busy_timeout = {self.BUSY_TIMEOUT_MS}")
+        modo = self._conn.execute("PRAGMA journal_mode = WAL").fetchone()[0]
+        if str(modo).lower() != "wal":
+            logger.warning("No se pudo activar WAL en %s (modo actual: %s)", self.db_path, modo)
+        self._conn.execute("PRAGMA synchronous = NORMAL")
+        logger.info("Modo pool activo para %s (journal_mode=%s)", self.db_path, modo)
+
+    def _conexion_lectura(self):
+        """
+        Devuelve la conexión de solo lectura del hilo actual, creándola la primera
+        vez. Sin modo pool, las lecturas del hilo principal usan la conexión
+        principal; las de hilos en segundo plano (carga_async) siempre tienen la suya.
+        """
+        if not self.usar_pool and threading.current_thread() is threading.main_thread():
+            return self._conn
+        prestada = getattr(self._lectores, "prestada", None)
+        if prestada is None:
+            prestada = _ConexionDelHilo(self._reserva_lectores)
+            self._lectores.prestada = prestada
+        return prestada.conn
+
+    def _abrir_conexion_lectura(self):
+        uri = Path(os.path.abspath(self.db_path)).as_uri() + "?mode=ro"
+        conn = sqlite3.connect(uri, uri=True, check_same_thread=False)
+        conn.row_factory = sqlite3.Row
+        conn.execute(f"PRAGMA busy_timeout = {self.BUSY_TIMEOUT_MS}")
+        return conn
+
+    def _escribir_con_reintentos(self, operacion):
+        """
+        Ejecuta 'operacion(conn)' sobre la conexión escritora, serializada entre
+        hilos. Si la base está ocupada (otro proceso escribiendo en la carpeta
+        sincronizada) se reintenta tras una espera creciente.
+        """
+        intento = 0
+        while True:
+            try:
+                with self._lock_escritura:
+                    return operacion(self._conn)
+            except sqlite3.OperationalError as e:
+                mensaje = str(e).lower()
+                bloqueada = "locked" in mensaje or "busy" in mensaje
+                if not bloqueada or intento >= self.REINTENTOS_ESCRITURA:
+                    raise
+                intento += 1
+                logger.warning("Base de datos ocupada, reintento %s/%s: %s",
+                               intento, self.REINTENTOS_ESCRITURA, e)
+                time.sleep(self.ESPERA_REINTENTO_SEG * intento)
+
+    def cerrar(self):
+        """Cierra la conexión escritora y todas las conexiones de lectura del pool."""
+        self._reserva_lectores.cerrar()
+        self._lectores = threading.local()
+        self._conn.close()
+
+    # --- DATOS DE REFERENCIA (CACHÉ) ---
+    def _referencia(self, clave, tablas, cargar):
+        """
+        Devuelve una tabla de consulta (clientes, equipos, cuentas...) desde la
+        caché, cargándola con 'cargar()' la primera vez. 'tablas' son las tablas
+        de las que depende, para poder invalidarla (ver invalidar_referencias).
+
+        Si depende de 'transacciones' (p. ej. las cuentas usadas en el proyecto)
+        además se descarta tras cualquier escritura en la base: total_changes de
+        la conexión escritora cambia con cada fila modificada.
+        Cada llamada recibe copias: los diálogos pueden modificar lo que reciben.
+        """
+        marca = self._conn.total_changes if "transacciones" in tablas else None
+        with self._lock_referencias:
+            entrada = self._cache_referencias.get(clave)
+            version = self._version_referencias
+        if entrada is not None and entrada[1] == marca:
+            filas = entrada[2]
+        else:
+            filas = cargar()
+            with self._lock_referencias:
+                # Si se invalidó mientras se consultaba, no se guarda un dato viejo
+                if version == self._version_referencias:
+                    self._cache_referencias[clave] = (frozenset(tablas), marca, filas)
+        return [dict(fila) for fila in filas]
+
+    def invalidar_referencias(self, *tablas):
+        """
+        Descarta las tablas de consulta cacheadas que dependen de alguna de
+        'tablas' (todas, si no se indica ninguna).
+        """
+        with self._lock_referencias:
+            self._version_referencias += 1
+            if not tablas:
+                self._cache_referencias.clear()
+                return
+            afectadas = set(tablas)
+            for clave, (dependencias, _, _) in list(self._cache_referencias.items()):
+                if dependencias & afectadas:
+                    del self._cache_referencias[clave]
+
+    def _on_cambio_referencias(self, cambio):
+        self.invalidar_referencias(cambio.tabla)
+
+    # --- AVISOS DE CAMBIOS ---
+    def notificar_cambio(self, tabla, operacion, claves=(), proyecto_id=None, fechas=()):
+        """
+        Publica en self.cambios un cambio ya confirmado. 'fechas' son las fechas
+        que toca (las de antes y las de después, en una edición); el aviso lleva
+        el rango de la menor a la mayor. Quien escriba con SQL propio (fuera de
+        los métodos de esta clase) debe llamarlo tras el commit.
+        """
+        fechas = [str(f)[:10] for f in fechas if f]
+        self.cambios.emitir(CambioDatos(tabla, operacion, claves, proyecto_id,
+                                        min(fechas) if fechas else None, max(fechas) if fechas else None))
+
+    def _alcance_transacciones(self, ids):
+        """(proyecto_id, [fecha mínima, fecha máxima]) de las transacciones 'ids'."""
+        ids = tuple(i for i in ids if i is not None)
+        if not ids:
+            return None, []
+        marcas = ", ".join("?" * len(ids))
+        fila = self.fetchone(
+            f"SELECT MIN(proyecto_id) AS proyecto_id, MIN(fecha) AS desde, MAX(fecha) AS hasta "
+            f"FROM transacciones WHERE id IN ({marcas})", ids
+        )
+        if not fila:
+            return None, []
+        return fila['proyecto_id'], [fila['desde'], fila['hasta']]
+
+    def _notificar_transacciones(self, operacion, ids, antes=(None, ())):
+        """
+        Aviso de cambio en 'transacciones'. 'antes' es el alcance leído antes de
+        escribir (necesario en ediciones y bajas); en altas y ediciones se le
+        suma el alcance de las filas tal como quedaron.
+        """
+        proyecto_id, fechas = antes
+        fechas = list(fechas)
+        if operacion != BAJA:
+            proyecto_despues, fechas_despues = self._alcance_transacciones(ids)
+            proyecto_id = proyecto_despues if proyecto_id is None else proyecto_id
+            fechas += fechas_despues
+        self.notificar_cambio("transacciones", operacion, ids, proyecto_id, fechas)
+
+    def _listar_con_filtros(self, consulta, filtros, params_fijos, lote=None, compacto=False,
+                            despues_de=None, limite=None):
+        """
+        Ejecuta un listado compilado por filtros_sql con los filtros dados.
+        Si se indica 'lote', devuelve un generador de lotes (ver iterfetch).
+        Con 'compacto' devuelve filas FilaCompacta en lugar de dicts.
+        Con 'limite' devuelve solo una página (ver ConsultaListado.compilar).
+        """
+        sql, params = consulta.compilar(filtros, params_fijos, despues_de=despues_de, limite=limite)
+        if lote:
+            return self.iterfetch(sql, params, batch_size=lote)
+        if compacto:
+            return self.fetchall_compacto(consulta.nombre, sql, params)
+        return self.fetchall(sql, params)
+
+    def _fila_listado(self, consulta, filtros, params_fijos, id_fila):
+        """Una sola fila (compacta) de un listado filtrado, buscada por id; None si no está."""
+        sql, params = consulta.compilar_fila(filtros, params_fijos, id_fila)
+        filas = self.fetchall_compacto(consulta.nombre, sql, params)
+        return filas[0] if filas else None
 
     # --- UTILIDADES GENERALES ---
     def fetchall(self, sql, params=()):
-        cur = self._conn.cursor()
+        cur = self._conexion_lectura().cursor()
         cur.execute(sql, params)
         rows = [dict(row) for row in cur.fetchall()]
         cur.close()
         return rows
 
     def fetchone(self, sql, params=()):
-        cur = self._conn.cursor()
+        cur = self._conexion_lectura().cursor()
         cur.execute(sql, params)
         row = cur.fetchone()
         cur.close()
         return dict(row) if row else None
 
-    def execute(self, sql, params=()):
-        cur = self._conn.cursor()
+    def fetchall_compacto(self, forma, sql, params=()):
+        """
+        Igual que fetchall, pero devuelve filas compactas (tuplas con acceso por
+        nombre) del tipo asociado a 'forma' en lugar de un dict por fila.
+        """
+        cur = self._conexion_lectura().cursor()
+        cur.row_factory = None
         cur.execute(sql, params)
-        self._conn.commit()
-        rowid = cur.lastrowid
+        tipo = tipo_fila(forma, tuple(col[0] for col in cur.description))
+        filas = [tipo(row) for row in cur.fetchall()]
         cur.close()
-        return rowid
+        return filas
+
+    def iterfetch(self, sql, params=(), batch_size=500):
+        """
+        Generador que recorre el resultado por lotes de 'batch_size' filas en vez
+        de materializar toda la consulta como lista de dicts.
+
+        Cada lote es una lista de sqlite3.Row (acceso por nombre de columna como
+        row['monto'], sin crear un dict por fila). Para consumir fila a fila:
+        itertools.chain.from_iterable(db.iterfetch(...)).
+        El cursor se cierra al agotar el generador o al cerrarlo antes.
+        """
+        conn = self._conexion_lectura()
+        cur = conn.cursor()
+        try:
+            cur.execute(sql, params)
+            while True:
+                lote = cur.fetchmany(batch_size)
+                if not lote:
+                    break
+                yield lote
+        finally:
+            cur.close()
+
+    def execute(self, sql, params=()):
+        def _operacion(conn):
+            cur = conn.cursor()
+            try:
+                cur.execute(sql, params)
+                conn.commit()
+                return cur.lastrowid
+            except sqlite3.OperationalError:
+                conn.rollback()
+                raise
+            finally:
+                cur.close()
+        return self._escribir_con_reintentos(_operacion)
 
     # --- CREACIÓN Y MIGRACIÓN DE TABLAS ---
+    def asegurar_esquema(self):
+        """
+        Aplica las migraciones pendientes (ver migraciones.py). Si la versión
+        del archivo ya es la actual no ejecuta DDL ni commits.
+        """
+        return migraciones.aplicar_migraciones(self)
+
+    @contextmanager
+    def commits_diferidos(self):
+        """
+        Mientras está activo, los métodos asegurar_*/crear_* no hacen commit y
+        todo queda en la transacción abierta por quien los llama.
+        """
+        anterior = self._diferir_commits
+        self._diferir_commits = True
+        try:
+            yield
+        finally:
+            self._diferir_commits = anterior
+
+    def _confirmar(self):
+        """Commit de los métodos de esquema, salvo dentro de commits_diferidos()."""
+        if not self._diferir_commits:
+            self._conn.commit()
+
+    def _columnas_tabla(self, tabla):
+        """Columnas de 'tabla' vistas desde la conexión escritora (incluye DDL sin confirmar)."""
+        return {row['name'] for row in self._conn.execute(f"PRAGMA table_info({tabla})")}
+
     def crear_tablas_nucleo(self):
         logger.info("[INFO] Asegurando que las tablas núcleo existan...")
         sqls = [
@@ -96,6 +425,7 @@ class DatabaseManager:
                 monto REAL NOT NULL,
                 fecha DATE NOT NULL,
                 pagado INTEGER DEFAULT 0,
+                monto_pagado REAL NOT NULL DEFAULT 0,
                 cliente_id INTEGER,
                 operador_id INTEGER,
                 conduce TEXT,
@@ -115,7 +445,7 @@ class DatabaseManager:
         ]
         for sql in sqls:
             self._conn.execute(sql)
-        self._conn.commit()
+        self._confirmar()
 
     # --- OBTENCIÓN DE DATOS ---
     def obtener_proyectos(self):
@@ -126,14 +456,14 @@ class DatabaseManager:
 
     def obtener_entidades_por_tipo(self, proyecto_id=None):
         if proyecto_id is not None:
-            return self.fetchall(
+            return self._referencia(("equipos_activos", proyecto_id), ("equipos",), lambda: self.fetchall(
                 "SELECT * FROM equipos WHERE proyecto_id=? AND activo=1",
                 (proyecto_id,)
-            )
+            ))
         else:
-            return self.fetchall(
+            return self._referencia(("equipos_activos", None), ("equipos",), lambda: self.fetchall(
                 "SELECT * FROM equipos WHERE activo=1"
-            )
+            ))
 
 
 
@@ -160,15 +490,18 @@ class DatabaseManager:
                 INSERT INTO equipos (proyecto_id, nombre, marca, modelo, categoria, equipo, activo)
                 VALUES (?, ?, ?, ?, ?, ?, ?)
             """
-            self.execute(query, (
+            nuevo_id = self.execute(query, (
                 datos["proyecto_id"], datos["nombre"], datos["marca"],
                 datos["modelo"], datos["categoria"], datos["equipo"], datos["activo"]
             ))
+        self.notificar_cambio("equipos", EDICION if equipo_id else ALTA, (equipo_id or nuevo_id,),
+                              datos.get("proyecto_id"))
         return True
 
     def eliminar_equipo(self, equipo_id):
         try:
             self.execute("DELETE FROM equipos WHERE id = ?", (equipo_id,))
+            self.notificar_cambio("equipos", BAJA, (equipo_id,))
             return True
         except Exception as e:
             logger.error(f"[ERROR] {e}")
@@ -190,7 +523,105 @@ class DatabaseManager:
             comentario TEXT
         )
         """
-        self.execute(query)
+        self._conn.execute(query)
+        self._confirmar()
+
+    # Deja 'pagado' de acuerdo con monto_pagado (lo que mantienen los triggers).
+    # Las facturas marcadas como pagadas a mano antes de existir 'pagos' no
+    # tienen abonos: se dan por cobradas completas (monto_pagado = monto) en
+    # vez de volverlas pendientes, así 'abonado' + 'pendiente' = 'facturado'.
+    SQLS_CONCILIAR_PAGADO = (
+        """
+        UPDATE transacciones SET monto_pagado = monto
+        WHERE tipo = 'Ingreso' AND pagado = 1 AND monto_pagado = 0
+          AND id NOT IN (SELECT transaccion_id FROM pagos)
+        """,
+        """
+        UPDATE transacciones SET pagado = CASE WHEN monto_pagado >= monto THEN 1 ELSE 0 END
+        WHERE tipo = 'Ingreso' AND pagado <> CASE WHEN monto_pagado >= monto THEN 1 ELSE 0 END
+        """,
+    )
+
+    def conciliar_pagado(self):
+        """Aplica SQLS_CONCILIAR_PAGADO (bases que ya tenían monto_pagado)."""
+        try:
+            for sql in self.SQLS_CONCILIAR_PAGADO:
+                self._conn.execute(sql)
+            self._confirmar()
+        except Exception:
+            self._conn.rollback()
+            raise
+
+    def asegurar_saldos_pagados(self):
+        """
+        Mantiene en transacciones.monto_pagado la suma de sus pagos mediante
+        triggers sobre 'pagos', y con ello el flag 'pagado' (también al editar
+        el monto de la factura). Si la columna no existía se crea y se rellena
+        una sola vez a partir de los pagos actuales y se concilia 'pagado' con
+        ella (ver SQLS_CONCILIAR_PAGADO).
+        """
+        columnas = self._columnas_tabla("transacciones")
+        sqls = ["CREATE INDEX IF NOT EXISTS ix_pagos_transaccion_id ON pagos(transaccion_id)"]
+        if 'monto_pagado' not in columnas:
+            sqls += [
+                "ALTER TABLE transacciones ADD COLUMN monto_pagado REAL NOT NULL DEFAULT 0",
+                """
+                UPDATE transacciones SET monto_pagado = ROUND(COALESCE(
+                    (SELECT SUM(P.monto) FROM pagos P WHERE P.transaccion_id = transacciones.id), 0), 2)
+                WHERE id IN (SELECT DISTINCT transaccion_id FROM pagos)
+                """,
+                *self.SQLS_CONCILIAR_PAGADO,
+            ]
+        sqls += [
+            """
+            CREATE TRIGGER IF NOT EXISTS tr_pagos_saldo_insert AFTER INSERT ON pagos
+            BEGIN
+                UPDATE transacciones
+                SET monto_pagado = ROUND(monto_pagado + NEW.monto, 2),
+                    pagado = CASE WHEN ROUND(monto_pagado + NEW.monto, 2) >= monto THEN 1 ELSE 0 END
+                WHERE id = NEW.transaccion_id;
+            END
+            """,
+            """
+            CREATE TRIGGER IF NOT EXISTS tr_pagos_saldo_delete AFTER DELETE ON pagos
+            BEGIN
+                UPDATE transacciones
+                SET monto_pagado = ROUND(monto_pagado - OLD.monto, 2),
+                    pagado = CASE WHEN ROUND(monto_pagado - OLD.monto, 2) >= monto THEN 1 ELSE 0 END
+                WHERE id = OLD.transaccion_id;
+            END
+            """,
+            """
+            CREATE TRIGGER IF NOT EXISTS tr_pagos_saldo_update AFTER UPDATE OF monto, transaccion_id ON pagos
+            BEGIN
+                UPDATE transacciones
+                SET monto_pagado = ROUND(monto_pagado - OLD.monto, 2),
+                    pagado = CASE WHEN ROUND(monto_pagado - OLD.monto, 2) >= monto THEN 1 ELSE 0 END
+                WHERE id = OLD.transaccion_id;
+                UPDATE transacciones
+                SET monto_pagado = ROUND(monto_pagado + NEW.monto, 2),
+                    pagado = CASE WHEN ROUND(monto_pagado + NEW.monto, 2) >= monto THEN 1 ELSE 0 END
+                WHERE id = NEW.transaccion_id;
+            END
+            """,
+            # Editar el monto de una factura también cambia si queda cubierta
+            """
+            CREATE TRIGGER IF NOT EXISTS tr_transacciones_monto_pagado AFTER UPDATE OF monto ON transacciones
+            WHEN NEW.tipo = 'Ingreso' AND NEW.pagado <> CASE WHEN NEW.monto_pagado >= NEW.monto THEN 1 ELSE 0 END
+            BEGIN
+                UPDATE transacciones
+                SET pagado = CASE WHEN monto_pagado >= monto THEN 1 ELSE 0 END
+                WHERE id = NEW.id;
+            END
+            """,
+        ]
+        try:
+            for sql in sqls:
+                self._conn.execute(sql)
+            self._confirmar()
+        except Exception:
+            self._conn.rollback()
+            raise
 
     # --- MANTENIMIENTO ---
     def asegurar_tabla_mantenimientos(self):
@@ -211,10 +642,11 @@ class DatabaseManager:
                 created_at TEXT DEFAULT (datetime('now'))
             )
         """
-        self.execute(query)
+        self._conn.execute(query)
+        self._confirmar()
 
     def registrar_mantenimiento(self, datos):
-        return self.execute(
+        nuevo_id = self.execute(
             """
             INSERT INTO mantenimientos
                 (equipo_id, fecha, descripcion, tipo, valor, odometro_horas, odometro_km, notas,
@@ -236,9 +668,11 @@ class DatabaseManager:
                 datos.get("proximo_fecha")
             )
         )
+        self.notificar_cambio("mantenimientos", ALTA, (nuevo_id,), fechas=(datos.get("fecha"),))
+        return nuevo_id
 
     def actualizar_mantenimiento(self, datos):
-        return self.execute(
+        resultado = self.execute(
             """
             UPDATE mantenimientos
             SET fecha = ?, descripcion = ?, tipo = ?, valor = ?, odometro_horas = ?, odometro_km = ?, notas = ?,
@@ -259,9 +693,12 @@ class DatabaseManager:
                 int(datos["id"])
             )
         )
+        self.notificar_cambio("mantenimientos", EDICION, (int(datos["id"]),), fechas=(datos.get("fecha"),))
+        return resultado
 
     def eliminar_mantenimiento(self, mantenimiento_id):
         self.execute("DELETE FROM mantenimientos WHERE id = ?", (mantenimiento_id,))
+        self.notificar_cambio("mantenimientos", BAJA, (mantenimiento_id,))
         return True
 
     def obtener_mantenimiento_por_id(self, mantenimiento_id):
@@ -277,64 +714,59 @@ class DatabaseManager:
 
     # --- DASHBOARD Y RESÚMENES ---
     def obtener_kpis_dashboard(self, proyecto_id, anio, mes, equipo_id=None):
+        """
+        KPIs del dashboard leídos de las tablas de resumen mensual (ver
+        asegurar_resumen_mensual). Con mes=None se devuelven los del año completo.
+        """
         try:
-            num_dias = calendar.monthrange(anio, mes)[1]
-            inicio_mes = f"{anio}-{mes:02d}-01"
-            fin_mes = f"{anio}-{mes:02d}-{num_dias}"
+            if mes is None:
+                mes_desde, mes_hasta = f"{anio}-01", f"{anio}-12"
+            else:
+                calendar.monthrange(anio, mes)
+                mes_desde = mes_hasta = f"{anio}-{mes:02d}"
         except ValueError:
             return {}
 
-        where_mes = " WHERE T.proyecto_id = ? AND T.fecha BETWEEN ? AND ? "
-        params_mes = [proyecto_id, inicio_mes, fin_mes]
+        where_periodo = " WHERE R.proyecto_id = ? AND R.mes BETWEEN ? AND ? "
+        params = [proyecto_id, mes_desde, mes_hasta]
         if equipo_id:
-            where_mes += " AND T.equipo_id = ? "
-            params_mes.append(equipo_id)
+            where_periodo += " AND R.equipo_id = ? "
+            params.append(equipo_id)
 
         query_ing_gas = f"""
-            SELECT
-                SUM(CASE WHEN T.tipo = 'Ingreso' THEN T.monto ELSE 0 END) as ingresos,
-                SUM(CASE WHEN T.tipo = 'Gasto' THEN T.monto ELSE 0 END) as gastos
-            FROM transacciones T
-            {where_mes}
+            SELECT SUM(R.ingresos) as ingresos, SUM(R.gastos) as gastos
+            FROM resumen_mensual R
+            {where_periodo}
         """
-        res_ing_gas = self.fetchone(query_ing_gas, tuple(params_mes))
+        res_ing_gas = self.fetchone(query_ing_gas, tuple(params))
 
-        query_pendiente = "SELECT SUM(monto) as total_pendiente FROM transacciones WHERE proyecto_id = ? AND tipo = 'Ingreso' AND pagado = 0"
-        res_pendiente = self.fetchone(query_pendiente, (proyecto_id,))
 
         query_equipo = f"""
-            SELECT EQ.nombre, SUM(T.monto) as total_generado
-            FROM transacciones T
-            JOIN equipos EQ ON T.equipo_id = EQ.id
-            {where_mes} AND T.tipo = 'Ingreso'
+            SELECT EQ.nombre, SUM(R.ingresos) as total_generado
+            FROM resumen_mensual R
+            JOIN equipos EQ ON R.equipo_id = EQ.id
+            {where_periodo} AND R.ingresos != 0
             GROUP BY EQ.nombre
             ORDER BY total_generado DESC
             LIMIT 1
         """
-        res_equipo = self.fetchone(query_equipo, tuple(params_mes))
-
-        where_meta = " WHERE META.proyecto_id = ? AND T.fecha BETWEEN ? AND ? "
-        params_meta = [proyecto_id, inicio_mes, fin_mes]
-        if equipo_id:
-            where_meta += " AND T.equipo_id = ? "
-            params_meta.append(equipo_id)
+        res_equipo = self.fetchone(query_equipo, tuple(params))
 
         query_operador = f"""
-            SELECT OPE.nombre, SUM(META.horas) as total_horas
-            FROM equipos_alquiler_meta META
-            JOIN equipos_entidades OPE ON META.operador_id = OPE.id
-            JOIN transacciones T ON META.transaccion_id = T.id
-            {where_meta}
+            SELECT OPE.nombre, SUM(R.horas) as total_horas
+            FROM resumen_mensual_operador R
+            JOIN equipos_entidades OPE ON R.operador_id = OPE.id
+            {where_periodo} AND R.horas != 0
             GROUP BY OPE.nombre
             ORDER BY total_horas DESC
             LIMIT 1
         """
-        res_operador = self.fetchone(query_operador, tuple(params_meta))
+        res_operador = self.fetchone(query_operador, tuple(params))
 
         kpis = {
             'ingresos_mes': res_ing_gas['ingresos'] if res_ing_gas and res_ing_gas['ingresos'] else 0.0,
             'gastos_mes': res_ing_gas['gastos'] if res_ing_gas and res_ing_gas['gastos'] else 0.0,
-            'saldo_pendiente': res_pendiente['total_pendiente'] if res_pendiente and res_pendiente['total_pendiente'] else 0.0,
+            'saldo_pendiente': self.obtener_saldo_pendiente_proyecto(proyecto_id),
             'top_equipo_nombre': res_equipo['nombre'] if res_equipo else "N/A",
             'top_equipo_monto': res_equipo['total_generado'] if res_equipo else 0.0,
             'top_operador_nombre': res_operador['nombre'] if res_operador else "N/A",
@@ -342,14 +774,234 @@ class DatabaseManager:
         }
         return kpis
 
+    def obtener_tendencia_anual(self, proyecto_id, anio):
+        """
+        Ingresos, gastos y horas de cada mes del año por equipo, en una sola
+        consulta agrupada sobre resumen_mensual. Devuelve filas
+        {mes (1-12), equipo_id, equipo, ingresos, gastos, horas}; los totales
+        del mes o de un equipo se suman a partir de ellas (ver DashboardTab).
+        """
+        return self.fetchall(
+            """
+            SELECT CAST(substr(R.mes, 6, 2) AS INTEGER) AS mes, R.equipo_id,
+                   COALESCE(EQ.nombre, 'Sin equipo') AS equipo,
+                   SUM(R.ingresos) AS ingresos, SUM(R.gastos) AS gastos, SUM(R.horas) AS horas
+            FROM resumen_mensual R
+            LEFT JOIN equipos EQ ON EQ.id = R.equipo_id
+            WHERE R.proyecto_id = ? AND R.mes BETWEEN ? AND ?
+            GROUP BY R.mes, R.equipo_id
+            """,
+            (proyecto_id, f"{anio}-01", f"{anio}-12")
+        )
+
+    def obtener_saldo_pendiente_proyecto(self, proyecto_id):
+        """Saldo pendiente de cobro de todo el proyecto (sin límite de fechas)."""
+        res = self.fetchone(
+            "SELECT SUM(pendiente) as total_pendiente FROM resumen_mensual WHERE proyecto_id = ?", (proyecto_id,)
+        )
+        return res['total_pendiente'] if res and res['total_pendiente'] else 0.0
+
+    @staticmethod
+    def _sql_aporte_resumen(fila, signo):
+        """
+        Sentencias (para triggers) que suman o restan ('+'/'-') el aporte de la
+        fila NEW/OLD de 'transacciones' a los resúmenes mensuales.
+        """
+        return f"""
+            INSERT INTO resumen_mensual (proyecto_id, equipo_id, mes, ingresos, gastos, horas, pendiente)
+            VALUES (
+                {fila}.proyecto_id, COALESCE({fila}.equipo_id, 0), substr({fila}.fecha, 1, 7),
+                {signo}(CASE WHEN {fila}.tipo = 'Ingreso' THEN {fila}.monto ELSE 0 END),
+                {signo}(CASE WHEN {fila}.tipo = 'Gasto' THEN {fila}.monto ELSE 0 END),
+                {signo}(CASE WHEN {fila}.tipo = 'Ingreso' THEN COALESCE({fila}.horas, 0) ELSE 0 END),
+                {signo}(CASE WHEN {fila}.tipo = 'Ingreso' AND {fila}.pagado = 0
+                             THEN {fila}.monto - {fila}.monto_pagado ELSE 0 END)
+            )
+            ON CONFLICT (proyecto_id, equipo_id, mes) DO UPDATE SET
+                ingresos = ROUND(ingresos + excluded.ingresos, 2),
+                gastos = ROUND(gastos + excluded.gastos, 2),
+                horas = ROUND(horas + excluded.horas, 2),
+                pendiente = ROUND(pendiente + excluded.pendiente, 2);
+            INSERT INTO resumen_mensual_operador (proyecto_id, equipo_id, mes, operador_id, horas)
+            SELECT {fila}.proyecto_id, COALESCE({fila}.equipo_id, 0), substr({fila}.fecha, 1, 7),
+                   {fila}.operador_id, {signo}COALESCE({fila}.horas, 0)
+            WHERE {fila}.tipo = 'Ingreso' AND {fila}.operador_id IS NOT NULL
+            ON CONFLICT (proyecto_id, equipo_id, mes, operador_id) DO UPDATE SET
+                horas = ROUND(horas + excluded.horas, 2);
+        """
+
+    def asegurar_resumen_mensual(self):
+        """
+        Crea las tablas de resumen mensual por (proyecto, equipo, mes) y los
+        triggers que las mantienen al día con cada escritura en 'transacciones'.
+        Si las tablas no existían, las rellena con reconstruir_resumen_mensual().
+        """
+        if 'monto_pagado' not in self._columnas_tabla("transacciones"):
+            self.asegurar_saldos_pagados()
+
+        existia = self._conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'resumen_mensual'"
+        ).fetchone()
+        sqls = [
+            """
+            CREATE TABLE IF NOT EXISTS resumen_mensual (
+                proyecto_id INTEGER NOT NULL,
+                equipo_id INTEGER NOT NULL DEFAULT 0,
+                mes TEXT NOT NULL,
+                ingresos REAL NOT NULL DEFAULT 0,
+                gastos REAL NOT NULL DEFAULT 0,
+                horas REAL NOT NULL DEFAULT 0,
+                pendiente REAL NOT NULL DEFAULT 0,
+                PRIMARY KEY (proyecto_id, equipo_id, mes)
+            ) WITHOUT ROWID
+            """,
+            """
+            CREATE TABLE IF NOT EXISTS resumen_mensual_operador (
+                proyecto_id INTEGER NOT NULL,
+                equipo_id INTEGER NOT NULL DEFAULT 0,
+                mes TEXT NOT NULL,
+                operador_id INTEGER NOT NULL,
+                horas REAL NOT NULL DEFAULT 0,
+                PRIMARY KEY (proyecto_id, equipo_id, mes, operador_id)
+            ) WITHOUT ROWID
+            """,
+            f"""
+            CREATE TRIGGER IF NOT EXISTS tr_transacciones_resumen_insert AFTER INSERT ON transacciones
+            BEGIN
+                {self._sql_aporte_resumen('NEW', '+')}
+            END
+            """,
+            f"""
+            CREATE TRIGGER IF NOT EXISTS tr_transacciones_resumen_delete AFTER DELETE ON transacciones
+            BEGIN
+                {self._sql_aporte_resumen('OLD', '-')}
+            END
+            """,
+            f"""
+            CREATE TRIGGER IF NOT EXISTS tr_transacciones_resumen_update
+            AFTER UPDATE OF proyecto_id, equipo_id, fecha, tipo, monto, horas, pagado, monto_pagado, operador_id
+            ON transacciones
+            BEGIN
+                {self._sql_aporte_resumen('OLD', '-')}
+                {self._sql_aporte_resumen('NEW', '+')}
+            END
+            """,
+        ]
+        try:
+            for sql in sqls:
+                self._conn.execute(sql)
+            self._confirmar()
+        except Exception:
+            self._conn.rollback()
+            raise
+        if not existia:
+            self.reconstruir_resumen_mensual()
+
+    # Tablas con contador de cambios (lo que leen los reportes cacheados)
+    TABLAS_VERSIONADAS = ("transacciones", "equipos", "equipos_entidades", "cuentas", "categorias")
+
+    def asegurar_versiones_tablas(self):
+        """
+        Crea 'versiones_tablas' (un contador por tabla) y los triggers que lo
+        incrementan en cada INSERT/UPDATE/DELETE. A diferencia del máximo
+        rowid, el contador también cambia al editar o borrar filas; con él
+        se arma la huella de datos de la caché de reportes.
+        """
+        sqls = [
+            """
+            CREATE TABLE IF NOT EXISTS versiones_tablas (
+                tabla TEXT PRIMARY KEY,
+                version INTEGER NOT NULL DEFAULT 0
+            ) WITHOUT ROWID
+            """
+        ]
+        for tabla in self.TABLAS_VERSIONADAS:
+            sqls.append(f"INSERT OR IGNORE INTO versiones_tablas (tabla, version) VALUES ('{tabla}', 0)")
+            for evento in ("INSERT", "UPDATE", "DELETE"):
+                sqls.append(f"""
+                    CREATE TRIGGER IF NOT EXISTS tr_version_{tabla}_{evento.lower()} AFTER {evento} ON {tabla}
+                    BEGIN
+                        UPDATE versiones_tablas SET version = version + 1 WHERE tabla = '{tabla}';
+                    END
+                """)
+        try:
+            for sql in sqls:
+                self._conn.execute(sql)
+            self._confirmar()
+        except Exception:
+            self._conn.rollback()
+            raise
+
+    def huella_datos(self, tablas):
+        """
+        Versión actual de los datos de 'tablas': tupla ((tabla, contador), ...).
+        None si alguna tabla no tiene contador (base sin migrar), en cuyo caso
+        no se puede saber si un resultado guardado sigue vigente.
+        """
+        tablas = sorted(set(tablas))
+        try:
+            filas = self.fetchall(
+                f"SELECT tabla, version FROM versiones_tablas WHERE tabla IN ({','.join('?' * len(tablas))})",
+                tablas
+            )
+        except sqlite3.OperationalError:
+            return None
+        versiones = {fila['tabla']: fila['version'] for fila in filas}
+        if len(versiones) != len(tablas):
+            return None
+        return tuple((tabla, versiones[tabla]) for tabla in tablas)
+
+    def reconstruir_resumen_mensual(self, proyecto_id=None):
+        """
+        Recalcula desde cero los resúmenes mensuales (de un proyecto o de todos)
+        a partir de 'transacciones'. Útil tras importaciones masivas o si se
+        sospecha que el resumen quedó desfasado.
+        """
+        filtro, params = "", ()
+        if proyecto_id is not None:
+            filtro, params = " WHERE proyecto_id = ?", (proyecto_id,)
+        sqls = [
+            (f"DELETE FROM resumen_mensual{filtro}", params),
+            (f"DELETE FROM resumen_mensual_operador{filtro}", params),
+            (f"""
+                INSERT INTO resumen_mensual (proyecto_id, equipo_id, mes, ingresos, gastos, horas, pendiente)
+                SELECT proyecto_id, COALESCE(equipo_id, 0), substr(fecha, 1, 7),
+                       ROUND(SUM(CASE WHEN tipo = 'Ingreso' THEN monto ELSE 0 END), 2),
+                       ROUND(SUM(CASE WHEN tipo = 'Gasto' THEN monto ELSE 0 END), 2),
+                       ROUND(SUM(CASE WHEN tipo = 'Ingreso' THEN COALESCE(horas, 0) ELSE 0 END), 2),
+                       ROUND(SUM(CASE WHEN tipo = 'Ingreso' AND pagado = 0
+                                      THEN monto - monto_pagado ELSE 0 END), 2)
+                FROM transacciones{filtro}
+                GROUP BY 1, 2, 3
+            """, params),
+            (f"""
+                INSERT INTO resumen_mensual_operador (proyecto_id, equipo_id, mes, operador_id, horas)
+                SELECT proyecto_id, COALESCE(equipo_id, 0), substr(fecha, 1, 7), operador_id,
+                       ROUND(SUM(COALESCE(horas, 0)), 2)
+                FROM transacciones
+                WHERE tipo = 'Ingreso' AND operador_id IS NOT NULL{filtro.replace(' WHERE', ' AND')}
+                GROUP BY 1, 2, 3, 4
+            """, params),
+        ]
+        with self._lock_escritura:
+            try:
+                for sql, p in sqls:
+                    self._conn.execute(sql, p)
+                self._confirmar()
+            except Exception:
+                self._conn.rollback()
+                raise
+        logger.info("Resumen mensual reconstruido (proyecto=%s)", proyecto_id or "todos")
+
 
     def sembrar_datos_iniciales(self):
         """
         Crea un proyecto por defecto si la tabla está vacía.
         """
-        conteo = self.fetchone("SELECT COUNT(*) as c FROM proyectos")
-        if conteo and conteo['c'] == 0:
-            self.execute("INSERT OR IGNORE INTO proyectos (nombre) VALUES (?)", ("EQUIPOS PESADOS ZOEC",))
+        conteo = self._conn.execute("SELECT COUNT(*) FROM proyectos").fetchone()
+        if conteo and conteo[0] == 0:
+            self._conn.execute("INSERT OR IGNORE INTO proyectos (nombre) VALUES (?)", ("EQUIPOS PESADOS ZOEC",))
+            self._confirmar()
 
 
     def crear_tabla_equipos(self):
@@ -366,7 +1018,7 @@ class DatabaseManager:
                 activo INTEGER DEFAULT 1
             )
         """)
-        self._conn.commit()
+        self._confirmar()
 
     def asegurar_tabla_alquiler_meta(self):
         """Crea la tabla equipos_alquiler_meta si no existe."""
@@ -383,7 +1035,7 @@ class DatabaseManager:
                 conduce_adjunto_path TEXT
             )
         """)
-        self._conn.commit()
+        self._confirmar()
 
     def asegurar_tablas_mantenimiento(self):
         """Crea tablas y/o columnas para mantenimiento avanzado (equipos_mantenimiento)."""
@@ -399,17 +1051,37 @@ class DatabaseManager:
                 km_equipo_en_mantenimiento REAL
             )
         """)
-        self._conn.commit()
+        self._confirmar()
 
     def crear_indices(self):
         indices = [
             "CREATE INDEX IF NOT EXISTS ix_equipos_proyecto_id ON equipos(proyecto_id)",
             "CREATE INDEX IF NOT EXISTS ix_transacciones_equipo_id ON transacciones(equipo_id)",
             "CREATE INDEX IF NOT EXISTS ix_mantenimientos_equipo_id ON mantenimientos(equipo_id)",
+            "CREATE INDEX IF NOT EXISTS ix_transacciones_equipo_tipo_fecha ON transacciones(equipo_id, tipo, fecha)",
+            "CREATE INDEX IF NOT EXISTS ix_transacciones_proy_fecha ON transacciones(proyecto_id, fecha)",
+            "CREATE INDEX IF NOT EXISTS ix_transacciones_proy_tipo_fecha ON transacciones(proyecto_id, tipo, fecha)",
+            "CREATE INDEX IF NOT EXISTS ix_transacciones_proy_cat_fecha ON transacciones(proyecto_id, categoria_id, fecha)",
         ]
         for sql in indices:
             self._conn.execute(sql)
-        self._conn.commit()
+        self._confirmar()
+
+    def actualizar_estadisticas(self, completo=False):
+        """
+        Estadísticas del planificador: con ellas SQLite elige, para cada
+        combinación de filtros de los listados, el índice más selectivo
+        (p. ej. el de equipo al filtrar por equipo). 'completo' hace un ANALYZE
+        acotado de todas las tablas; si no, PRAGMA optimize solo rehace las que
+        quedaron desactualizadas (conviene llamarlo al cerrar la aplicación).
+        """
+        with self._lock_escritura:
+            if completo:
+                self._conn.execute("PRAGMA analysis_limit = 1000")
+                self._conn.execute("ANALYZE")
+            else:
+                self._conn.execute("PRAGMA optimize")
+            self._confirmar()
 
 
     def obtener_entidades_equipo_por_tipo(self, proyecto_id, tipo_entidad):
@@ -423,14 +1095,15 @@ class DatabaseManager:
             WHERE proyecto_id = ? AND tipo = ? 
             ORDER BY nombre
         """
-        return self.fetchall(query, (proyecto_id, tipo_entidad))
+        return self._referencia(("entidades", proyecto_id, tipo_entidad), ("equipos_entidades",),
+                                lambda: self.fetchall(query, (proyecto_id, tipo_entidad)))
 
 
     def obtener_equipos(self, proyecto_id):
-        return self.fetchall(
+        return self._referencia(("equipos_detalle", proyecto_id), ("equipos",), lambda: self.fetchall(
             "SELECT id, nombre, mantenimiento_trigger_tipo, mantenimiento_trigger_valor, marca, modelo, categoria, subcategoria, activo FROM equipos WHERE proyecto_id = ? AND activo=1 ORDER BY nombre",
             (proyecto_id,)
-        )
+        ))
 
     def obtener_fecha_primera_transaccion(self, proyecto_id):
         row = self.fetchone(
@@ -442,40 +1115,45 @@ class DatabaseManager:
         return None
 
 
-    def obtener_transacciones_por_proyecto(self, proyecto_id, filtros=None):
+    def obtener_transacciones_por_proyecto(self, proyecto_id, filtros=None, compacto=False):
         # Esta es tu función principal, está correcta.
-        query = """
-            SELECT 
-                T.id, T.fecha, T.conduce, T.ubicacion, T.horas, T.precio_por_hora,
-                T.monto, T.pagado, T.conduce_adjunto_path,
-                EQ.nombre AS equipo_nombre,
-                CLI.nombre AS cliente_nombre,
-                OPE.nombre AS operador_nombre
-            FROM transacciones T
-            LEFT JOIN equipos EQ ON T.equipo_id = EQ.id
-            LEFT JOIN equipos_entidades CLI ON T.cliente_id = CLI.id
-            LEFT JOIN equipos_entidades OPE ON T.operador_id = OPE.id
-            WHERE T.proyecto_id = :proyecto_id AND T.tipo = 'Ingreso'
+        return self._listar_con_filtros(
+            filtros_sql.ALQUILERES, filtros, {'proyecto_id': proyecto_id}, compacto=compacto
+        )
+
+    def obtener_pagina_transacciones_por_proyecto(self, proyecto_id, filtros=None, despues_de=None, limite=200):
         """
-        params = {'proyecto_id': proyecto_id}
-        if filtros:
-            if filtros.get('cliente_id'):
-                query += " AND T.cliente_id = :cliente_id"
-                params['cliente_id'] = filtros['cliente_id']
-            if filtros.get('operador_id'):
-                query += " AND T.operador_id = :operador_id"
-                params['operador_id'] = filtros['operador_id']
-            if filtros.get('equipo_id'):
-                query += " AND T.equipo_id = :equipo_id"
-                params['equipo_id'] = filtros['equipo_id']
-            if filtros.get('fecha_inicio'):
-                query += " AND T.fecha >= :fecha_inicio"
-                params['fecha_inicio'] = filtros['fecha_inicio']
-            if filtros.get('fecha_fin'):
-                query += " AND T.fecha <= :fecha_fin"
-                params['fecha_fin'] = filtros['fecha_fin']
-        query += " ORDER BY T.fecha DESC, T.id DESC"
-        return self._ejecutar_consulta(query, params, fetchall=True)
+        Una página del listado de alquileres (filas compactas). 'despues_de' es
+        (fecha, id) de la última fila de la página anterior, o None para la primera.
+        """
+        return self._listar_con_filtros(
+            filtros_sql.ALQUILERES, filtros, {'proyecto_id': proyecto_id}, compacto=True,
+            despues_de=despues_de, limite=limite
+        )
+
+    def obtener_totales_transacciones_por_proyecto(self, proyecto_id, filtros=None):
+        """
+        Totales del listado de alquileres filtrado en una sola consulta: filas,
+        facturado, abonado (suma real de 'pagos'), pendiente y horas.
+        """
+        sql, params = filtros_sql.ALQUILERES.compilar_totales(
+            filtros, {'proyecto_id': proyecto_id}
+        )
+        return self.fetchone(sql, params)
+
+    def obtener_fila_transaccion_por_proyecto(self, proyecto_id, transaccion_id, filtros=None):
+        """
+        La fila 'transaccion_id' con la forma del listado de alquileres, o None si
+        no existe o ya no cumple los filtros. Sirve para actualizar una sola fila
+        de la tabla después de guardar.
+        """
+        return self._fila_listado(filtros_sql.ALQUILERES, filtros, {'proyecto_id': proyecto_id}, transaccion_id)
+
+    def iterar_transacciones_por_proyecto(self, proyecto_id, filtros=None, batch_size=500):
+        """Igual que obtener_transacciones_por_proyecto, pero como generador de lotes."""
+        return self._listar_con_filtros(
+            filtros_sql.ALQUILERES, filtros, {'proyecto_id': proyecto_id}, lote=batch_size
+        )
 
     def obtener_mantenimientos_por_equipo(self, equipo_id, limite=200):
         """
@@ -507,69 +1185,99 @@ class DatabaseManager:
 
     def obtener_estado_mantenimiento_equipos(self, proyecto_id=None):
         """
-        Devuelve el estado de mantenimiento de cada equipo:
-        - El intervalo de servicio se lee de la tabla equipos (mantenimiento_trigger_tipo y mantenimiento_trigger_valor).
-        - El uso se calcula como la diferencia entre el odómetro actual y el del último mantenimiento.
-        - El restante y progreso se calculan en base al intervalo.
+        Devuelve el estado de mantenimiento de cada equipo activo, calculado en una
+        sola consulta para toda la flota:
+        - Último servicio: el registro más reciente de 'mantenimientos' del equipo
+          (su fecha y su odómetro de horas/km).
+        - Uso desde el servicio: horas o km acumulados en los alquileres
+          ('transacciones' tipo Ingreso) posteriores a esa fecha; si el equipo no
+          tiene servicios se acumula todo su historial. Para intervalos en DIAS
+          es el número de días transcurridos desde el servicio.
+        - Restante y progreso se calculan contra mantenimiento_trigger_valor.
         """
-        equipos = self.obtener_equipos(proyecto_id) if proyecto_id else self.obtener_equipos()
-        resultado = []
-        for equipo in equipos:
-            equipo_id = equipo['id']
-            nombre = equipo.get('nombre', '')
-
-            trigger_tipo = (equipo.get('mantenimiento_trigger_tipo') or '').upper()
-            trigger_valor = equipo.get('mantenimiento_trigger_valor')
-
-            # Valor actual del odómetro
-            odometro_actual = 0
-            if trigger_tipo == "HORAS":
-                odometro_actual = float(equipo.get('odometro_horas') or 0)
-            elif trigger_tipo == "KM":
-                odometro_actual = float(equipo.get('odometro_km') or 0)
-
-            # Valor del odómetro en el último mantenimiento
-            row = self.fetchone(
-                "SELECT odometro_horas, odometro_km FROM mantenimientos WHERE equipo_id = ? ORDER BY COALESCE(fecha, created_at) DESC LIMIT 1",
-                (equipo_id,)
+        query = """
+            WITH flota AS (
+                SELECT id, nombre,
+                       UPPER(COALESCE(mantenimiento_trigger_tipo, '')) AS trigger_tipo,
+                       mantenimiento_trigger_valor AS trigger_valor
+                FROM equipos
+                WHERE activo = 1 AND (:proyecto_id IS NULL OR proyecto_id = :proyecto_id)
+            ),
+            ultimo AS (
+                SELECT equipo_id, fecha_servicio, odometro_horas, odometro_km
+                FROM (
+                    SELECT M.equipo_id,
+                           COALESCE(M.fecha, substr(M.created_at, 1, 10)) AS fecha_servicio,
+                           M.odometro_horas, M.odometro_km,
+                           ROW_NUMBER() OVER (
+                               PARTITION BY M.equipo_id
+                               ORDER BY COALESCE(M.fecha, M.created_at) DESC, M.id DESC
+                           ) AS rn
+                    FROM mantenimientos M
+                    WHERE M.equipo_id IN (SELECT id FROM flota)
+                )
+                WHERE rn = 1
+            ),
+            acumulado AS (
+                SELECT F.id AS equipo_id,
+                       SUM(COALESCE(T.horas, 0)) AS horas,
+                       SUM(COALESCE(T.kilometros, 0)) AS km
+                FROM flota F
+                JOIN transacciones T ON T.equipo_id = F.id AND T.tipo = 'Ingreso'
+                LEFT JOIN ultimo U ON U.equipo_id = F.id
+                WHERE U.fecha_servicio IS NULL OR T.fecha > U.fecha_servicio
+                GROUP BY F.id
+            ),
+            estado AS (
+                SELECT F.id, F.nombre, F.trigger_tipo, F.trigger_valor,
+                       U.fecha_servicio,
+                       CASE F.trigger_tipo
+                           WHEN 'HORAS' THEN COALESCE(U.odometro_horas, 0)
+                           WHEN 'KM' THEN COALESCE(U.odometro_km, 0)
+                           ELSE 0
+                       END AS odometro_servicio,
+                       CASE F.trigger_tipo
+                           WHEN 'HORAS' THEN COALESCE(A.horas, 0)
+                           WHEN 'KM' THEN COALESCE(A.km, 0)
+                           WHEN 'DIAS' THEN COALESCE(MAX(0, CAST(julianday('now', 'localtime')
+                                                                - julianday(U.fecha_servicio) AS INTEGER)), 0)
+                           ELSE 0
+                       END AS uso
+                FROM flota F
+                LEFT JOIN ultimo U ON U.equipo_id = F.id
+                LEFT JOIN acumulado A ON A.equipo_id = F.id
             )
-            odometro_base = 0
-            if row:
-                if trigger_tipo == "HORAS":
-                    odometro_base = float(row.get("odometro_horas") or 0)
-                elif trigger_tipo == "KM":
-                    odometro_base = float(row.get("odometro_km") or 0)
-
-            # Cálculo del uso desde el último mantenimiento
-            uso = max(0.0, odometro_actual - odometro_base)
-
-            # Restante y progreso
-            if trigger_valor not in (None, '', 'None'):
-                try:
-                    trigger_valor_f = float(trigger_valor)
-                    restante = trigger_valor_f - uso
-                    progreso = uso / trigger_valor_f * 100 if trigger_valor_f > 0 else 0
-                except Exception:
-                    restante = 0
-                    progreso = 0
-            else:
-                restante = 0
-                progreso = 0
-
-            if trigger_tipo and trigger_valor not in (None, '', 'None'):
-                intervalo_txt = f"{trigger_valor} {trigger_tipo}"
-            else:
-                intervalo_txt = ""
+            SELECT id, nombre, trigger_tipo, trigger_valor, fecha_servicio,
+                   odometro_servicio, uso,
+                   odometro_servicio + CASE WHEN trigger_tipo = 'DIAS' THEN 0 ELSE uso END AS odometro_actual,
+                   CASE WHEN trigger_valor > 0 THEN trigger_valor - uso ELSE 0 END AS restante,
+                   CASE WHEN trigger_valor > 0 THEN uso * 100.0 / trigger_valor ELSE 0 END AS progreso
+            FROM estado
+            ORDER BY nombre
+        """
+        filas = self.fetchall(query, {'proyecto_id': proyecto_id})
 
+        resultado = []
+        for f in filas:
+            trigger_tipo = f['trigger_tipo']
+            trigger_valor = f['trigger_valor']
+            tiene_intervalo = bool(trigger_tipo) and trigger_valor not in (None, '')
+            uso = float(f['uso'] or 0)
             resultado.append({
-                "id": equipo_id,
-                "nombre": nombre,
-                "intervalo_txt": intervalo_txt,
+                "id": f['id'],
+                "nombre": f['nombre'] or '',
+                "intervalo_txt": f"{trigger_valor} {trigger_tipo}" if tiene_intervalo else "",
                 "uso_txt": f"{uso:.1f}",
-                "restante_txt": f"{restante:.1f}",
-                "progreso_txt": f"{progreso:.1f}%",
-                "critico": (trigger_valor not in (None, '', 'None') and uso >= float(trigger_valor)),
-                "alerta": (trigger_valor not in (None, '', 'None') and 0.8 * float(trigger_valor) <= uso < float(trigger_valor)),
+                "restante_txt": f"{f['restante']:.1f}",
+                "progreso_txt": f"{f['progreso']:.1f}%",
+                "critico": tiene_intervalo and uso >= float(trigger_valor),
+                "alerta": tiene_intervalo and 0.8 * float(trigger_valor) <= uso < float(trigger_valor),
+                "fecha_ultimo_servicio": f['fecha_servicio'],
+                "odometro_ultimo_servicio": f['odometro_servicio'],
+                "odometro_actual": f['odometro_actual'],
+                "uso": uso,
+                "restante": f['restante'],
+                "progreso": f['progreso'],
             })
         return resultado
 
@@ -593,6 +1301,8 @@ class DatabaseManager:
             "UPDATE equipos SET mantenimiento_trigger_tipo = ?, mantenimiento_trigger_valor = ? WHERE id = ?",
             (tipo, valor, equipo_id)
         )
+        # obtener_equipos cachea estas columnas (ver _referencia)
+        self.notificar_cambio("equipos", EDICION, (equipo_id,))
 
 
     def obtener_lista_abonos(self, proyecto_id: int, filtros: dict):
@@ -653,34 +1363,35 @@ class DatabaseManager:
 
     def actualizar_abono(self, pago_id: int, nueva_fecha: str, nuevo_monto: float, nuevo_comentario: str):
         """Actualiza un registro de pago y recalcula el estado de la transacción asociada."""
-        cur = None
-        try:
-            cur = self._conn.cursor()
-
-            # 1. Obtener el ID de la transacción original antes de hacer cambios
-            cur.execute("SELECT transaccion_id FROM pagos WHERE id = ?", (pago_id,))
-            res = cur.fetchone()
-            if not res:
-                raise ValueError("El pago a actualizar no fue encontrado.")
-            transaccion_id = res['transaccion_id']
-
-            # 2. Actualizar el pago
-            cur.execute(
-                "UPDATE pagos SET fecha = ?, monto = ?, comentario = ? WHERE id = ?",
-                (nueva_fecha, nuevo_monto, nuevo_comentario, pago_id)
-            )
+        def _operacion(conn):
+            cur = conn.cursor()
+            try:
+                # 1. Verificar que el pago exista antes de hacer cambios
+                cur.execute("SELECT transaccion_id, fecha FROM pagos WHERE id = ?", (pago_id,))
+                res = cur.fetchone()
+                if not res:
+                    raise ValueError("El pago a actualizar no fue encontrado.")
+
+                # 2. Actualizar el pago (el trigger recalcula monto_pagado y 'pagado')
+                cur.execute(
+                    "UPDATE pagos SET fecha = ?, monto = ?, comentario = ? WHERE id = ?",
+                    (nueva_fecha, nuevo_monto, nuevo_comentario, pago_id)
+                )
+                conn.commit()
+                return tuple(res)
+            except Exception:
+                conn.rollback()
+                raise
+            finally:
+                cur.close()
 
-            # 3. Recalcular el estado de la transacción
-            self._actualizar_estado_pago_transaccion(transaccion_id, cur)
-            
-            self._conn.commit()
-            return True
+        try:
+            transaccion_id, fecha_anterior = self._escribir_con_reintentos(_operacion)
         except Exception as e:
-            self._conn.rollback()
             print(f"[ERROR] No se pudo actualizar el abono: {e}")
             return False
-        finally:
-            if cur: cur.close()
+        self._notificar_abonos(EDICION, [pago_id], [transaccion_id], [fecha_anterior, nueva_fecha])
+        return True
             
 
     def eliminar_abono(self, pago_ids: list) -> bool:
@@ -691,113 +1402,129 @@ class DatabaseManager:
         if not pago_ids:
             return False
             
-        cur = None
-        try:
-            cur = self._conn.cursor()
-
-            # 1. Crear una cadena de placeholders (?,?,?) para la consulta SQL
-            placeholders = ', '.join(['?'] * len(pago_ids))
-
-            # 2. Obtener los IDs de las transacciones originales ANTES de eliminar los pagos
-            cur.execute(
-                f"SELECT DISTINCT transaccion_id FROM pagos WHERE id IN ({placeholders})",
-                pago_ids
-            )
-            transacciones_afectadas = [row['transaccion_id'] for row in cur.fetchall()]
-
-            # 3. Eliminar los pagos seleccionados
-            cur.execute(f"DELETE FROM pagos WHERE id IN ({placeholders})", pago_ids)
-
-            # 4. Recalcular el estado de CADA transacción afectada
-            if transacciones_afectadas:
-                for trans_id in transacciones_afectadas:
-                    self._actualizar_estado_pago_transaccion(trans_id, cur)
+        # Una cadena de placeholders (?,?,?) para la consulta SQL
+        placeholders = ', '.join(['?'] * len(pago_ids))
+
+        def _operacion(conn):
+            cur = conn.cursor()
+            try:
+                afectados = cur.execute(
+                    f"SELECT transaccion_id, fecha FROM pagos WHERE id IN ({placeholders})", pago_ids
+                ).fetchall()
+                # El trigger de 'pagos' descuenta cada monto de su transacción y recalcula 'pagado'
+                cur.execute(f"DELETE FROM pagos WHERE id IN ({placeholders})", pago_ids)
+                conn.commit()
+                return afectados
+            except Exception:
+                conn.rollback()
+                raise
+            finally:
+                cur.close()
 
-            self._conn.commit()
-            return True
+        try:
+            afectados = self._escribir_con_reintentos(_operacion)
         except Exception as e:
-            self._conn.rollback()
             print(f"[ERROR] No se pudo eliminar el/los abono(s): {e}")
             return False
-        finally:
-            if cur: cur.close()
+        self._notificar_abonos(BAJA, pago_ids, {fila[0] for fila in afectados},
+                               [fila[1] for fila in afectados])
+        return True
 
 
+    def _notificar_abonos(self, operacion, pago_ids, transaccion_ids, fechas_pagos):
+        """
+        Avisos de un cambio en 'pagos': el del propio abono y el de las facturas
+        cuyo monto_pagado/pagado recalcularon los triggers.
+        """
+        proyecto_id, fechas_facturas = self._alcance_transacciones(transaccion_ids)
+        self.notificar_cambio("pagos", operacion, pago_ids, proyecto_id, fechas_pagos)
+        self.notificar_cambio("transacciones", EDICION, tuple(transaccion_ids), proyecto_id, fechas_facturas)
+
     def obtener_transacciones_pendientes_cliente(self, proyecto_id: int, cliente_id: int):
         """
         Obtiene una lista de todas las transacciones de alquiler pendientes de pago
         para un cliente específico, ordenadas por fecha (la más antigua primero).
         """
         query = """
-            SELECT T.id, T.fecha, T.descripcion, T.monto
+            SELECT T.id, T.fecha, T.descripcion, T.monto, T.monto_pagado,
+                   T.monto - T.monto_pagado AS saldo
             FROM transacciones T
             WHERE T.proyecto_id = ? AND T.cliente_id = ? AND T.pagado = 0
             ORDER BY T.fecha ASC, T.id ASC
         """
         return self.fetchall(query, (proyecto_id, cliente_id))
 
+    def _distribuir_abono_fifo(self, cur, proyecto_id, cliente_id, monto_abonar):
+        """
+        Calcula en una sola consulta cómo se reparte un abono entre las facturas
+        pendientes del cliente, de la más antigua a la más reciente.
+
+        Una suma acumulada (función de ventana) da, para cada factura, el saldo de
+        las facturas anteriores; cada una recibe min(saldo, abono - previo) mientras
+        quede abono. Devuelve una lista de (transaccion_id, monto_a_aplicar).
+        """
+        cur.execute("""
+            WITH pendientes AS (
+                SELECT T.id, T.fecha, T.monto - T.monto_pagado AS saldo
+                FROM transacciones T
+                JOIN equipos_alquiler_meta META ON T.id = META.transaccion_id
+                WHERE T.proyecto_id = :proyecto_id AND META.cliente_id = :cliente_id
+                  AND T.pagado = 0 AND T.monto - T.monto_pagado > 0
+            ),
+            acumulado AS (
+                SELECT id, fecha, saldo,
+                       SUM(saldo) OVER (ORDER BY fecha ASC, id ASC
+                                        ROWS BETWEEN UNBOUNDED PRECEDING AND CURRENT ROW) - saldo AS previo
+                FROM pendientes
+            )
+            SELECT id, ROUND(MIN(saldo, :monto - previo), 2) AS aplicar
+            FROM acumulado
+            WHERE previo < :monto
+            ORDER BY fecha ASC, id ASC
+        """, {'proyecto_id': proyecto_id, 'cliente_id': cliente_id, 'monto': monto_abonar})
+        return [(row['id'], row['aplicar']) for row in cur.fetchall() if row['aplicar'] > 0]
+
     def registrar_abono_general_cliente(self, datos_pago: dict):
         """
         Registra un abono general de un cliente y lo aplica a las facturas
         pendientes más antiguas primero. Es una operación atómica.
         """
-        cur = None
-        try:
-            cur = self._conn.cursor()
-
-            proyecto_id = datos_pago['proyecto_id']
-            cliente_id = datos_pago['cliente_id']
-            monto_abonar = datos_pago['monto']
-            
-            cur.execute("""
-                SELECT T.id, T.monto FROM transacciones T
-                JOIN equipos_alquiler_meta META ON T.id = META.transaccion_id
-                WHERE T.proyecto_id = ? AND META.cliente_id = ? AND T.pagado = 0
-                ORDER BY T.fecha ASC, T.id ASC
-            """, (proyecto_id, cliente_id))
-            pendientes = cur.fetchall()
-            
-            if not pendientes:
-                raise ValueError("Este cliente no tiene facturas pendientes de pago.")
-
-            monto_restante_abono = monto_abonar
-            for trans in pendientes:
-                if monto_restante_abono <= 0:
-                    break
-
-                trans_id = trans['id']
-                monto_factura = trans['monto']
-
-                cur.execute("SELECT SUM(monto) FROM pagos WHERE transaccion_id = ?", (trans_id,))
-                total_previo_pagado = cur.fetchone()[0] or 0
-                
-                monto_pendiente_factura = monto_factura - total_previo_pagado
-                if monto_pendiente_factura <= 0:
-                    continue
-
-                monto_a_aplicar = min(monto_restante_abono, monto_pendiente_factura)
+        def _operacion(conn):
+            cur = conn.cursor()
+            try:
+                distribucion = self._distribuir_abono_fifo(
+                    cur, datos_pago['proyecto_id'], datos_pago['cliente_id'], datos_pago['monto']
+                )
+                if not distribucion:
+                    raise ValueError("Este cliente no tiene facturas pendientes de pago.")
 
-                cur.execute(
+                # Un solo executemany; los triggers de 'pagos' actualizan monto_pagado
+                # y 'pagado' de cada factura dentro de la misma transacción.
+                cur.executemany(
                     "INSERT INTO pagos (transaccion_id, cuenta_id, fecha, monto, comentario) VALUES (?, ?, ?, ?, ?)",
-                    (trans_id, datos_pago['cuenta_id'], datos_pago['fecha'], monto_a_aplicar, datos_pago['comentario'])
+                    [
+                        (trans_id, datos_pago['cuenta_id'], datos_pago['fecha'], monto_a_aplicar, datos_pago['comentario'])
+                        for trans_id, monto_a_aplicar in distribucion
+                    ]
                 )
-                
-                self._actualizar_estado_pago_transaccion(trans_id, cur)
-                monto_restante_abono -= monto_a_aplicar
-
-            self._conn.commit()
-            return True
+                conn.commit()
+                return distribucion
+            except Exception:
+                conn.rollback()
+                raise
+            finally:
+                cur.close()
 
+        try:
+            distribucion = self._escribir_con_reintentos(_operacion)
         except ValueError as ve:
-            self._conn.rollback()
             # Devolvemos el mensaje de error específico para mostrarlo en la GUI
             return str(ve)
         except Exception as e:
-            self._conn.rollback()
             print(f"[ERROR] No se pudo registrar el abono general: {e}")
             return False
-        finally:
-            if cur: cur.close()
+        self._notificar_abonos(ALTA, (), [trans_id for trans_id, _ in distribucion], [datos_pago['fecha']])
+        return True
 
 
     def obtener_abono_por_id(self, pago_id: int):
@@ -810,65 +1537,55 @@ class DatabaseManager:
         """
         Devuelve una lista de todas las cuentas disponibles.
         """
-        return self.fetchall("SELECT id, nombre FROM cuentas ORDER BY nombre")
+        return self._referencia(("cuentas", None), ("cuentas",),
+                                lambda: self.fetchall("SELECT id, nombre FROM cuentas ORDER BY nombre"))
 
-    def _actualizar_estado_pago_transaccion(self, transaccion_id, cursor=None):
-        """
-        Actualiza el campo 'pagado' de la transacción si el monto pagado es igual o mayor al monto de la factura.
-        Si el cursor se pasa como argumento, lo usa; si no, crea uno temporal.
-        """
-        close_cur = False
-        if cursor is None:
-            cursor = self._conn.cursor()
-            close_cur = True
-
-        # Obtener el monto total de la transacción
-        cursor.execute("SELECT monto FROM transacciones WHERE id = ?", (transaccion_id,))
-        row = cursor.fetchone()
-        if not row:
-            if close_cur:
-                cursor.close()
-            return
-        monto_total = row["monto"]
-
-        # Obtener el monto total pagado
-        cursor.execute("SELECT SUM(monto) as pagado FROM pagos WHERE transaccion_id = ?", (transaccion_id,))
-        row = cursor.fetchone()
-        monto_pagado = row["pagado"] or 0
-
-        # Determinar si la factura está pagada
-        pagado = 1 if monto_pagado >= monto_total else 0
-
-        # Actualizar el campo 'pagado' en la transacción
-        cursor.execute("UPDATE transacciones SET pagado = ? WHERE id = ?", (pagado, transaccion_id))
-
-        if close_cur:
-            self._conn.commit()
-            cursor.close()
-
-
-    def _ejecutar_consulta(self, query, params=None, fetchone=False, fetchall=False, commit=False):
+    def _ejecutar_consulta(self, query, params=None, fetchone=False, fetchall=False, commit=False,
+                           lote=None):
         """
         Método genérico para ejecutar consultas SQL.
         Devuelve los resultados como diccionarios.
+        Con 'lote' (y sin commit) devuelve un generador de lotes de sqlite3.Row.
         """
-        # Permite acceder a los resultados por nombre de columna
-        self._conn.row_factory = sqlite3.Row 
-        cursor = self._conn.cursor()
-        
-        if params:
-            cursor.execute(query, params)
+        if lote and not commit:
+            return self.iterfetch(query, params or (), batch_size=lote)
+        if commit:
+            def _operacion(conn):
+                cursor = conn.cursor()
+                try:
+                    if params:
+                        cursor.execute(query, params)
+                    else:
+                        cursor.execute(query)
+                    res = None
+                    if fetchone:
+                        res = cursor.fetchone()
+                    elif fetchall:
+                        res = cursor.fetchall()
+                    conn.commit()
+                    return res
+                except sqlite3.OperationalError:
+                    conn.rollback()
+                    raise
+                finally:
+                    cursor.close()
+            resultado = self._escribir_con_reintentos(_operacion)
         else:
-            cursor.execute(query)
+            # Permite acceder a los resultados por nombre de columna
+            conn = self._conexion_lectura()
+            conn.row_factory = sqlite3.Row
+            cursor = conn.cursor()
 
-        resultado = None
-        if fetchone:
-            resultado = cursor.fetchone()
-        elif fetchall:
-            resultado = cursor.fetchall()
+            if params:
+                cursor.execute(query, params)
+            else:
+                cursor.execute(query)
 
-        if commit:
-            self._conn.commit()
+            resultado = None
+            if fetchone:
+                resultado = cursor.fetchone()
+            elif fetchall:
+                resultado = cursor.fetchall()
 
         # Si el resultado es una lista de sqlite3.Row, lo convertimos a una lista de diccionarios
         if isinstance(resultado, list):
@@ -883,14 +1600,17 @@ class DatabaseManager:
     def eliminar_alquiler(self, alquiler_id):
         """
         Elimina un registro de alquiler (una transacción) de la base de datos.
+        Devuelve el id eliminado, o False si falla.
         """
         try:
             query = "DELETE FROM transacciones WHERE id = :id"
             params = {'id': alquiler_id}
+            antes = self._alcance_transacciones([alquiler_id])
             # Usamos el método ayudante que ya tienes, asegurando que se haga commit
             self._ejecutar_consulta(query, params, commit=True)
+            self._notificar_transacciones(BAJA, [alquiler_id], antes)
             print(f"[INFO] Alquiler con ID {alquiler_id} eliminado exitosamente.")
-            return True # Retorna True si la operación fue exitosa
+            return alquiler_id
         except Exception as e:
             print(f"[ERROR] No se pudo eliminar el alquiler con ID {alquiler_id}: {e}")
             return False # Retorna False si ocurrió un error
@@ -914,23 +1634,22 @@ class DatabaseManager:
             return None
 
     def obtener_equipos_por_proyecto(self, proyecto_id):
-        rows = self.fetchall(
+        return self._referencia(("equipos", proyecto_id), ("equipos",), lambda: self.fetchall(
             "SELECT id, nombre FROM equipos WHERE proyecto_id = ?",
             (proyecto_id,)
-        )
-        # print("Equipos encontrados:", rows)  # <-- ELIMINA O COMENTA ESTA LINEA
-        return rows
+        ))
 
 
 
     def obtener_todos_los_equipos(self):
         # Esta es la función correcta y única para Equipos
         query = "SELECT id, nombre FROM equipos WHERE activo = 1 ORDER BY nombre"
-        return self.fetchall(query)
+        return self._referencia(("equipos", None), ("equipos",), lambda: self.fetchall(query))
 
     def crear_nuevo_alquiler(self, datos):
         """
         Inserta un nuevo alquiler en la tabla 'transacciones'.
+        Devuelve el id creado, o False si falla.
         """
         try:
             # Generamos un ID único para la nueva transacción
@@ -944,8 +1663,9 @@ class DatabaseManager:
             query = f"INSERT INTO transacciones ({columnas}) VALUES ({placeholders})"
             
             self._ejecutar_consulta(query, datos, commit=True)
+            self._notificar_transacciones(ALTA, [datos['id']])
             print(f"[INFO] Nuevo alquiler creado con ID {datos['id']}.")
-            return True
+            return datos['id']
         except Exception as e:
             print(f"[ERROR] No se pudo crear el nuevo alquiler: {e}")
             return False
@@ -955,6 +1675,7 @@ class DatabaseManager:
     def actualizar_alquiler(self, transaccion_id, datos):
         """
         Actualiza un alquiler existente en la tabla 'transacciones'.
+        Devuelve el id actualizado, o False si falla.
         """
         try:
             # Construimos la parte SET de la consulta dinámicamente
@@ -967,9 +1688,11 @@ class DatabaseManager:
             params = datos.copy()
             params['transaccion_id'] = transaccion_id
             
+            antes = self._alcance_transacciones([transaccion_id])
             self._ejecutar_consulta(query, params, commit=True)
+            self._notificar_transacciones(EDICION, [transaccion_id], antes)
             print(f"[INFO] Alquiler con ID {transaccion_id} actualizado exitosamente.")
-            return True
+            return transaccion_id
         except Exception as e:
             print(f"[ERROR] No se pudo actualizar el alquiler con ID {transaccion_id}: {e}")
             return False
@@ -983,11 +1706,13 @@ class DatabaseManager:
     def actualizar_conduce_adjunto(self, transaccion_id, ruta_adjunto):
         """
         Actualiza únicamente la ruta del archivo de conduce para una transacción existente.
+        Devuelve el id de la transacción, o False si falla.
         """
         try:
             query = "UPDATE transacciones SET conduce_adjunto_path = ? WHERE id = ?"
             self.execute(query, (ruta_adjunto, transaccion_id))
-            return True
+            self._notificar_transacciones(EDICION, [transaccion_id])
+            return transaccion_id
         except Exception as e:
             logger.error(f"Error al actualizar conduce adjunto para {transaccion_id}: {e}")
             return False
@@ -1048,6 +1773,117 @@ class DatabaseManager:
         
         return facturas, abonos
 
+    def _filtro_facturas_estado_cuenta(self, cliente_id, fecha_inicio, fecha_fin, proyecto_id=None):
+        condiciones = ["T.tipo = 'Ingreso'", "T.fecha BETWEEN ? AND ?"]
+        params = [str(fecha_inicio), str(fecha_fin)]
+        if proyecto_id is not None:
+            condiciones.append("T.proyecto_id = ?")
+            params.append(proyecto_id)
+        if cliente_id is not None:
+            condiciones.append("T.cliente_id = ?")
+            params.append(cliente_id)
+        return " AND ".join(condiciones), params
+
+    def iterar_facturas_estado_cuenta(self, cliente_id, fecha_inicio, fecha_fin, proyecto_id=None, batch_size=500):
+        """
+        Facturas del estado de cuenta como generador de lotes (ver iterfetch),
+        ordenadas por equipo y fecha para que ReportGenerator.to_pdf escriba
+        cada equipo con su subtotal en una sola pasada.
+        cliente_id None = todos los clientes del proyecto.
+        """
+        where, params = self._filtro_facturas_estado_cuenta(cliente_id, fecha_inicio, fecha_fin, proyecto_id)
+        return self.iterfetch(
+            f"""
+            SELECT T.fecha, T.conduce, T.ubicacion, T.horas, T.monto, T.conduce_adjunto_path,
+                   CLI.nombre AS cliente_nombre, EQ.nombre AS equipo_nombre
+            FROM transacciones T
+            LEFT JOIN equipos_entidades CLI ON T.cliente_id = CLI.id
+            LEFT JOIN equipos EQ ON T.equipo_id = EQ.id
+            WHERE {where}
+            ORDER BY EQ.nombre, T.fecha, T.id
+            """,
+            params, batch_size=batch_size
+        )
+
+    def obtener_resumen_facturas_estado_cuenta(self, cliente_id, fecha_inicio, fecha_fin, proyecto_id=None):
+        """Cantidad y total de las facturas que recorre iterar_facturas_estado_cuenta."""
+        where, params = self._filtro_facturas_estado_cuenta(cliente_id, fecha_inicio, fecha_fin, proyecto_id)
+        fila = self.fetchone(
+            f"SELECT COUNT(*) AS cantidad, COALESCE(SUM(T.monto), 0) AS total FROM transacciones T WHERE {where}",
+            params
+        )
+        return fila['cantidad'], fila['total']
+
+    def obtener_abonos_estado_cuenta(self, cliente_id, fecha_inicio, fecha_fin, proyecto_id=None):
+        """Abonos del estado de cuenta (sin cargar las facturas). cliente_id None = todos."""
+        condiciones = ["P.fecha BETWEEN ? AND ?"]
+        params = [str(fecha_inicio), str(fecha_fin)]
+        if proyecto_id is not None:
+            condiciones.append("T.proyecto_id = ?")
+            params.append(proyecto_id)
+        if cliente_id is not None:
+            condiciones.append("T.cliente_id = ?")
+            params.append(cliente_id)
+        return self.fetchall(
+            f"""
+            SELECT P.*, T.descripcion AS transaccion_descripcion, CLI.nombre AS cliente_nombre
+            FROM pagos P
+            JOIN transacciones T ON P.transaccion_id = T.id
+            LEFT JOIN equipos_entidades CLI ON T.cliente_id = CLI.id
+            WHERE {" AND ".join(condiciones)}
+            ORDER BY P.fecha
+            """,
+            params
+        )
+
+    def obtener_estados_cuenta_por_cliente(self, proyecto_id, fecha_inicio, fecha_fin):
+        """
+        Facturas y abonos de TODOS los clientes del proyecto en dos consultas
+        agrupadas, para generar sus estados de cuenta en lote:
+        [{'cliente_id', 'cliente_nombre', 'facturas': [...], 'abonos': [...]}]
+        por nombre de cliente. Solo clientes con facturas en el rango; las
+        facturas van ordenadas por equipo y fecha. Las filas son dicts simples
+        porque se envían a otros procesos.
+        """
+        params = (proyecto_id, str(fecha_inicio), str(fecha_fin))
+        clientes = {}
+        for lote in self.iterfetch(
+            """
+            SELECT T.cliente_id, CLI.nombre AS cliente_nombre, T.fecha, T.conduce, T.ubicacion,
+                   T.horas, T.monto, T.conduce_adjunto_path, EQ.nombre AS equipo_nombre
+            FROM transacciones T
+            JOIN equipos_entidades CLI ON T.cliente_id = CLI.id
+            LEFT JOIN equipos EQ ON T.equipo_id = EQ.id
+            WHERE T.proyecto_id = ? AND T.fecha BETWEEN ? AND ? AND T.tipo = 'Ingreso'
+            ORDER BY CLI.nombre, T.cliente_id, EQ.nombre, T.fecha, T.id
+            """,
+            params
+        ):
+            for row in lote:
+                cliente = clientes.get(row['cliente_id'])
+                if cliente is None:
+                    cliente = clientes[row['cliente_id']] = {
+                        'cliente_id': row['cliente_id'], 'cliente_nombre': row['cliente_nombre'],
+                        'facturas': [], 'abonos': []
+                    }
+                cliente['facturas'].append(dict(row))
+
+        for lote in self.iterfetch(
+            """
+            SELECT T.cliente_id, P.fecha, P.monto, P.comentario
+            FROM pagos P
+            JOIN transacciones T ON P.transaccion_id = T.id
+            WHERE T.proyecto_id = ? AND P.fecha BETWEEN ? AND ? AND T.cliente_id IS NOT NULL
+            ORDER BY T.cliente_id, P.fecha, P.id
+            """,
+            params
+        ):
+            for row in lote:
+                cliente = clientes.get(row['cliente_id'])
+                if cliente is not None:
+                    cliente['abonos'].append(dict(row))
+        return list(clientes.values())
+
     def obtener_total_abonos_cliente(self, proyecto_id, cliente_id, fecha_inicio, fecha_fin):
         """
         NUEVA FUNCIÓN: Obtiene el total abonado por un cliente en un rango de fechas.
@@ -1062,39 +1898,6 @@ class DatabaseManager:
         return resultado['total'] if resultado and resultado['total'] else 0.0
     
 
-    def obtener_pagos_a_operadores(self, proyecto_id, filtros):
-        q = """
-        SELECT t.id, t.fecha, c.nombre as cuenta, o.nombre as operador, eq.nombre as equipo,
-            t.horas, t.descripcion, t.monto, t.comentario
-        FROM transacciones t
-            LEFT JOIN cuentas c ON t.cuenta_id = c.id
-            LEFT JOIN equipos_entidades o ON t.operador_id = o.id AND o.tipo = 'Operador'
-            LEFT JOIN equipos eq ON t.equipo_id = eq.id
-        WHERE t.proyecto_id = ? AND t.tipo = 'Gasto'
-        AND t.categoria_id IN (SELECT id FROM categorias WHERE nombre = 'PAGO HRS OPERADOR')
-        """
-        params = [proyecto_id]
-        if filtros.get("cuenta_id"):
-            q += " AND t.cuenta_id = ?"
-            params.append(filtros["cuenta_id"])
-        if filtros.get("operador_id"):
-            q += " AND t.operador_id = ?"
-            params.append(filtros["operador_id"])
-        if filtros.get("equipo_id"):
-            q += " AND t.equipo_id = ?"
-            params.append(filtros["equipo_id"])
-        if filtros.get("fecha_desde"):
-            q += " AND date(t.fecha) >= ?"
-            params.append(filtros["fecha_desde"])
-        if filtros.get("fecha_hasta"):
-            q += " AND date(t.fecha) <= ?"
-            params.append(filtros["fecha_hasta"])
-        if filtros.get("texto"):
-            q += " AND (t.descripcion LIKE ? OR t.comentario LIKE ?)"
-            params.extend([f"%{filtros['texto']}%", f"%{filtros['texto']}%"])
-        q += " ORDER BY date(t.fecha) DESC, t.id DESC"
-        return self.fetchall(q, tuple(params))
-
     def analisis_horas_por_operador(self, proyecto_id):
         """
         Calcula el total de horas y el ingreso total generado por cada operador
@@ -1120,12 +1923,14 @@ class DatabaseManager:
     # Obtiene cuentas del proyecto
     def obtener_cuentas_por_proyecto(self, proyecto_id):
         q = "SELECT id, nombre FROM cuentas WHERE id IN (SELECT cuenta_id FROM transacciones WHERE proyecto_id = ?) ORDER BY nombre"
-        return self.fetchall(q, (proyecto_id,))
+        return self._referencia(("cuentas", proyecto_id), ("cuentas", "transacciones"),
+                                lambda: self.fetchall(q, (proyecto_id,)))
 
     # Obtiene categorías de tipo (Gasto/Ingreso) usadas en el proyecto
     def obtener_categorias_por_proyecto(self, proyecto_id, tipo="Gasto"):
         q = "SELECT DISTINCT c.id, c.nombre FROM transacciones t JOIN categorias c ON t.categoria_id = c.id WHERE t.proyecto_id = ? AND t.tipo = ? ORDER BY c.nombre"
-        return self.fetchall(q, (proyecto_id, tipo))
+        return self._referencia(("categorias", proyecto_id, tipo), ("categorias", "transacciones"),
+                                lambda: self.fetchall(q, (proyecto_id, tipo)))
 
     # Obtiene subcategorías para una categoría
     def obtener_subcategorias_por_categoria(self, categoria_id):
@@ -1139,79 +1944,68 @@ class DatabaseManager:
         subcat = self.fetchone("SELECT id FROM subcategorias WHERE nombre = ? AND categoria_id = ?", (nombre, categoria_id))
         if subcat:
             return subcat['id']
-        cur = self._conn.cursor()
-        cur.execute("INSERT INTO subcategorias (nombre, categoria_id) VALUES (?, ?)", (nombre, categoria_id))
-        self._conn.commit()
-        subcat_id = cur.lastrowid
-        cur.close()
+        subcat_id = self.execute("INSERT INTO subcategorias (nombre, categoria_id) VALUES (?, ?)", (nombre, categoria_id))
+        self.notificar_cambio("subcategorias", ALTA, (subcat_id,))
         return subcat_id
 
     # Guarda un gasto de equipo
     def guardar_gasto_equipo(self, datos):
+        """Inserta un gasto de equipo; devuelve su id o False si falla."""
         q = """
         INSERT INTO transacciones
         (id, proyecto_id, cuenta_id, categoria_id, subcategoria_id, equipo_id, tipo, descripcion, comentario, monto, fecha)
         VALUES (:id, :proyecto_id, :cuenta_id, :categoria_id, :subcategoria_id, :equipo_id, :tipo, :descripcion, :comentario, :monto, :fecha)
         """
         try:
-            cur = self._conn.cursor()
-            cur.execute(q, datos)
-            self._conn.commit()
-            cur.close()
-            return True
+            self.execute(q, datos)
+            self._notificar_transacciones(ALTA, [datos['id']])
+            return datos['id']
         except Exception as e:
             print("Error guardando gasto:", e)
             return False
 
     # Obtiene los gastos con todos los filtros
-    def obtener_gastos_equipo(self, proyecto_id, filtros):
-        q = """
-        SELECT t.id, t.fecha, c.nombre as cuenta, ca.nombre as categoria, s.nombre as subcategoria,
-            eq.nombre as equipo, t.descripcion, t.monto, t.comentario
-        FROM transacciones t
-            LEFT JOIN cuentas c ON t.cuenta_id = c.id
-            LEFT JOIN categorias ca ON t.categoria_id = ca.id
-            LEFT JOIN subcategorias s ON t.subcategoria_id = s.id
-            LEFT JOIN equipos eq ON t.equipo_id = eq.id
-        WHERE t.proyecto_id = ? AND t.tipo = 'Gasto'
-        """
-        params = [proyecto_id]
-        if filtros.get("cuenta_id"):
-            q += " AND t.cuenta_id = ?"
-            params.append(filtros["cuenta_id"])
-        if filtros.get("categoria_id"):
-            q += " AND t.categoria_id = ?"
-            params.append(filtros["categoria_id"])
-        if filtros.get("subcategoria_id"):
-            q += " AND t.subcategoria_id = ?"
-            params.append(filtros["subcategoria_id"])
-        if filtros.get("equipo_id"):
-            q += " AND t.equipo_id = ?"
-            params.append(filtros["equipo_id"])
-        if filtros.get("fecha_desde"):
-            q += " AND date(t.fecha) >= ?"
-            params.append(filtros["fecha_desde"])
-        if filtros.get("fecha_hasta"):
-            q += " AND date(t.fecha) <= ?"
-            params.append(filtros["fecha_hasta"])
-        if filtros.get("texto"):
-            q += " AND (t.descripcion LIKE ? OR t.comentario LIKE ?)"
-            params.extend([f"%{filtros['texto']}%", f"%{filtros['texto']}%"])
-        q += " ORDER BY date(t.fecha) DESC, t.id DESC"
-        return self.fetchall(q, tuple(params))
+    def obtener_gastos_equipo(self, proyecto_id, filtros, compacto=False):
+        return self._listar_con_filtros(
+            filtros_sql.GASTOS_EQUIPO, filtros, {'proyecto_id': proyecto_id}, compacto=compacto
+        )
+
+    def obtener_pagina_gastos_equipo(self, proyecto_id, filtros, despues_de=None, limite=200):
+        """Una página del listado de gastos (ver obtener_pagina_transacciones_por_proyecto)."""
+        return self._listar_con_filtros(
+            filtros_sql.GASTOS_EQUIPO, filtros, {'proyecto_id': proyecto_id}, compacto=True,
+            despues_de=despues_de, limite=limite
+        )
+
+    def obtener_totales_gastos_equipo(self, proyecto_id, filtros):
+        sql, params = filtros_sql.GASTOS_EQUIPO.compilar_totales(
+            filtros, {'proyecto_id': proyecto_id}
+        )
+        return self.fetchone(sql, params)
+
+    def obtener_fila_gasto_equipo(self, proyecto_id, gasto_id, filtros=None):
+        """Fila de un gasto con la forma del listado (ver obtener_fila_transaccion_por_proyecto)."""
+        return self._fila_listado(filtros_sql.GASTOS_EQUIPO, filtros, {'proyecto_id': proyecto_id}, gasto_id)
+
+    def iterar_gastos_equipo(self, proyecto_id, filtros, batch_size=500):
+        """Igual que obtener_gastos_equipo, pero como generador de lotes."""
+        return self._listar_con_filtros(
+            filtros_sql.GASTOS_EQUIPO, filtros, {'proyecto_id': proyecto_id}, lote=batch_size
+        )
 
     def eliminar_gasto_equipo(self, gasto_id):
+        """Elimina un gasto; devuelve el id eliminado o False."""
         try:
-            cur = self._conn.cursor()
-            cur.execute("DELETE FROM transacciones WHERE id = ?", (gasto_id,))
-            self._conn.commit()
-            cur.close()
-            return True
+            antes = self._alcance_transacciones([gasto_id])
+            self.execute("DELETE FROM transacciones WHERE id = ?", (gasto_id,))
+            self._notificar_transacciones(BAJA, [gasto_id], antes)
+            return gasto_id
         except Exception as e:
             print("Error eliminando gasto:", e)
             return False
 
     def editar_gasto_equipo(self, datos):
+        """Actualiza un gasto; devuelve su id o False si falla."""
         q = """
         UPDATE transacciones
         SET cuenta_id=:cuenta_id, categoria_id=:categoria_id, subcategoria_id=:subcategoria_id,
@@ -1220,39 +2014,38 @@ class DatabaseManager:
         WHERE id=:id
         """
         try:
-            cur = self._conn.cursor()
-            cur.execute(q, datos)
-            self._conn.commit()
-            cur.close()
-            return True
+            antes = self._alcance_transacciones([datos['id']])
+            self.execute(q, datos)
+            self._notificar_transacciones(EDICION, [datos['id']], antes)
+            return datos['id']
         except Exception as e:
             print("Error editando gasto:", e)
             return False
 
 
     def obtener_operadores_por_proyecto(self, proyecto_id):
-        return self.fetchall(
+        return self._referencia(("operadores_activos", proyecto_id), ("equipos_entidades",), lambda: self.fetchall(
             "SELECT id, nombre FROM equipos_entidades WHERE proyecto_id = ? AND tipo = 'Operador' AND activo = 1 ORDER BY nombre",
             (proyecto_id,)
-        )
+        ))
     
     def guardar_pago_operador(self, datos):
+        """Inserta un pago a operador; devuelve su id o False si falla."""
         q = """
         INSERT INTO transacciones
         (id, proyecto_id, cuenta_id, categoria_id, subcategoria_id, equipo_id, operador_id, tipo, descripcion, comentario, monto, fecha, horas)
         VALUES (:id, :proyecto_id, :cuenta_id, :categoria_id, :subcategoria_id, :equipo_id, :operador_id, :tipo, :descripcion, :comentario, :monto, :fecha, :horas)
         """
         try:
-            cur = self._conn.cursor()
-            cur.execute(q, datos)
-            self._conn.commit()
-            cur.close()
-            return True
+            self.execute(q, datos)
+            self._notificar_transacciones(ALTA, [datos['id']])
+            return datos['id']
         except Exception as e:
             print("Error guardando pago operador:", e)
             return False
 
     def editar_pago_operador(self, datos):
+        """Actualiza un pago a operador; devuelve su id o False si falla."""
         q = """
         UPDATE transacciones
         SET cuenta_id=:cuenta_id, categoria_id=:categoria_id, subcategoria_id=:subcategoria_id,
@@ -1261,58 +2054,60 @@ class DatabaseManager:
         WHERE id=:id
         """
         try:
-            cur = self._conn.cursor()
-            cur.execute(q, datos)
-            self._conn.commit()
-            cur.close()
-            return True
+            antes = self._alcance_transacciones([datos['id']])
+            self.execute(q, datos)
+            self._notificar_transacciones(EDICION, [datos['id']], antes)
+            return datos['id']
         except Exception as e:
             print("Error editando pago operador:", e)
             return False
 
     def eliminar_pago_operador(self, pago_id):
+        """Elimina un pago a operador; devuelve el id eliminado o False."""
         try:
-            cur = self._conn.cursor()
-            cur.execute("DELETE FROM transacciones WHERE id = ?", (pago_id,))
-            self._conn.commit()
-            cur.close()
-            return True
+            antes = self._alcance_transacciones([pago_id])
+            self.execute("DELETE FROM transacciones WHERE id = ?", (pago_id,))
+            self._notificar_transacciones(BAJA, [pago_id], antes)
+            return pago_id
         except Exception as e:
             print("Error eliminando pago operador:", e)
             return False
 
-    def obtener_pagos_a_operadores(self, proyecto_id, filtros):
-        q = """
-        SELECT t.id, t.fecha, c.nombre as cuenta, o.nombre as operador, eq.nombre as equipo,
-            t.horas, t.descripcion, t.monto, t.comentario
-        FROM transacciones t
-            LEFT JOIN cuentas c ON t.cuenta_id = c.id
-            LEFT JOIN equipos_entidades o ON t.operador_id = o.id AND o.tipo = 'Operador'
-            LEFT JOIN equipos eq ON t.equipo_id = eq.id
-        WHERE t.proyecto_id = ? AND t.tipo = 'Gasto'
-        AND t.categoria_id IN (SELECT id FROM categorias WHERE nombre = 'PAGO HRS OPERADOR')
-        """
-        params = [proyecto_id]
-        if filtros.get("cuenta_id"):
-            q += " AND t.cuenta_id = ?"
-            params.append(filtros["cuenta_id"])
-        if filtros.get("operador_id"):
-            q += " AND t.operador_id = ?"
-            params.append(filtros["operador_id"])
-        if filtros.get("equipo_id"):
-            q += " AND t.equipo_id = ?"
-            params.append(filtros["equipo_id"])
-        if filtros.get("fecha_desde"):
-            q += " AND date(t.fecha) >= ?"
-            params.append(filtros["fecha_desde"])
-        if filtros.get("fecha_hasta"):
-            q += " AND date(t.fecha) <= ?"
-            params.append(filtros["fecha_hasta"])
-        if filtros.get("texto"):
-            q += " AND (t.descripcion LIKE ? OR t.comentario LIKE ?)"
-            params.extend([f"%{filtros['texto']}%", f"%{filtros['texto']}%"])
-        q += " ORDER BY date(t.fecha) DESC, t.id DESC"
-        return self.fetchall(q, tuple(params))
+    def obtener_pagos_a_operadores(self, proyecto_id, filtros, compacto=False):
+        return self._listar_con_filtros(
+            filtros_sql.PAGOS_OPERADORES, filtros,
+            {'proyecto_id': proyecto_id, 'categoria_nombre': 'PAGO HRS OPERADOR'},
+            compacto=compacto
+        )
+
+    def obtener_pagina_pagos_a_operadores(self, proyecto_id, filtros, despues_de=None, limite=200):
+        """Una página del listado de pagos a operadores."""
+        return self._listar_con_filtros(
+            filtros_sql.PAGOS_OPERADORES, filtros,
+            {'proyecto_id': proyecto_id, 'categoria_nombre': 'PAGO HRS OPERADOR'},
+            compacto=True, despues_de=despues_de, limite=limite
+        )
+
+    def obtener_totales_pagos_a_operadores(self, proyecto_id, filtros):
+        sql, params = filtros_sql.PAGOS_OPERADORES.compilar_totales(
+            filtros, {'proyecto_id': proyecto_id, 'categoria_nombre': 'PAGO HRS OPERADOR'}
+        )
+        return self.fetchone(sql, params)
+
+    def obtener_fila_pago_a_operador(self, proyecto_id, pago_id, filtros=None):
+        """Fila de un pago con la forma del listado (ver obtener_fila_transaccion_por_proyecto)."""
+        return self._fila_listado(
+            filtros_sql.PAGOS_OPERADORES, filtros,
+            {'proyecto_id': proyecto_id, 'categoria_nombre': 'PAGO HRS OPERADOR'}, pago_id
+        )
+
+    def iterar_pagos_a_operadores(self, proyecto_id, filtros, batch_size=500):
+        """Igual que obtener_pagos_a_operadores, pero como generador de lotes."""
+        return self._listar_con_filtros(
+            filtros_sql.PAGOS_OPERADORES, filtros,
+            {'proyecto_id': proyecto_id, 'categoria_nombre': 'PAGO HRS OPERADOR'},
+            lote=batch_size
+        )
 
     def obtener_cliente_equipo(self, proyecto_id, equipo_id):
         """
@@ -1357,20 +2152,17 @@ class DatabaseManager:
         if row and 'id' in row:
             return row['id']
         # Si no existe, crear
-        cur = self._conn.cursor()
         if columna_extra and valor_extra is not None:
-            cur.execute(
+            new_id = self.execute(
                 f"INSERT INTO {tabla} (nombre, {columna_extra}) VALUES (?, ?)",
                 (nombre, valor_extra)
             )
         else:
-            cur.execute(
+            new_id = self.execute(
                 f"INSERT INTO {tabla} (nombre) VALUES (?)",
                 (nombre,)
             )
-        self._conn.commit()
-        new_id = cur.lastrowid
-        cur.close()
+        self.notificar_cambio(tabla, ALTA, (new_id,))
         return new_id
 
 
@@ -1401,7 +2193,8 @@ class DatabaseManager:
                 UNIQUE(nombre, tipo, proyecto_id)
             )
         """
-        self.execute(query)
+        self._conn.execute(query)
+        self._confirmar()
         logger.info("Tabla equipos_entidades asegurada")
 
     def guardar_entidad(self, datos, entidad_id=None):
@@ -1426,13 +2219,14 @@ class DatabaseManager:
                     entidad_id
                 ))
                 logger.info("Entidad actualizada: ID=%s, nombre=%s", entidad_id, datos.get("nombre"))
+                operacion = EDICION
             else:
                 # Crear nueva entidad
                 query = """
                     INSERT INTO equipos_entidades (nombre, tipo, proyecto_id, activo, telefono, cedula)
                     VALUES (?, ?, ?, ?, ?, ?)
                 """
-                self.execute(query, (
+                entidad_id = self.execute(query, (
                     datos.get("nombre"),
                     datos.get("tipo"),
                     datos.get("proyecto_id"),
@@ -1441,6 +2235,8 @@ class DatabaseManager:
                     datos.get("cedula")
                 ))
                 logger.info("Nueva entidad creada: nombre=%s, tipo=%s", datos.get("nombre"), datos.get("tipo"))
+                operacion = ALTA
+            self.notificar_cambio("equipos_entidades", operacion, (entidad_id,), datos.get("proyecto_id"))
             return True
         except Exception as e:
             logger.exception("Error guardando entidad: %s", e)
@@ -1455,6 +2251,7 @@ class DatabaseManager:
             # En lugar de eliminar físicamente, marcamos como inactiva
             self.execute("UPDATE equipos_entidades SET activo = 0 WHERE id = ?", (entidad_id,))
             logger.info("Entidad marcada como inactiva: ID=%s", entidad_id)
+            self.notificar_cambio("equipos_entidades", BAJA, (entidad_id,))
             return True
         except Exception as e:
             logger.exception("Error eliminando entidad ID=%s: %s", entidad_id, e)
@@ -1467,12 +2264,86 @@ class DatabaseManager:
         return self.fetchone("SELECT * FROM equipos_entidades WHERE id = ?", (entidad_id,))
 
 # --- CLASES DE DATOS (MODELOS) ---
+def _parsear_fecha(valor):
+    """Convierte 'YYYY-MM-DD' (o 'YYYY-MM-DD HH:MM...') a date; deja pasar lo demás."""
+    if isinstance(valor, str) and valor:
+        return date.fromisoformat(valor[:10])
+    return valor
+
+
+class FilaCompacta(tuple):
+    """
+    Fila de resultado inmutable y compacta: una tupla con acceso por nombre.
+
+    - fila['monto'], fila.get('monto'), 'monto' in fila, fila.keys() y dict(fila)
+      se comportan como en los dicts que devuelve fetchall (valor crudo).
+    - fila.monto / fila.fecha devuelven el valor ya tipado (float / date),
+      convertido de forma perezosa sólo cuando se accede.
+    """
+    __slots__ = ()
+    _indices = {}
+    _fechas = frozenset()
+    _numericos = frozenset()
+
+    def __getitem__(self, clave):
+        if isinstance(clave, str):
+            return tuple.__getitem__(self, self._indices[clave])
+        return tuple.__getitem__(self, clave)
+
+    def __getattr__(self, nombre):
+        indice = self._indices.get(nombre)
+        if indice is None:
+            raise AttributeError(nombre)
+        valor = tuple.__getitem__(self, indice)
+        if nombre in self._fechas:
+            return _parsear_fecha(valor)
+        if nombre in self._numericos:
+            return float(valor or 0)
+        return valor
+
+    def __contains__(self, clave):
+        return clave in self._indices
+
+    def get(self, clave, defecto=None):
+        indice = self._indices.get(clave)
+        return defecto if indice is None else tuple.__getitem__(self, indice)
+
+    def keys(self):
+        return self._indices.keys()
+
+    def __repr__(self):
+        return f"{type(self).__name__}({dict(self)!r})"
+
+
+COLUMNAS_NUMERICAS = frozenset(('monto', 'horas', 'precio_por_hora', 'kilometros'))
+_tipos_fila = {}
+
+
+def tipo_fila(forma, columnas):
+    """
+    Devuelve (y cachea) la subclase de FilaCompacta para una forma de consulta
+    y su lista de columnas. Las columnas 'fecha*' se tipan como date y las de
+    COLUMNAS_NUMERICAS como float.
+    """
+    clave = (forma, columnas)
+    tipo = _tipos_fila.get(clave)
+    if tipo is None:
+        nombre = "Fila" + "".join(parte.capitalize() for parte in forma.split("_"))
+        tipo = type(nombre, (FilaCompacta,), {
+            '__slots__': (),
+            '_indices': {col: i for i, col in enumerate(columnas)},
+            '_fechas': frozenset(c for c in columnas if c == 'fecha' or c.startswith('fecha_')),
+            '_numericos': COLUMNAS_NUMERICAS.intersection(columnas),
+        })
+        _tipos_fila[clave] = tipo
+    return tipo
+
+
 class Transaccion:
     def __init__(self, **kwargs):
         self.id = kwargs.get('id')
-        self.fecha = kwargs.get('fecha')
-        if isinstance(self.fecha, str):
-            self.fecha = datetime.strptime(self.fecha, '%Y-%m-%d').date()
+        # La fecha se guarda cruda y se convierte a date sólo al leerla
+        self._fecha = kwargs.get('fecha')
         self.tipo = kwargs.get('tipo')
         self.categoria_nombre = kwargs.get('categoria_nombre')
         self.equipo_nombre = kwargs.get('equipo_nombre')
@@ -1485,6 +2356,16 @@ class Transaccion:
         self.precio_por_hora = float(kwargs.get('precio_por_hora', 0) or 0)
         self.pagado = bool(kwargs.get('pagado', 0))
 
+    @property
+    def fecha(self):
+        if isinstance(self._fecha, str):
+            self._fecha = datetime.strptime(self._fecha, '%Y-%m-%d').date()
+        return self._fecha
+
+    @fecha.setter
+    def fecha(self, valor):
+        self._fecha = valor
+
 
 
 
@@ -2,11 +2,11 @@ import sys
 import os
 import logging
 import traceback
-from PyQt6.QtWidgets import QApplication, QFileDialog, QMessageBox
 
-from logic import DatabaseManager
-from config_manager import cargar_configuracion, guardar_configuracion
-from app_gui_qt import AppGUI
+import perfil_arranque
+# Qt y la aplicación se importan dentro de main(): los procesos de los pools
+# (estados de cuenta en lote, caché de conduces) arrancan con "spawn" y vuelven
+# a importar este módulo, y no deben cargar la interfaz ni activar el perfil.
 
 # Configurar logging global (archivo ya usado por el proyecto)
 LOG_FILE = "progain.log"
@@ -28,6 +28,7 @@ def excepthook(exc_type, exc_value, exc_tb):
 
     # Intentar mostrar un dialogo si la app GUI está disponible.
     try:
+        from PyQt6.QtWidgets import QApplication, QMessageBox
         app = QApplication.instance()
         created_temp_app = False
         if app is None:
@@ -65,6 +66,7 @@ def solicitar_bd_por_dialogo():
     Muestra un QFileDialog para seleccionar una base de datos SQLite.
     Retorna la ruta seleccionada o None si el usuario cancela.
     """
+    from PyQt6.QtWidgets import QFileDialog
     file_path, _ = QFileDialog.getOpenFileName(
         None,
         "Seleccionar base de datos",
@@ -75,6 +77,14 @@ def solicitar_bd_por_dialogo():
 
 
 def main():
+    from PyQt6.QtWidgets import QApplication, QMessageBox
+    from PyQt6.QtCore import QTimer
+
+    from perfil_arranque import medir_arranque
+    from logic import DatabaseManager
+    from config_manager import cargar_configuracion, guardar_configuracion
+    from app_gui_qt import AppGUI
+
     # Registrar el manejador global de excepciones
     sys.excepthook = excepthook
 
@@ -83,7 +93,8 @@ def main():
 
     # Cargar configuración (archivo gestionado por config_manager)
     try:
-        config = cargar_configuracion()
+        with medir_arranque("cargar_configuracion"):
+            config = cargar_configuracion()
     except Exception as e:
         logger.exception("No se pudo cargar la configuración: %s", e)
         config = {}
@@ -116,23 +127,17 @@ def main():
 
     # Inicializar el gestor de base de datos
     try:
-        db_manager = DatabaseManager(db_path)
+        with medir_arranque("DatabaseManager"):
+            db_manager = DatabaseManager(db_path, usar_pool=bool(config.get("usar_pool_conexiones", False)))
     except Exception as e:
         logger.exception("No se pudo inicializar DatabaseManager con %s: %s", db_path, e)
         QMessageBox.critical(None, "Error BD", f"No se pudo abrir la base de datos:\n{db_path}\n\n{e}")
         sys.exit(1)
 
-    # Asegurar las tablas necesarias (migraciones mínimas)
+    # Asegurar el esquema (migraciones versionadas; no hace nada si ya está al día)
     try:
-        db_manager.crear_tablas_nucleo()
-        db_manager.sembrar_datos_iniciales()
-        db_manager.crear_tabla_equipos()
-        db_manager.asegurar_tabla_alquiler_meta()
-        db_manager.asegurar_tabla_pagos()
-        db_manager.asegurar_tabla_mantenimientos()
-        db_manager.asegurar_tablas_mantenimiento()
-        db_manager.crear_indices()
-        db_manager.asegurar_tabla_equipos_entidades()  # <-- AÑADE ESTA LÍNEA
+        with medir_arranque("esquema de la base de datos"):
+            db_manager.asegurar_esquema()
     except Exception as e:
         logger.exception("Error creando/asegurando tablas: %s", e)
         QMessageBox.critical(None, "Error BD", f"No se pudo preparar la base de datos:\n{e}")
@@ -140,8 +145,11 @@ def main():
 
     # Iniciar la ventana principal
     try:
-        window = AppGUI(db_manager, config)
-        window.show()
+        with medir_arranque("ventana principal"):
+            window = AppGUI(db_manager, config)
+            window.show()
+        # Se ejecuta cuando el bucle de eventos ya pintó la ventana
+        QTimer.singleShot(0, perfil_arranque.marcar_primera_pantalla)
     except Exception as e:
         logger.exception("Error creando ventana principal AppGUI: %s", e)
         QMessageBox.critical(None, "Error al iniciar", f"No se pudo iniciar la interfaz gráfica:\n{e}")
@@ -160,6 +168,12 @@ def main():
 
 
 if __name__ == "__main__":
+    # Los estados de cuenta en lote usan un pool de procesos (necesario en el ejecutable empaquetado)
+    import multiprocessing
+    multiprocessing.freeze_support()
+    # El perfil de arranque (opcional) se activa antes de importar Qt y la aplicación
+    # para que esas importaciones también queden medidas.
+    perfil_arranque.activar_si_se_pide()
     try:
         main()
     except SystemExit:
@@ -170,6 +184,7 @@ if __name__ == "__main__":
         logger.exception("Fallo en main (capturado en __main__): %s", e)
         try:
             # Intentar mostrar un mensaje de error simple al usuario
+            from PyQt6.QtWidgets import QApplication, QMessageBox
             app = QApplication.instance() or QApplication(sys.argv)
             QMessageBox.critical(None, "Error crítico", f"Fallo crítico: {e}")
         except Exception:
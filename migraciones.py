@@ -0,0 +1,176 @@
+"""
+Migraciones versionadas del esquema de la base de datos.
+
+La versión aplicada se guarda en PRAGMA user_version (cabecera del archivo .db).
+Al abrir una base ya actualizada solo se lee ese número y no se ejecuta ningún
+DDL ni commit. Si hay migraciones pendientes se aplican todas, en orden, dentro
+de una única transacción (BEGIN IMMEDIATE ... COMMIT) que también fija la nueva
+versión: o se aplica todo o no se aplica nada.
+
+Para cambiar el esquema se añade una Migracion al final de MIGRACIONES con la
+siguiente versión; nunca se modifica una migración ya publicada.
+"""
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class Migracion:
+    """Un paso del esquema: versión destino, descripción y función aplicar(db, conn)."""
+
+    def __init__(self, version, descripcion, aplicar):
+        self.version = version
+        self.descripcion = descripcion
+        self.aplicar = aplicar
+
+
+def _columnas(conn, tabla):
+    return {row[1] for row in conn.execute(f"PRAGMA table_info({tabla})")}
+
+
+def _agregar_columnas(conn, tabla, columnas):
+    """Añade las columnas (nombre, definición) que falten en 'tabla'."""
+    existentes = _columnas(conn, tabla)
+    for nombre, definicion in columnas:
+        if nombre not in existentes:
+            conn.execute(f"ALTER TABLE {tabla} ADD COLUMN {nombre} {definicion}")
+
+
+# --- PASOS ---
+
+def _v1_esquema_base(db, conn):
+    """Tablas, triggers e índices que antes se aseguraban en cada arranque."""
+    db.crear_tablas_nucleo()
+    db.sembrar_datos_iniciales()
+    db.crear_tabla_equipos()
+    db.asegurar_tabla_alquiler_meta()
+    db.asegurar_tabla_pagos()
+    db.asegurar_tabla_mantenimientos()
+    db.asegurar_tablas_mantenimiento()
+    db.asegurar_tabla_equipos_entidades()
+
+
+def _v2_columnas_faltantes(db, conn):
+    """Columnas que las bases antiguas recibían a mano (rys.py y similares)."""
+    _agregar_columnas(conn, "transacciones", [
+        ("subcategoria_id", "INTEGER"),
+        ("kilometros", "REAL DEFAULT 0"),
+        ("conduce_adjunto_path", "TEXT"),
+    ])
+    _agregar_columnas(conn, "equipos", [
+        ("placa", "TEXT"),
+        ("ficha", "TEXT"),
+        ("subcategoria", "TEXT"),
+        ("categoria_id", "INTEGER"),
+        ("mantenimiento_trigger_tipo", "TEXT"),
+        ("mantenimiento_trigger_valor", "REAL"),
+    ])
+    _agregar_columnas(conn, "equipos_entidades", [
+        ("telefono", "TEXT"),
+        ("cedula", "TEXT"),
+    ])
+    _agregar_columnas(conn, "mantenimientos", [
+        ("odometro_km", "REAL"),
+        ("proximo_tipo", "TEXT"),
+        ("proximo_valor", "REAL"),
+        ("proximo_fecha", "TEXT"),
+    ])
+
+
+def _v3_datos_alquiler_meta(db, conn):
+    """
+    Completa conduce/ubicación/horas de los alquileres a partir de
+    equipos_alquiler_meta (lo que hacía migrar_datos.py), solo donde
+    'transacciones' no tiene valor.
+    """
+    conn.execute("""
+        UPDATE transacciones
+        SET conduce = COALESCE(conduce, (SELECT M.conduce FROM equipos_alquiler_meta M
+                                         WHERE M.transaccion_id = transacciones.id)),
+            ubicacion = COALESCE(ubicacion, (SELECT M.ubicacion FROM equipos_alquiler_meta M
+                                             WHERE M.transaccion_id = transacciones.id)),
+            horas = COALESCE(horas, (SELECT M.horas FROM equipos_alquiler_meta M
+                                     WHERE M.transaccion_id = transacciones.id))
+        WHERE id IN (SELECT transaccion_id FROM equipos_alquiler_meta)
+          AND (conduce IS NULL OR ubicacion IS NULL OR horas IS NULL)
+    """)
+
+
+def _v4_saldos_y_resumenes(db, conn):
+    """Saldo pagado por transacción, resumen mensual e índices de los listados."""
+    db.asegurar_saldos_pagados()
+    db.asegurar_resumen_mensual()
+    db.crear_indices()
+
+
+def _v5_versiones_tablas(db, conn):
+    """Contadores de cambios por tabla (huella de datos de la caché de reportes)."""
+    db.asegurar_versiones_tablas()
+
+
+def _v6_estadisticas_planificador(db, conn):
+    """Estadísticas de ANALYZE: los listados ya no fuerzan índices con INDEXED BY."""
+    db.actualizar_estadisticas(completo=True)
+
+
+def _v7_conciliar_pagado(db, conn):
+    """'pagado' de acuerdo con monto_pagado; facturas pagadas sin abonos, cobradas completas."""
+    db.conciliar_pagado()
+
+
+def _v8_trigger_monto_factura(db, conn):
+    """Trigger que recalcula 'pagado' al editar el monto de una factura."""
+    db.asegurar_saldos_pagados()
+
+
+MIGRACIONES = [
+    Migracion(1, "Esquema base", _v1_esquema_base),
+    Migracion(2, "Columnas añadidas manualmente en versiones anteriores", _v2_columnas_faltantes),
+    Migracion(3, "Datos de alquiler desde equipos_alquiler_meta", _v3_datos_alquiler_meta),
+    Migracion(4, "Saldos pagados, resumen mensual e índices", _v4_saldos_y_resumenes),
+    Migracion(5, "Contadores de cambios por tabla", _v5_versiones_tablas),
+    Migracion(6, "Estadísticas del planificador de consultas", _v6_estadisticas_planificador),
+    Migracion(7, "Conciliar 'pagado' con monto_pagado", _v7_conciliar_pagado),
+    Migracion(8, "Recalcular 'pagado' al editar el monto de una factura", _v8_trigger_monto_factura),
+]
+
+VERSION_ACTUAL = MIGRACIONES[-1].version
+
+
+def version_esquema(conn):
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def aplicar_migraciones(db):
+    """
+    Lleva la base de 'db' (DatabaseManager) a VERSION_ACTUAL.
+    Devuelve la lista de versiones aplicadas (vacía si ya estaba al día).
+    """
+    conn = db._conn
+    if version_esquema(conn) >= VERSION_ACTUAL:
+        return []
+
+    with db._lock_escritura:
+        conn.execute("BEGIN IMMEDIATE")
+        aplicadas = []
+        try:
+            # Otra instancia pudo migrar mientras esperábamos el bloqueo
+            version = version_esquema(conn)
+            with db.commits_diferidos():
+                for migracion in MIGRACIONES:
+                    if migracion.version <= version:
+                        continue
+                    logger.info("Aplicando migración %s: %s", migracion.version, migracion.descripcion)
+                    migracion.aplicar(db, conn)
+                    aplicadas.append(migracion.version)
+            if aplicadas:
+                conn.execute(f"PRAGMA user_version = {int(aplicadas[-1])}")
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            logger.exception("Error aplicando migraciones en %s", db.db_path)
+            raise
+    db.invalidar_referencias()
+    if aplicadas:
+        logger.info("Esquema de %s actualizado a la versión %s", db.db_path, aplicadas[-1])
+    return aplicadas
@@ -0,0 +1,283 @@
+"""
+Modelos Qt (model/view) para los listados grandes del libro.
+
+ModeloListadoPaginado guarda las filas tal como llegan de la base (tuplas
+FilaCompacta, sin QTableWidgetItem por celda) y las pide por páginas con
+canFetchMore/fetchMore: la vista solo solicita la página siguiente cuando el
+usuario se acerca al final, así abrir un listado de 100k filas cuesta lo mismo
+que abrir uno de 200.
+
+ProxyListado añade orden por columna y búsqueda de texto. Como ambos necesitan
+ver todas las filas, antes de ordenar o filtrar se cargan las páginas restantes.
+
+Tras un alta, edición o baja no hace falta recargar: aplicar_cambio() inserta,
+reemplaza o quita esa única fila, y ajustar_totales() corrige los totales del
+pie con la diferencia entre la fila anterior y la nueva.
+"""
+from PyQt6.QtCore import QAbstractTableModel, QModelIndex, QSortFilterProxyModel, Qt
+
+# Rol con el valor crudo de la celda (para ordenar numéricamente y por fecha)
+ROL_VALOR = Qt.ItemDataRole.UserRole
+# Rol con la fila completa (FilaCompacta / dict)
+ROL_FILA = Qt.ItemDataRole.UserRole + 1
+
+ALINEACION_NUMERO = int(Qt.AlignmentFlag.AlignRight | Qt.AlignmentFlag.AlignVCenter)
+
+
+class ColumnaTabla:
+    """
+    Describe una columna: título, clave de la fila y, opcionalmente, una función
+    que convierte (valor, fila) en el texto mostrado.
+    """
+
+    def __init__(self, titulo, clave, formato=None, numerica=False):
+        self.titulo = titulo
+        self.clave = clave
+        self.formato = formato
+        self.numerica = numerica
+
+    def texto(self, fila):
+        valor = fila.get(self.clave)
+        if self.formato is not None:
+            return self.formato(valor, fila)
+        return "" if valor is None else str(valor)
+
+
+def formato_moneda(valor, fila=None):
+    return f"{valor or 0:,.2f}"
+
+
+def formato_decimal(valor, fila=None):
+    return "" if valor is None else f"{valor:,.2f}"
+
+
+class ModeloListadoPaginado(QAbstractTableModel):
+    """
+    Modelo de solo lectura sobre un listado paginado.
+
+    'cargar_pagina(ultima_fila, limite)' debe devolver la página siguiente a
+    'ultima_fila' (None para la primera) con como mucho 'limite' filas; cuando
+    devuelve menos se asume que no hay más.
+
+    'clave_fila' identifica cada fila y 'claves_orden' son las columnas (todas
+    descendentes) por las que viene ordenado el listado.
+    """
+
+    def __init__(self, columnas, cargar_pagina=None, tam_pagina=200, parent=None,
+                 clave_fila="id", claves_orden=("fecha", "id")):
+        super().__init__(parent)
+        self.columnas = list(columnas)
+        self.tam_pagina = tam_pagina
+        self.clave_fila = clave_fila
+        self.claves_orden = tuple(claves_orden)
+        self._cargar_pagina = cargar_pagina
+        self._filas = []
+        self._hay_mas = False
+
+    # --- Carga ---
+    def reiniciar(self, cargar_pagina=None, primera_pagina=None):
+        """
+        Descarta las filas actuales y carga la primera página. Si ya se obtuvo
+        (p. ej. en segundo plano, ver carga_async) se pasa en 'primera_pagina'.
+        """
+        if cargar_pagina is not None:
+            self._cargar_pagina = cargar_pagina
+        self.beginResetModel()
+        if primera_pagina is not None:
+            self._filas = list(primera_pagina)
+            self._hay_mas = self._cargar_pagina is not None and len(self._filas) >= self.tam_pagina
+        else:
+            self._filas = []
+            self._hay_mas = self._cargar_pagina is not None
+            if self._hay_mas:
+                self._filas = list(self._leer_pagina())
+        self.endResetModel()
+
+    def limpiar(self):
+        self.beginResetModel()
+        self._filas = []
+        self._hay_mas = False
+        self.endResetModel()
+
+    def _leer_pagina(self):
+        ultima = self._filas[-1] if self._filas else None
+        pagina = self._cargar_pagina(ultima, self.tam_pagina)
+        self._hay_mas = len(pagina) >= self.tam_pagina
+        return pagina
+
+    def canFetchMore(self, parent=QModelIndex()):
+        return not parent.isValid() and self._hay_mas
+
+    def fetchMore(self, parent=QModelIndex()):
+        if parent.isValid() or not self._hay_mas:
+            return
+        pagina = self._leer_pagina()
+        if not pagina:
+            return
+        inicio = len(self._filas)
+        self.beginInsertRows(QModelIndex(), inicio, inicio + len(pagina) - 1)
+        self._filas.extend(pagina)
+        self.endInsertRows()
+
+    def cargar_todo(self):
+        """Trae las páginas que falten (necesario antes de ordenar o buscar)."""
+        while self._hay_mas:
+            self.fetchMore()
+
+    # --- Cambios de una sola fila ---
+    def aplicar_cambio(self, clave, fila_nueva):
+        """
+        Refleja en el modelo el cambio de la fila 'clave': la reemplaza, la mueve
+        si cambió su posición, la inserta si es nueva o la quita si 'fila_nueva'
+        es None (borrada o ya no cumple los filtros). Si le toca caer después de
+        la parte ya cargada, no se inserta: llegará con fetchMore.
+        """
+        numero = self.numero_de(clave)
+        if numero is not None:
+            if fila_nueva is not None and self._cabe_en(numero, fila_nueva):
+                self._filas[numero] = fila_nueva
+                self.dataChanged.emit(self.index(numero, 0), self.index(numero, len(self.columnas) - 1))
+                return
+            self.beginRemoveRows(QModelIndex(), numero, numero)
+            del self._filas[numero]
+            self.endRemoveRows()
+        if fila_nueva is None:
+            return
+        posicion = self._posicion_para(fila_nueva)
+        if posicion == len(self._filas) and self._hay_mas:
+            return
+        self.beginInsertRows(QModelIndex(), posicion, posicion)
+        self._filas.insert(posicion, fila_nueva)
+        self.endInsertRows()
+
+    def numero_de(self, clave):
+        """Número de fila (entre las ya cargadas) con esa clave, o None."""
+        for numero, fila in enumerate(self._filas):
+            if fila.get(self.clave_fila) == clave:
+                return numero
+        return None
+
+    def fila_por_clave(self, clave):
+        """
+        (fila, conocida): la fila 'clave' tal como está en pantalla. Si no está
+        cargada, 'conocida' dice si eso prueba que no cumple los filtros (ya se
+        cargó todo) o si podría estar en la parte que falta por traer.
+        """
+        numero = self.numero_de(clave)
+        if numero is not None:
+            return self._filas[numero], True
+        return None, not self._hay_mas
+
+    def _orden(self, fila):
+        # Los vacíos se ordenan como los menores, igual que en SQLite
+        return tuple((fila.get(c) is not None, fila.get(c) or "") for c in self.claves_orden)
+
+    def _cabe_en(self, numero, fila):
+        """True si 'fila' puede ocupar la posición 'numero' sin romper el orden."""
+        orden = self._orden(fila)
+        if numero > 0 and self._orden(self._filas[numero - 1]) < orden:
+            return False
+        if numero + 1 < len(self._filas) and self._orden(self._filas[numero + 1]) > orden:
+            return False
+        return True
+
+    def _posicion_para(self, fila):
+        """Búsqueda binaria de la posición de 'fila' en el orden descendente."""
+        orden = self._orden(fila)
+        bajo, alto = 0, len(self._filas)
+        while bajo < alto:
+            medio = (bajo + alto) // 2
+            if self._orden(self._filas[medio]) > orden:
+                bajo = medio + 1
+            else:
+                alto = medio
+        return bajo
+
+    # --- Acceso ---
+    def fila(self, numero):
+        return self._filas[numero] if 0 <= numero < len(self._filas) else None
+
+    def filas(self):
+        return self._filas
+
+    # --- Interfaz QAbstractTableModel ---
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._filas)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.columnas)
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid():
+            return None
+        fila = self._filas[index.row()]
+        columna = self.columnas[index.column()]
+        if role == Qt.ItemDataRole.DisplayRole:
+            return columna.texto(fila)
+        if role == ROL_VALOR:
+            return fila.get(columna.clave)
+        if role == ROL_FILA:
+            return fila
+        if role == Qt.ItemDataRole.TextAlignmentRole and columna.numerica:
+            return ALINEACION_NUMERO
+        return None
+
+    def headerData(self, section, orientation, role=Qt.ItemDataRole.DisplayRole):
+        if role != Qt.ItemDataRole.DisplayRole:
+            return None
+        if orientation == Qt.Orientation.Horizontal:
+            return self.columnas[section].titulo
+        return str(section + 1)
+
+
+def ajustar_totales(totales, aporte, anterior=None, nueva=None):
+    """
+    Devuelve una copia de 'totales' restando lo que aportaba la fila 'anterior'
+    y sumando lo de 'nueva' (cualquiera puede ser None). 'aporte(fila)' devuelve
+    un dict con lo que la fila suma a cada total.
+    """
+    resultado = dict(totales or {})
+    for fila, signo in ((anterior, -1), (nueva, 1)):
+        if fila is None:
+            continue
+        for clave, valor in aporte(fila).items():
+            resultado[clave] = (resultado.get(clave) or 0) + signo * (valor or 0)
+    return resultado
+
+
+class ProxyListado(QSortFilterProxyModel):
+    """Orden por columna (valor crudo) y búsqueda de texto sobre un ModeloListadoPaginado."""
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.setSortRole(ROL_VALOR)
+        self.setFilterKeyColumn(-1)
+        self.setFilterCaseSensitivity(Qt.CaseSensitivity.CaseInsensitive)
+
+    def sort(self, column, order=Qt.SortOrder.AscendingOrder):
+        if column >= 0 and self.sourceModel() is not None:
+            self.sourceModel().cargar_todo()
+        super().sort(column, order)
+
+    def buscar(self, texto):
+        if texto and self.sourceModel() is not None:
+            self.sourceModel().cargar_todo()
+        self.setFilterFixedString(texto or "")
+
+    def lessThan(self, izquierda, derecha):
+        a, b = izquierda.data(ROL_VALOR), derecha.data(ROL_VALOR)
+        # Los vacíos van siempre al principio en orden ascendente
+        if a is None or b is None:
+            return a is None and b is not None
+        try:
+            return a < b
+        except TypeError:
+            return str(a) < str(b)
+
+    def fila(self, index_proxy):
+        """Fila de origen correspondiente a un índice (o número de fila) de la vista."""
+        if isinstance(index_proxy, int):
+            index_proxy = self.index(index_proxy, 0)
+        if not index_proxy.isValid():
+            return None
+        return self.mapToSource(index_proxy).data(ROL_FILA)
@@ -0,0 +1,195 @@
+"""
+Perfil del arranque de la aplicación.
+
+medir_arranque(etapa) registra siempre en el log la duración de una etapa
+("Arranque: <etapa> en X ms"). Con el modo perfil activado además:
+
+- se mide cuánto tarda en importarse cada módulo (tiempo propio y acumulado,
+  incluidos los módulos que importa a su vez);
+- se guardan las etapas medidas y las cargas de datos de las pestañas;
+- se escribe un informe legible junto a progain.log (progain_arranque.txt)
+  al mostrarse la primera pantalla y otra vez al cerrar la aplicación.
+
+El modo se activa con la variable de entorno PROGAIN_PERFIL_ARRANQUE=1 o con
+el argumento --perfil-arranque. Para que las importaciones queden medidas,
+activar_si_se_pide() debe llamarse antes de importar PyQt6 y el resto de la
+aplicación (ver main_qt.py).
+"""
+import atexit
+import logging
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+VARIABLE_ENTORNO = "PROGAIN_PERFIL_ARRANQUE"
+ARGUMENTO = "--perfil-arranque"
+ARCHIVO_INFORME = "progain_arranque.txt"
+
+# Origen de todos los tiempos: la primera importación de este módulo
+_ORIGEN = time.perf_counter()
+
+_activo = False
+_lock = threading.Lock()
+_importaciones = []  # (modulo, acumulado_s, propio_s)
+_tramos = []         # (nombre, inicio_s, duracion_s, profundidad)
+_profundidad = threading.local()
+_ruta_informe = None
+
+
+def activo():
+    return _activo
+
+
+def _ahora():
+    return time.perf_counter() - _ORIGEN
+
+
+# --- Importaciones ---
+
+class _CargadorMedido:
+    """Envuelve el loader de un módulo para medir su exec_module."""
+
+    def __init__(self, loader):
+        self._loader = loader
+
+    def __getattr__(self, nombre):
+        return getattr(self._loader, nombre)
+
+    def create_module(self, spec):
+        return self._loader.create_module(spec)
+
+    def exec_module(self, modulo):
+        pila = _MedidorImportaciones.pila
+        pila.append(0.0)
+        inicio = time.perf_counter()
+        try:
+            self._loader.exec_module(modulo)
+        finally:
+            acumulado = time.perf_counter() - inicio
+            hijos = pila.pop()
+            if pila:
+                pila[-1] += acumulado
+            with _lock:
+                _importaciones.append((modulo.__name__, acumulado, acumulado - hijos))
+
+
+class _MedidorImportaciones:
+    """Buscador de sys.meta_path que delega en los demás y mide la ejecución."""
+
+    pila = []
+
+    @classmethod
+    def find_spec(cls, nombre, ruta=None, objetivo=None):
+        # Solo se miden las importaciones del hilo principal (el arranque)
+        if threading.current_thread() is not threading.main_thread():
+            return None
+        for buscador in sys.meta_path:
+            if buscador is cls or not hasattr(buscador, "find_spec"):
+                continue
+            spec = buscador.find_spec(nombre, ruta, objetivo)
+            if spec is not None:
+                if spec.loader is not None and hasattr(spec.loader, "exec_module"):
+                    spec.loader = _CargadorMedido(spec.loader)
+                return spec
+        return None
+
+
+# --- Tramos ---
+
+@contextmanager
+def medir_arranque(etapa):
+    """Registra en el log (y en el perfil, si está activo) cuánto tarda una etapa."""
+    profundidad = getattr(_profundidad, "valor", 0)
+    _profundidad.valor = profundidad + 1
+    inicio = _ahora()
+    try:
+        yield
+    finally:
+        _profundidad.valor = profundidad
+        duracion = _ahora() - inicio
+        logger.info("Arranque: %s en %.1f ms", etapa, duracion * 1000)
+        if _activo:
+            with _lock:
+                _tramos.append((etapa, inicio, duracion, profundidad))
+
+
+def registrar_tramo(nombre, inicio_perf, fin_perf=None):
+    """
+    Añade al perfil un tramo medido fuera de medir_arranque (p. ej. una carga
+    en segundo plano). Los tiempos son valores de time.perf_counter().
+    """
+    if not _activo:
+        return
+    fin_perf = time.perf_counter() if fin_perf is None else fin_perf
+    with _lock:
+        _tramos.append((nombre, inicio_perf - _ORIGEN, fin_perf - inicio_perf, 0))
+
+
+# --- Activación e informe ---
+
+def activar_si_se_pide(argv=None, directorio=None):
+    """
+    Activa el modo perfil si lo pide la variable de entorno o el argumento
+    --perfil-arranque (que se quita de argv). Devuelve True si quedó activo.
+    """
+    global _activo, _ruta_informe
+    argv = sys.argv if argv is None else argv
+    pedido = os.environ.get(VARIABLE_ENTORNO, "").strip().lower() not in ("", "0", "no", "false")
+    if ARGUMENTO in argv:
+        argv.remove(ARGUMENTO)
+        pedido = True
+    if not pedido or _activo:
+        return _activo
+    _activo = True
+    _ruta_informe = os.path.join(directorio or os.getcwd(), ARCHIVO_INFORME)
+    sys.meta_path.insert(0, _MedidorImportaciones)
+    atexit.register(escribir_informe, "cierre")
+    return True
+
+
+def marcar_primera_pantalla():
+    """Registra el tiempo hasta la primera pantalla y escribe el informe."""
+    if not _activo:
+        return
+    with _lock:
+        _tramos.append(("hasta la primera pantalla", 0.0, _ahora(), 0))
+    escribir_informe("primera pantalla")
+
+
+def escribir_informe(momento="primera pantalla", maximo_modulos=40):
+    """Escribe el informe de arranque junto al log. Devuelve la ruta o None."""
+    if not _activo:
+        return None
+    with _lock:
+        importaciones = list(_importaciones)
+        tramos = sorted(_tramos, key=lambda t: t[1])
+    total_importaciones = sum(propio for _, _, propio in importaciones)
+
+    lineas = [
+        f"Perfil de arranque ({momento}) - {time.strftime('%Y-%m-%d %H:%M:%S')}",
+        f"Tiempo desde el inicio: {_ahora() * 1000:.1f} ms",
+        "",
+        "ETAPAS (inicio / duración, ms)",
+    ]
+    for nombre, inicio, duracion, profundidad in tramos:
+        lineas.append(f"  {inicio * 1000:9.1f}  {duracion * 1000:9.1f}  {'  ' * profundidad}{nombre}")
+    lineas += [
+        "",
+        f"IMPORTACIONES: {len(importaciones)} módulos, {total_importaciones * 1000:.1f} ms en total",
+        f"  {'propio':>9}  {'acumulado':>9}  módulo",
+    ]
+    for modulo, acumulado, propio in sorted(importaciones, key=lambda i: i[2], reverse=True)[:maximo_modulos]:
+        lineas.append(f"  {propio * 1000:9.1f}  {acumulado * 1000:9.1f}  {modulo}")
+
+    try:
+        with open(_ruta_informe, "w", encoding="utf-8") as f:
+            f.write("\n".join(lineas) + "\n")
+    except OSError as e:
+        logger.error("No se pudo escribir el perfil de arranque en %s: %s", _ruta_informe, e)
+        return None
+    logger.info("Perfil de arranque escrito en %s", _ruta_informe)
+    return _ruta_informe
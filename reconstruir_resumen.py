@@ -0,0 +1,44 @@
+"""
+Reconstruye las tablas de resumen mensual que alimentan el Dashboard.
+
+Uso:
+    python reconstruir_resumen.py [ruta_bd] [--proyecto ID]
+
+Si no se indica la ruta se usa 'database_path' de equipos_config.json.
+"""
+import sys
+
+from config_manager import cargar_configuracion
+from logic import DatabaseManager
+
+
+def main(argv):
+    args = list(argv)
+    proyecto_id = None
+    if "--proyecto" in args:
+        idx = args.index("--proyecto")
+        try:
+            proyecto_id = int(args[idx + 1])
+        except (IndexError, ValueError):
+            print("❌ --proyecto requiere un ID numérico.")
+            return 1
+        del args[idx:idx + 2]
+
+    db_path = args[0] if args else cargar_configuracion().get("database_path")
+    if not db_path:
+        print("❌ No se indicó base de datos ni hay 'database_path' en la configuración.")
+        return 1
+
+    print(f"Base de datos: {db_path}")
+    db = DatabaseManager(db_path)
+    try:
+        db.asegurar_esquema()
+        db.reconstruir_resumen_mensual(proyecto_id)
+    finally:
+        db.cerrar()
+    print(f"✅ Resumen mensual reconstruido ({'proyecto ' + str(proyecto_id) if proyecto_id else 'todos los proyectos'}).")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -1,18 +1,22 @@
 from PyQt6.QtWidgets import (
     QWidget, QVBoxLayout, QHBoxLayout, QGroupBox, QLabel, QComboBox, QDateEdit,
-    QPushButton, QTableWidget, QTableWidgetItem, QMessageBox, QHeaderView, QFileDialog
+    QPushButton, QTableView, QAbstractItemView, QMessageBox, QHeaderView, QFileDialog, QLineEdit
 )
 from PyQt6.QtCore import QDate, Qt
+from modelo_tabla import (
+    ColumnaTabla, ModeloListadoPaginado, ProxyListado, ajustar_totales, formato_decimal, formato_moneda
+)
+from carga_async import CargadorDatos, IndicadorCarga
+from barra_filtros import ControladorFiltros
+from eventos_datos import MAX_FILAS_POR_AVISO
 from dialogo_alquiler import DialogoAlquiler
 from datetime import datetime, date
 from ventana_gestion_abonos import DialogoRegistroAbono
 import logging
-from PIL import Image
 import os
 import shutil
 import sys
 from PyQt6.QtWidgets import QMessageBox
-from mini_editor_imagen import MiniEditorImagen 
 from DialogoPagoOperador import DialogoPagoOperador
 
 logging.basicConfig(
@@ -21,6 +25,20 @@ logging.basicConfig(
     format='%(asctime)s %(levelname)s %(message)s'
 )
 
+COLUMNAS_ALQUILERES = [
+    ColumnaTabla('Fecha', 'fecha'),
+    ColumnaTabla('Conduce', 'conduce'),
+    ColumnaTabla('Cliente', 'cliente_nombre'),
+    ColumnaTabla('Operador', 'operador_nombre'),
+    ColumnaTabla('Equipo', 'equipo_nombre'),
+    ColumnaTabla('Ubicación', 'ubicacion'),
+    ColumnaTabla('Horas', 'horas', formato_decimal, numerica=True),
+    ColumnaTabla('Precio/hora', 'precio_por_hora', formato_decimal, numerica=True),
+    ColumnaTabla('Monto', 'monto', formato_moneda, numerica=True),
+    ColumnaTabla('Pagado', 'pagado',
+                 lambda valor, fila: "Pagado" if valor else ("Parcial" if fila.get('monto_pagado') else "Pendiente")),
+]
+
 class RegistroAlquileresTab(QWidget):
     def __init__(self, db_manager, proyecto_actual, config):
         super().__init__()
@@ -34,10 +52,17 @@ class RegistroAlquileresTab(QWidget):
         self.clientes_mapa = {}
         self.equipos_mapa = {}
         self.operadores_mapa = {}
+        self.cargador = CargadorDatos(self, nombre="alquileres")
+        # Filtros y totales de lo que hay en pantalla (para aplicar cambios de una fila)
+        self._filtros_mostrados = None
+        self._totales = {}
+        self.control_filtros = ControladorFiltros(self.get_current_filters, self._cargar_alquileres, parent=self)
 
         self._setup_ui()
         self.poblar_filtros()
         self.refrescar_tabla()
+        # Altas/ediciones/bajas y abonos hechos aquí o en cualquier otra vista
+        self.destroyed.connect(self.db.cambios.suscribir(self._on_cambio_datos, tablas=("transacciones",)))
 
     def _setup_ui(self):
         main_layout = QVBoxLayout(self)
@@ -74,6 +99,11 @@ class RegistroAlquileresTab(QWidget):
         filtros_layout.addWidget(QLabel("Equipo:"))
         filtros_layout.addWidget(self.combo_equipo)
 
+        self.txt_buscar = QLineEdit()
+        self.txt_buscar.setPlaceholderText("Buscar en la tabla...")
+        self.txt_buscar.setClearButtonEnabled(True)
+        filtros_layout.addWidget(self.txt_buscar)
+
         main_layout.addWidget(filtros_group)
 
         # === Botones de acción ===
@@ -98,21 +128,29 @@ class RegistroAlquileresTab(QWidget):
         self.btn_registrar_abono.clicked.connect(self.funcion_registrar_abono)
         self.btn_adjuntar_conduce.clicked.connect(self.on_adjuntar_conduce)
 
-        # === Tabla principal ===
-        self.table = QTableWidget(0, 10)
-        self.table.setHorizontalHeaderLabels([
-            'Fecha', 'Conduce', 'Cliente', 'Operador', 'Equipo', 'Ubicación',
-            'Horas', 'Precio/hora', 'Monto', 'Pagado'
-        ])
+        # === Tabla principal (modelo paginado: solo se cargan las filas que se ven) ===
+        self.modelo = ModeloListadoPaginado(COLUMNAS_ALQUILERES, parent=self)
+        self.proxy = ProxyListado(self)
+        self.proxy.setSourceModel(self.modelo)
+        self.table = QTableView()
+        self.table.setModel(self.proxy)
+        self.table.setSelectionBehavior(QAbstractItemView.SelectionBehavior.SelectRows)
+        self.table.setSelectionMode(QAbstractItemView.SelectionMode.SingleSelection)
+        self.table.setEditTriggers(QAbstractItemView.EditTrigger.NoEditTriggers)
+        self.table.verticalHeader().setDefaultSectionSize(22)
 
         self.btn_ver_conduce = QPushButton("Ver Conduce")
         btn_layout.addWidget(self.btn_ver_conduce)
         self.btn_ver_conduce.clicked.connect(self.on_ver_conduce)
         main_layout.addWidget(self.table)
-        self.table.cellDoubleClicked.connect(self.on_tabla_doble_clic)
+        self.table.doubleClicked.connect(self.on_tabla_doble_clic)
 
         header = self.table.horizontalHeader()
         header.setSectionResizeMode(QHeaderView.ResizeMode.Stretch)
+        # Sin columna de orden inicial: se respeta el orden de la consulta (fecha desc)
+        header.setSortIndicator(-1, Qt.SortOrder.AscendingOrder)
+        self.table.setSortingEnabled(True)
+        self.txt_buscar.textChanged.connect(self.proxy.buscar)
 
         # === Indicadores inferiores ===
         indicadores_layout = QHBoxLayout()
@@ -124,77 +162,127 @@ class RegistroAlquileresTab(QWidget):
         indicadores_layout.addWidget(self.lbl_total_abonado)
         indicadores_layout.addWidget(self.lbl_total_pendiente)
         indicadores_layout.addWidget(self.lbl_total_horas)
+        indicadores_layout.addWidget(IndicadorCarga(self.cargador, parent=self))
         main_layout.addLayout(indicadores_layout)
+        self.cargador.cargando.connect(lambda cargando: self.table.setEnabled(not cargando))
 
-        # === Señales para refrescar los datos al cambiar filtros ===
-        self.combo_cliente.currentIndexChanged.connect(self.refrescar_tabla)
-        self.combo_operador.currentIndexChanged.connect(self.refrescar_tabla)
-        self.combo_equipo.currentIndexChanged.connect(self.refrescar_tabla)
-        self.fecha_inicio.dateChanged.connect(self.refrescar_tabla)
-        self.fecha_fin.dateChanged.connect(self.refrescar_tabla)
+        # === Cambios de filtros: una sola consulta cuando dejan de cambiar ===
+        self.control_filtros.vigilar(self.combo_cliente, self.combo_operador, self.combo_equipo,
+                                     self.fecha_inicio, self.fecha_fin)
 
     def on_ver_conduce(self):
-        selected = self.table.currentRow()
-        if selected == -1:
+        fila = self.obtener_alquiler_seleccionado()
+        if fila is None:
             QMessageBox.warning(self, "Advertencia", "Selecciona una fila.")
             return
-        # Usar columna 10: conduce_adjunto_path (ruta relativa)
-        conduce_path = self.table.item(selected, 10).text()
-        self.abrir_conduce_adjunto(conduce_path)
+        self.abrir_conduce_adjunto(fila.get('conduce_adjunto_path'))
 
-    def on_tabla_doble_clic(self, row, column):
-        conduce_path = self.table.item(row, 10).text()
-        self.abrir_conduce_adjunto(conduce_path)
+    def on_tabla_doble_clic(self, index):
+        fila = self.proxy.fila(index)
+        if fila is not None:
+            self.abrir_conduce_adjunto(fila.get('conduce_adjunto_path'))
 
 
     def refrescar_tabla(self):
-        self.table.setRowCount(0)
+        """Vuelve a consultar ya con los filtros actuales (tras guardar, cambiar de proyecto...)."""
+        self.control_filtros.refrescar_ahora()
+
+    def _cargar_alquileres(self, filtros):
         if not self.proyecto_actual:
+            self.cargador.cancelar()
+            self.modelo.limpiar()
             return
-        filtros = self.get_current_filters()
-        
-        # Guardamos los resultados en una variable de la clase
-        self.transacciones_actuales = self.db.obtener_transacciones_por_proyecto(self.proyecto_actual['id'], filtros)
-        
-        # El resto de la función usa esta nueva variable en lugar de llamar a la DB de nuevo
-        transacciones = self.transacciones_actuales 
-        
-        total_facturado = 0
-        # ... el resto de la función sigue exactamente igual ...
-        total_abonado = 0
-        total_horas = 0.0
-        self.table.setColumnCount(11)
-        self.table.setHorizontalHeaderLabels([
-            'Fecha', 'Conduce', 'Cliente', 'Operador', 'Equipo', 'Ubicación',
-            'Horas', 'Precio/hora', 'Monto', 'Pagado', 'ConduceAdjunto'
-        ])
-        for row, trans in enumerate(transacciones):
-            self.table.insertRow(row)
-            item_fecha = QTableWidgetItem(str(trans['fecha']))
-            item_fecha.setData(Qt.ItemDataRole.UserRole, str(trans['id']))  # Guardar el id real aquí
-            self.table.setItem(row, 0, item_fecha)
-            self.table.setItem(row, 1, QTableWidgetItem(str(trans['conduce']) if 'conduce' in trans.keys() else ''))
-            self.table.setItem(row, 2, QTableWidgetItem(str(trans['cliente_nombre']) if 'cliente_nombre' in trans.keys() else ''))
-            self.table.setItem(row, 3, QTableWidgetItem(str(trans['operador_nombre']) if 'operador_nombre' in trans.keys() else ''))
-            self.table.setItem(row, 4, QTableWidgetItem(str(trans['equipo_nombre']) if 'equipo_nombre' in trans.keys() else ''))
-            self.table.setItem(row, 5, QTableWidgetItem(str(trans['ubicacion']) if 'ubicacion' in trans.keys() else ''))
-            self.table.setItem(row, 6, QTableWidgetItem(str(trans['horas']) if 'horas' in trans.keys() else ''))
-            self.table.setItem(row, 7, QTableWidgetItem(str(trans['precio_por_hora']) if 'precio_por_hora' in trans.keys() else ''))
-            self.table.setItem(row, 8, QTableWidgetItem(str(trans['monto']) if 'monto' in trans.keys() else ''))
-            pagado = trans['pagado'] if 'pagado' in trans.keys() else False
-            self.table.setItem(row, 9, QTableWidgetItem("Pagado" if pagado else "Pendiente"))
-            # Nueva columna oculta: conduce_adjunto_path (ruta relativa)
-            self.table.setItem(row, 10, QTableWidgetItem(str(trans['conduce_adjunto_path']) if 'conduce_adjunto_path' in trans.keys() else ''))
-            total_facturado += trans['monto'] if 'monto' in trans.keys() and trans['monto'] else 0
-            total_horas += trans['horas'] if 'horas' in trans.keys() and trans['horas'] else 0
-            if pagado:
-                total_abonado += trans['monto'] if 'monto' in trans.keys() and trans['monto'] else 0
+        proyecto_id = self.proyecto_actual['id']
+        limite = self.modelo.tam_pagina
+
+        # Primera página y totales se consultan en segundo plano
+        def consultar():
+            return (self.db.obtener_pagina_transacciones_por_proyecto(proyecto_id, filtros, None, limite),
+                    self.db.obtener_totales_transacciones_por_proyecto(proyecto_id, filtros))
+
+        self.cargador.solicitar(consultar, lambda resultado: self._mostrar_alquileres(proyecto_id, filtros, resultado),
+                                self._error_carga)
+
+    def _mostrar_alquileres(self, proyecto_id, filtros, resultado):
+        primera_pagina, totales = resultado
+
+        def cargar_pagina(ultima, limite):
+            despues_de = (ultima['fecha'], ultima['id']) if ultima is not None else None
+            return self.db.obtener_pagina_transacciones_por_proyecto(proyecto_id, filtros, despues_de, limite)
+
+        self.modelo.reiniciar(cargar_pagina, primera_pagina)
+        # Si hay un orden o una búsqueda activos, necesitan todas las filas
+        if self.proxy.sortColumn() >= 0 or self.txt_buscar.text():
+            self.modelo.cargar_todo()
+
+        self._filtros_mostrados = filtros
+        self._totales = totales or {}
+        self._mostrar_totales()
+
+    def _mostrar_totales(self):
+        total_facturado = self._totales.get('facturado') or 0
+        total_abonado = self._totales.get('abonado') or 0
+        total_pendiente = self._totales.get('pendiente') or 0
+        total_horas = self._totales.get('horas') or 0.0
         self.lbl_total_facturado.setText(f"Facturado: RD$ {total_facturado:,.2f}")
         self.lbl_total_abonado.setText(f"Pagado: RD$ {total_abonado:,.2f}")
-        self.lbl_total_pendiente.setText(f"Pendiente: RD$ {total_facturado-total_abonado:,.2f}")
+        self.lbl_total_pendiente.setText(f"Pendiente: RD$ {total_pendiente:,.2f}")
         self.lbl_total_horas.setText(f"Horas Totales: {total_horas:.2f}")
-        # Oculta la columna de la ruta
-        self.table.setColumnHidden(10, True)
+
+    def _error_carga(self, mensaje):
+        QMessageBox.warning(self, "Error", f"No se pudieron cargar los alquileres:\n{mensaje}")
+
+    @staticmethod
+    def _aporte_alquiler(fila):
+        monto = fila.get('monto') or 0
+        pagado = fila.get('monto_pagado') or 0
+        return {
+            'filas': 1,
+            'facturado': monto,
+            'abonado': pagado,
+            'pendiente': 0 if fila.get('pagado') else monto - pagado,
+            'horas': fila.get('horas') or 0,
+        }
+
+    def _on_cambio_datos(self, cambio):
+        """
+        Aviso de db.cambios: si el cambio cae en el proyecto y el rango de fechas
+        en pantalla, se aplica fila a fila (o se recarga, si son muchas filas).
+        """
+        filtros = self._filtros_mostrados
+        if not self.proyecto_actual or filtros is None:
+            return
+        if not cambio.afecta(self.proyecto_actual['id'], filtros.get('fecha_inicio'), filtros.get('fecha_fin')):
+            return
+        if not cambio.claves or len(cambio.claves) > MAX_FILAS_POR_AVISO:
+            self.refrescar_tabla()
+            return
+        for clave in cambio.claves:
+            anterior, conocida = self.modelo.fila_por_clave(clave)
+            self._actualizar_fila(clave, anterior, conocida)
+
+    def _actualizar_fila(self, transaccion_id, anterior=None, anterior_conocida=True):
+        """
+        Refleja el alta, edición o baja de un alquiler sin recargar la tabla:
+        trae solo esa fila (con los filtros en pantalla), la aplica al modelo y
+        corrige los totales con la diferencia. 'anterior' es la fila tal como
+        estaba en la tabla (None si es nueva). Si no se sabe cómo estaba (aún
+        sin cargar), los totales se vuelven a consultar.
+        """
+        if not transaccion_id or not self.proyecto_actual or self._filtros_mostrados is None \
+                or self.cargador.ocupado:
+            # Hay una carga en curso (o nada mostrado): que la recarga lo refleje
+            self.refrescar_tabla()
+            return
+        proyecto_id = self.proyecto_actual['id']
+        nueva = self.db.obtener_fila_transaccion_por_proyecto(proyecto_id, transaccion_id, self._filtros_mostrados)
+        self.modelo.aplicar_cambio(transaccion_id, nueva)
+        if anterior_conocida:
+            self._totales = ajustar_totales(self._totales, self._aporte_alquiler, anterior, nueva)
+        else:
+            self._totales = self.db.obtener_totales_transacciones_por_proyecto(
+                proyecto_id, self._filtros_mostrados) or {}
+        self._mostrar_totales()
 
     def get_current_filters(self):
         filtros = {}
@@ -221,16 +309,14 @@ class RegistroAlquileresTab(QWidget):
             config=self.config, # <-- AÑADIR ESTA LÍNEA
             parent=self
         )
-        if dlg.exec():
-            self.refrescar_tabla()
+        dlg.exec()  # la tabla se actualiza con el aviso de db.cambios
 
     def on_editar_alquiler_boton(self):
-        selected = self.table.currentRow()
-        if selected == -1:
+        fila = self.obtener_alquiler_seleccionado()
+        if fila is None:
             QMessageBox.warning(self, "Advertencia", "Selecciona una fila para editar.")
             return
-        item = self.table.item(selected, 0)
-        alquiler_id = item.data(Qt.ItemDataRole.UserRole)
+        alquiler_id = fila.get('id')
         if not alquiler_id:
             QMessageBox.warning(self, "Error", "No se pudo encontrar el ID del alquiler.")
             return
@@ -250,18 +336,18 @@ class RegistroAlquileresTab(QWidget):
         )
         if dialog.exec():
             nuevos_datos = dialog.get_datos()
-            self.db.actualizar_alquiler(transaccion_id, nuevos_datos)
+            if not self.db.actualizar_alquiler(transaccion_id, nuevos_datos):
+                QMessageBox.warning(self, "Error", "No se pudo actualizar el alquiler.")
+                return
             QMessageBox.information(self, "Éxito", "Alquiler actualizado correctamente.")
-            self.refrescar_tabla()
 
 
     def on_eliminar_alquiler_boton(self):
-        selected = self.table.currentRow()
-        if selected == -1:
+        fila = self.obtener_alquiler_seleccionado()
+        if fila is None:
             QMessageBox.warning(self, "Advertencia", "Selecciona una fila para eliminar.")
             return
-        item = self.table.item(selected, 0)
-        alquiler_id = item.data(Qt.ItemDataRole.UserRole)
+        alquiler_id = fila.get('id')
         if not alquiler_id:
             QMessageBox.warning(self, "Error", "No se pudo encontrar el ID del alquiler.")
             return
@@ -270,10 +356,8 @@ class RegistroAlquileresTab(QWidget):
             QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No
         )
         if confirm == QMessageBox.StandardButton.Yes:
-            exito = self.db.eliminar_alquiler(alquiler_id)
-            if exito:
+            if self.db.eliminar_alquiler(alquiler_id):
                 QMessageBox.information(self, "Éxito", "Alquiler eliminado.")
-                self.refrescar_tabla()
             else:
                 QMessageBox.warning(self, "Error", "No se pudo eliminar el alquiler.")
 
@@ -325,31 +409,18 @@ class RegistroAlquileresTab(QWidget):
 
 
     def obtener_alquiler_seleccionado(self):
-        fila_actual = self.table.currentRow()
-        if fila_actual < 0:
-            return None
-            
-        item = self.table.item(fila_actual, 0)
-        alquiler_id = item.data(Qt.ItemDataRole.UserRole)
-        if not alquiler_id:
-            return None
-            
-        # Busca en la lista guardada en memoria, no en la base de datos
-        for trans in self.transacciones_actuales:
-            if str(trans['id']) == str(alquiler_id):
-                return trans
-                
-        return None
+        # La fila ya está en el modelo; no hace falta volver a la base de datos
+        return self.proxy.fila(self.table.currentIndex())
 
     def funcion_registrar_pago_operador(self):
         QMessageBox.information(self, "Info", "Registrar pago a operador no implementado todavía.")
 
     def funcion_registrar_abono(self):
         dlg = DialogoRegistroAbono(self.db, self.proyecto_actual, parent=self)
-        dlg.abono_registrado.connect(self.refrescar_tabla)
-        dlg.exec()
+        dlg.exec()  # las facturas abonadas llegan por db.cambios
 
     def procesar_y_guardar_imagen(origen, destino, width=1200, height=800):
+        from PIL import Image  # Pillow solo se carga al procesar imágenes
         with Image.open(origen) as img:
             img = img.convert("RGB")
             img = img.resize((width, height), Image.LANCZOS)
@@ -458,6 +529,7 @@ class RegistroAlquileresTab(QWidget):
 
             # Si es imagen, abrir editor; si usuario cancela, abortar
             if ext in (".jpg", ".jpeg", ".png"):
+                from mini_editor_imagen import MiniEditorImagen  # carga Pillow al primer uso
                 editor = MiniEditorImagen(file_path, width=1200, height=800, parent=self)
                 if editor.exec():
                     final_img = editor.get_final_image()
@@ -505,7 +577,6 @@ class RegistroAlquileresTab(QWidget):
                     pass
 
         QMessageBox.information(self, "Éxito", "Conduce adjuntado correctamente.")
-        self.refrescar_tabla()
 
 
     def abrir_conduce_adjunto(self, conduce_rel_path):
@@ -549,8 +620,5 @@ class RegistroAlquileresTab(QWidget):
 
     def _abrir_dialogo_pago_operador(self):
         dialogo = DialogoPagoOperador(self.db, self.proyecto_id, self)
-        if dialogo.exec():
-            # Aquí puedes recargar tablas relacionadas si lo deseas
-            if hasattr(self, "tab_pagos_operadores"):
-                self.tab_pagos_operadores._cargar_filtros()
-                self.tab_pagos_operadores._cargar_pagos()
+        # La pestaña de pagos a operadores se entera del pago por db.cambios
+        dialogo.exec()
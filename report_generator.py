@@ -1,8 +1,15 @@
-import pandas as pd
 from fpdf import FPDF
 from datetime import datetime
+import itertools
 import os
 
+from cache_conduces import preparar_conduces
+
+
+def _texto(valor):
+    return '' if valor is None else str(valor)
+
+
 class PDF(FPDF):
     def __init__(self, orientation='P', unit='mm', format='Letter'):
         super().__init__(orientation, unit, format)
@@ -38,8 +45,17 @@ class PDF(FPDF):
 class ReportGenerator:
     def __init__(
         self, data=None, title="", cliente="", project_name="", date_range="", currency_symbol="RD$",
-        abonos=None, total_facturado=None, total_abonado=None, saldo=None, carpeta_conduces=None, column_map=None
+        abonos=None, total_facturado=None, total_abonado=None, saldo=None, carpeta_conduces=None, column_map=None,
+        lotes=None, procesos_anexos=None
     ):
+        """
+        'data' es la lista de filas de siempre. Para estados de cuenta grandes se
+        puede pasar en su lugar 'lotes': un generador de lotes de filas ya
+        ordenadas por equipo (db.iterar_facturas_estado_cuenta); to_pdf lo
+        recorre una sola vez sin cargarlo entero en memoria.
+        'procesos_anexos' limita los procesos que reducen los conduces (ver
+        cache_conduces); 1 los reduce en el propio proceso.
+        """
         self.title_main = title or "Estado de Cuenta de Alquileres"
         self.cliente = cliente
         self.project_name = project_name
@@ -51,28 +67,132 @@ class ReportGenerator:
         self.total_abonado = total_abonado
         self.saldo = saldo
         self.carpeta_conduces = carpeta_conduces
-        if data is not None:
-            raw_df = pd.DataFrame([dict(row) for row in data])
-            if column_map and not raw_df.empty:
-                cols_a_usar = [col for col in column_map.keys() if col in raw_df.columns]
-                self.df = raw_df[cols_a_usar]
-                self.df = self.df.rename(columns=column_map)
+        self.column_map = column_map
+        self.data = data
+        self.lotes = lotes
+        self.procesos_anexos = procesos_anexos
+        self._df = None
+
+    @property
+    def df(self):
+        """DataFrame de 'data' con las columnas renombradas. Solo lo usa to_pdf_general."""
+        if self._df is None:
+            import pandas as pd
+            raw_df = pd.DataFrame([dict(row) for row in self.data or []])
+            if self.column_map and not raw_df.empty:
+                cols_a_usar = [col for col in self.column_map.keys() if col in raw_df.columns]
+                self._df = raw_df[cols_a_usar].rename(columns=self.column_map)
             else:
-                self.df = raw_df
+                self._df = raw_df
+        return self._df
+
+    def _filas_renombradas(self):
+        """
+        Recorre las filas como dicts con los nombres de column_map, ordenadas por
+        equipo. Los lotes ya vienen ordenados desde la BD; la lista 'data' se
+        agrupa respetando el orden en que aparece cada equipo.
+        """
+        if self.lotes is not None:
+            filas = itertools.chain.from_iterable(self.lotes)
         else:
-            self.df = pd.DataFrame()
+            filas = self.data or []
+        columnas = None
+        renombradas = []
+        for row in filas:
+            if columnas is None:
+                disponibles = row.keys()
+                columnas = [(col, nombre) for col, nombre in self.column_map.items() if col in disponibles] \
+                    if self.column_map else [(col, col) for col in disponibles]
+            fila = {nombre: row[col] for col, nombre in columnas}
+            if self.lotes is not None:
+                yield fila
+            else:
+                renombradas.append(fila)
+        if self.lotes is None:
+            orden = {}
+            for fila in renombradas:
+                orden.setdefault(fila.get('Equipo'), len(orden))
+            yield from sorted(renombradas, key=lambda fila: orden[fila.get('Equipo')])
+
+    def _escribir_detalle_por_equipo(self, pdf, filas, progreso):
+        """
+        Una pasada sobre las filas: por cada equipo escribe su tabla y al cambiar
+        de equipo su subtotal. Devuelve (resumen por equipo, conduces adjuntos,
+        cantidad de filas); de cada fila solo se guarda lo que piden los anexos.
+        """
+        cols = ['Fecha', 'Conduce', 'Ubicación', 'Horas', 'Monto']
+        # Ajuste: hoja carta -> 215mm ancho, márgenes 15mm -> usable ~185mm
+        col_widths = [30, 28, 60, 20, 47]
+        resumen_equipos = []
+        adjuntos = []
+        cantidad = 0
+
+        for eq, grupo in itertools.groupby(filas, key=lambda fila: fila.get('Equipo', '(Sin equipo)')):
+            nombre_equipo = str(eq if eq is not None else '(Sin equipo)').upper()
+            progreso(f"Detalle: {nombre_equipo}", 10)
+            pdf.set_font('Helvetica', 'B', 11)
+            pdf.cell(0, 7, f"Equipo: {nombre_equipo}", ln=1)
+            pdf.ln(1)
 
-    def to_pdf(self, filepath):
-        if self.df.empty:
-            print("[DEBUG] DataFrame está vacío, no hay datos para exportar.")
+            # Header tabla
+            pdf.set_font('Helvetica', 'B', 10)
+            pdf.set_fill_color(79, 129, 189)
+            pdf.set_text_color(255, 255, 255)
+            for idx, col in enumerate(cols):
+                pdf.cell(col_widths[idx], 8, col, border=1, align='C', fill=True)
+            pdf.ln()
+
+            # Filas
+            pdf.set_font('Helvetica', '', 10)
+            pdf.set_text_color(0, 0, 0)
+            fill = False
+            total_horas = 0.0
+            total_monto = 0.0
+            for row in grupo:
+                cantidad += 1
+                pdf.set_fill_color(245, 245, 245) if fill else pdf.set_fill_color(255, 255, 255)
+                horas = row.get('Horas')
+                monto = row.get('Monto')
+                fila = [
+                    _texto(row.get('Fecha')),
+                    _texto(row.get('Conduce')),
+                    _texto(row.get('Ubicación')),
+                    f"{float(horas or 0):.2f}" if horas is not None else '',
+                    f"{self.currency} {float(monto or 0):,.2f}" if monto is not None else '',
+                ]
+                total_horas += float(horas or 0)
+                total_monto += float(monto or 0)
+                for idx, value in enumerate(fila):
+                    align = 'R' if cols[idx] in ['Horas', 'Monto'] else 'L'
+                    pdf.cell(col_widths[idx], 7, value, border=1, align=align, fill=True)
+                pdf.ln()
+                fill = not fill
+                if row.get('ConduceAdjunto'):
+                    adjuntos.append((row['ConduceAdjunto'], row.get('Conduce', 'N/A'), row.get('Fecha', ''), eq or ''))
+
+            # Total por equipo bien alineado
+            pdf.set_font('Helvetica', 'B', 10)
+            pdf.set_fill_color(220, 230, 241)
+            pdf.cell(col_widths[0] + col_widths[1] + col_widths[2], 8, f"TOTAL {nombre_equipo}", border=1, align='R', fill=True)
+            pdf.cell(col_widths[3], 8, f"{total_horas:.2f}", border=1, align='R', fill=True)
+            pdf.cell(col_widths[4], 8, f"{self.currency} {total_monto:,.2f}", border=1, align='R', fill=True)
+            pdf.ln(10)
+            resumen_equipos.append({'Equipo': nombre_equipo, 'Total Horas': total_horas, 'Total Monto': total_monto})
+
+        return resumen_equipos, adjuntos, cantidad
+
+    def to_pdf(self, filepath, progreso=None):
+        """
+        'progreso(seccion, porcentaje)', si se pasa, se llama al empezar cada
+        sección (ver trabajos_reportes); si lanza una excepción, el reporte se
+        interrumpe sin escribir el archivo.
+        """
+        progreso = progreso or (lambda seccion, porcentaje: None)
+        if self.lotes is None and not self.data:
+            print("[DEBUG] No hay filas para exportar.")
             return False, "No hay datos para exportar."
 
         try:
-            print("[DEBUG] DataFrame columns:", self.df.columns)
-            # Puedes mostrar también algunas filas para revisar
-            print("[DEBUG] Primeras filas del DataFrame:")
-            print(self.df.head())
-
             pdf = FPDF(orientation='P', unit='mm', format='Letter')
             pdf.set_auto_page_break(auto=True, margin=15)
             pdf.add_page()
@@ -89,72 +209,15 @@ class ReportGenerator:
             pdf.cell(0, 8, "Detalle de Servicios Facturados", ln=1)
             pdf.ln(2)
 
-            equipos = self.df['Equipo'].unique() if 'Equipo' in self.df.columns else ['(Sin equipo)']
-            resumen_equipos = []
-            # Ajuste: hoja carta -> 215mm ancho, márgenes 15mm -> usable ~185mm
-            col_widths = [30, 28, 60, 20, 47]  # Fecha, Conduce, Ubicación, Horas, Monto
-
-            for eq in equipos:
-                df_eq = self.df[self.df['Equipo'] == eq] if 'Equipo' in self.df.columns else self.df
-
-                pdf.set_font('Helvetica', 'B', 11)
-                pdf.cell(0, 7, f"Equipo: {str(eq).upper()}", ln=1)
-                pdf.ln(1)
-
-            cols = ['Fecha', 'Conduce', 'Ubicación', 'Horas', 'Monto']
-            col_widths = [30, 28, 60, 20, 47]  # Puedes ajustar estos valores
-
-            for eq in equipos:
-                df_eq = self.df[self.df['Equipo'] == eq] if 'Equipo' in self.df.columns else self.df
-
-                pdf.set_font('Helvetica', 'B', 11)
-                pdf.cell(0, 7, f"Equipo: {str(eq).upper()}", ln=1)
-                pdf.ln(1)
-
-                # Header tabla
-                pdf.set_font('Helvetica', 'B', 10)
-                pdf.set_fill_color(79, 129, 189)
-                pdf.set_text_color(255, 255, 255)
-                for idx, col in enumerate(cols):
-                    pdf.cell(col_widths[idx], 8, col, border=1, align='C', fill=True)
-                pdf.ln()
-
-                # Filas
-                pdf.set_font('Helvetica', '', 10)
-                pdf.set_text_color(0, 0, 0)
-                fill = False
-                total_horas = 0
-                total_monto = 0
-                for _, row in df_eq.iterrows():
-                    pdf.set_fill_color(245, 245, 245) if fill else pdf.set_fill_color(255, 255, 255)
-                    # --- Aquí nos aseguramos de que los campos siempre existan o sean ''
-                    fecha = str(row.get('Fecha', ''))
-                    conduce = str(row.get('Conduce', '')) if pd.notna(row.get('Conduce', '')) else ''
-                    ubicacion = str(row.get('Ubicación', '')) if pd.notna(row.get('Ubicación', '')) else ''
-                    horas = f"{float(row.get('Horas', 0) or 0):.2f}" if pd.notna(row.get('Horas', 0)) else ''
-                    monto = f"{self.currency} {float(row.get('Monto', 0) or 0):,.2f}" if pd.notna(row.get('Monto', 0)) else ''
-
-                    fila = [fecha, conduce, ubicacion, horas, monto]
-                    total_horas += float(row.get('Horas', 0) or 0)
-                    total_monto += float(row.get('Monto', 0) or 0)
-                    for idx, value in enumerate(fila):
-                        align = 'R' if cols[idx] in ['Horas', 'Monto'] else 'L'
-                        pdf.cell(col_widths[idx], 7, value, border=1, align=align, fill=True)
-                    pdf.ln()
-                    fill = not fill
-
-                # Total por equipo bien alineado
-                pdf.set_font('Helvetica', 'B', 10)
-                pdf.set_fill_color(220, 230, 241)
-                pdf.cell(col_widths[0] + col_widths[1] + col_widths[2], 8, f"TOTAL {str(eq).upper()}", border=1, align='R', fill=True)
-                pdf.cell(col_widths[3], 8, f"{total_horas:.2f}", border=1, align='R', fill=True)
-                pdf.cell(col_widths[4], 8, f"{self.currency} {total_monto:,.2f}", border=1, align='R', fill=True)
-                pdf.ln(10)
-                resumen_equipos.append({'Equipo': eq, 'Total Horas': total_horas, 'Total Monto': total_monto})
-
-            # ... resto del método ...
+            progreso("Consultando facturas", 5)
+            resumen_equipos, adjuntos, cantidad = self._escribir_detalle_por_equipo(
+                pdf, self._filas_renombradas(), progreso
+            )
+            if not cantidad:
+                return False, "No hay datos para exportar."
 
             # Resumen General por Equipos
+            progreso("Resumen por equipos", 60)
             pdf.set_font('Helvetica', 'B', 12)
             pdf.cell(0, 9, "Resumen General por Equipos", ln=1)
             pdf.set_font('Helvetica', 'B', 10)
@@ -204,6 +267,7 @@ class ReportGenerator:
 
             # --- Abonos Detallados (identificados) ---
             if self.abonos:
+                progreso("Detalle de abonos", 65)
                 pdf.set_font('Helvetica', 'B', 11)
                 pdf.cell(0, 8, "Detalle de Abonos", ln=1)
                 pdf.set_font('Helvetica', 'B', 10)
@@ -236,42 +300,43 @@ class ReportGenerator:
                 pdf.ln(8)
 
             # --- ANEXOS DE CONDUCES ---
-            print("[DEBUG] Entrando a anexos de conduces")
-            if self.carpeta_conduces and 'ConduceAdjunto' in self.df.columns:
-                adjuntos = self.df[self.df['ConduceAdjunto'].notna() & (self.df['ConduceAdjunto'] != '')]
+            if self.carpeta_conduces and adjuntos:
                 print("[DEBUG] Adjuntos encontrados:", len(adjuntos))
-                if not adjuntos.empty:
-                    print("[DEBUG] Primeros paths adjuntos:", adjuntos['ConduceAdjunto'].head())
-                    pdf.add_page()
-                    pdf.set_font('Helvetica', 'B', 14)
-                    pdf.cell(0, 12, "Anexos: Conduces de Servicios", ln=1)
-                    pdf.ln(2)
-                    for _, row in adjuntos.iterrows():
-                        relative_path = row['ConduceAdjunto']
-                        full_path = os.path.normpath(os.path.join(self.carpeta_conduces, relative_path))
-                        print(f"[DEBUG] Intentando anexar archivo: {full_path} (rel: {relative_path})")
-                        info_conduce = f"Conduce No: {row.get('Conduce', 'N/A')} | Fecha: {row.get('Fecha', '')} | Equipo: {row.get('Equipo', '')}"
-                        pdf.set_font('Helvetica', 'I', 11)
-                        pdf.multi_cell(0, 7, info_conduce)
-                        pdf.ln(1)
-                        if os.path.exists(full_path):
-                            try:
-                                pdf.image(full_path, w=pdf.w - 30)
-                                print(f"[DEBUG] Imagen anexada correctamente: {full_path}")
-                            except Exception as e:
-                                print(f"[DEBUG] Error al anexar imagen: {e}")
-                                pdf.set_font('Helvetica', '', 10)
-                                pdf.cell(0, 6, f"(No se pudo cargar el adjunto: {relative_path})", ln=1)
-                        else:
-                            print(f"[DEBUG] Adjunto no encontrado: {full_path}")
+                pdf.add_page()
+                pdf.set_font('Helvetica', 'B', 14)
+                pdf.cell(0, 12, "Anexos: Conduces de Servicios", ln=1)
+                pdf.ln(2)
+                # Versiones a resolución de impresión, construidas antes (en paralelo) si faltan
+                progreso("Anexos: preparando imágenes", 70)
+                rutas = [os.path.normpath(os.path.join(self.carpeta_conduces, rel)) for rel, *_ in adjuntos]
+                versiones = preparar_conduces(
+                    [ruta for ruta in rutas if os.path.exists(ruta)], procesos=self.procesos_anexos
+                )
+                for numero, (relative_path, conduce, fecha, equipo) in enumerate(adjuntos, 1):
+                    progreso(f"Anexos: conduce {numero} de {len(adjuntos)}", 70 + 25 * numero // len(adjuntos))
+                    full_path = os.path.normpath(os.path.join(self.carpeta_conduces, relative_path))
+                    print(f"[DEBUG] Intentando anexar archivo: {full_path} (rel: {relative_path})")
+                    info_conduce = f"Conduce No: {conduce} | Fecha: {fecha} | Equipo: {equipo}"
+                    pdf.set_font('Helvetica', 'I', 11)
+                    pdf.multi_cell(0, 7, info_conduce)
+                    pdf.ln(1)
+                    if os.path.exists(full_path):
+                        try:
+                            pdf.image(versiones.get(full_path, full_path), w=pdf.w - 30)
+                            print(f"[DEBUG] Imagen anexada correctamente: {full_path}")
+                        except Exception as e:
+                            print(f"[DEBUG] Error al anexar imagen: {e}")
                             pdf.set_font('Helvetica', '', 10)
-                            pdf.cell(0, 6, f"(Adjunto no encontrado: {relative_path})", ln=1)
-                        pdf.add_page()
-            else:
-                print("[DEBUG] No se encontró la columna 'ConduceAdjunto' o carpeta_conduces no está definida.")
+                            pdf.cell(0, 6, f"(No se pudo cargar el adjunto: {relative_path})", ln=1)
+                    else:
+                        print(f"[DEBUG] Adjunto no encontrado: {full_path}")
+                        pdf.set_font('Helvetica', '', 10)
+                        pdf.cell(0, 6, f"(Adjunto no encontrado: {relative_path})", ln=1)
+                    pdf.add_page()
 
+            progreso("Guardando archivo", 97)
             pdf.output(filepath)
-            return True, None
+            return True, filepath
         except Exception as e:
             print(f"[DEBUG] Excepción en to_pdf: {e}")
             return False, str(e)
@@ -282,10 +347,11 @@ class ReportGenerator:
         NUEVA FUNCIÓN: Genera un estado de cuenta general para MÚLTIPLES clientes,
         utilizando tablas para un formato limpio y organizado.
         """
-        if self.df.empty and not self.abonos:
+        if not self.data and not self.abonos:
             return False, "No hay datos para exportar."
 
         try:
+            import pandas as pd
             pdf = PDF(orientation='P', unit='mm', format='Letter')
             pdf.set_header_info(
                 title_main=self.title_main,
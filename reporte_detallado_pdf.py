@@ -9,12 +9,13 @@ from reportlab.lib.enums import TA_RIGHT
 from reportlab.lib import colors
 from openpyxl import Workbook
 from openpyxl.styles import Font, Alignment, PatternFill
-from openpyxl.utils.dataframe import dataframe_to_rows
 from PyQt6.QtWidgets import QFileDialog, QMessageBox
 
 class ReporteDetalladoPDF:
-    def __init__(self, db):
+    def __init__(self, db, cache=None):
         self.db = db
+        # Opcional: cache_reportes.CacheReportes; las peticiones repetidas se copian de ahí
+        self.cache = cache
 
     def exportar(
         self,
@@ -23,7 +24,8 @@ class ReporteDetalladoPDF:
         cliente_nombre,
         moneda_symbol="RD$",
         nombre_archivo=None,
-        ruta_forzada=None
+        ruta_forzada=None,
+        progreso=None
     ):
         """
         Genera el PDF detallado de alquileres.
@@ -33,7 +35,9 @@ class ReporteDetalladoPDF:
         - moneda_symbol: símbolo de la moneda (ej: 'RD$')
         - nombre_archivo: opcional, si se quiere un nombre específico para el PDF
         - ruta_forzada: si se quiere especificar la ruta absoluta del archivo (típico cuando se usa QFileDialog)
+        - progreso: opcional, progreso(seccion, porcentaje) al empezar cada sección (ver trabajos_reportes)
         """
+        progreso = progreso or (lambda seccion, porcentaje: None)
         # 1. Selección de ruta de guardado
         if ruta_forzada:
             ruta_guardar = ruta_forzada
@@ -42,7 +46,17 @@ class ReporteDetalladoPDF:
                 nombre_archivo = f"Reporte_Detallado_{datetime.now().strftime('%Y%m%d_%H%M%S')}.pdf"
             ruta_guardar = nombre_archivo
 
+        if self.cache is not None:
+            return self.cache.obtener_o_generar(
+                self.db, "detallado_pdf", (proyecto_id, filtros, cliente_nombre, moneda_symbol), ruta_guardar,
+                lambda ruta: ReporteDetalladoPDF(self.db).exportar(
+                    proyecto_id, filtros, cliente_nombre, moneda_symbol, ruta_forzada=ruta, progreso=progreso
+                ),
+                progreso=progreso
+            )
+
         # 2. Obtención de datos
+        progreso("Consultando alquileres", 5)
         datos = self.db.obtener_transacciones_por_proyecto(proyecto_id, filtros)
         if not datos:
             return False, "No hay datos para generar el reporte PDF."
@@ -67,7 +81,8 @@ class ReporteDetalladoPDF:
         df['equipo_nombre'] = df['equipo_nombre'].fillna('Sin Equipo')
         equipos = df['equipo_nombre'].unique()
         totales_resumen = []
-        for eq in equipos:
+        for numero, eq in enumerate(equipos):
+            progreso(f"Equipo: {eq.upper()}", 20 + 50 * numero // len(equipos))
             elementos.append(Paragraph(f"Equipo: {eq.upper()}", estilos['h2']))
             df_equipo = df[df['equipo_nombre'] == eq]
             tabla_data = [['Fecha', 'Conduce', 'Horas', 'Cliente/Ubicación', 'Monto']]
@@ -103,6 +118,7 @@ class ReporteDetalladoPDF:
             elementos.append(Spacer(1, 0.2 * inch))
 
         # 5. Resumen general por equipos
+        progreso("Resumen por equipos", 75)
         elementos.append(Paragraph("RESUMEN GENERAL POR EQUIPOS", estilos['h2']))
         resumen_data = [['Equipo', 'Total Horas', 'Total Monto']]
         total_general_horas = 0
@@ -128,6 +144,7 @@ class ReporteDetalladoPDF:
         elementos.append(tabla_resumen)
 
         # 6. Guardar el PDF
+        progreso("Generando el PDF", 85)
         try:
             doc.build(elementos)
             return True, ruta_guardar
@@ -143,12 +160,14 @@ class ReporteDetalladoPDF:
         cliente_nombre,
         moneda_symbol="RD$",
         nombre_archivo=None,
-        ruta_forzada=None
+        ruta_forzada=None,
+        progreso=None
     ):
         """
         Exporta el reporte detallado de alquileres a un archivo Excel, con formato profesional y totales.
         Permite nombre personalizado y ruta forzada como el PDF.
         """
+        progreso = progreso or (lambda seccion, porcentaje: None)
         # 1. Selección de ruta de guardado
         if ruta_forzada:
             ruta_guardar = ruta_forzada
@@ -157,14 +176,16 @@ class ReporteDetalladoPDF:
                 nombre_archivo = f"Reporte_Detallado_{datetime.now().strftime('%Y%m%d_%H%M%S')}.xlsx"
             ruta_guardar = nombre_archivo
 
-        # 2. Obtención de datos
-        datos = self.db.obtener_transacciones_por_proyecto(proyecto_id, filtros)
-        if not datos:
-            return False, "No hay datos que coincidan con los filtros para generar el reporte."
-
-        df = pd.DataFrame([dict(row) for row in datos])
+        if self.cache is not None:
+            return self.cache.obtener_o_generar(
+                self.db, "detallado_excel", (proyecto_id, filtros, cliente_nombre, moneda_symbol), ruta_guardar,
+                lambda ruta: ReporteDetalladoPDF(self.db).exportar_excel(
+                    proyecto_id, filtros, cliente_nombre, moneda_symbol, ruta_forzada=ruta, progreso=progreso
+                ),
+                progreso=progreso
+            )
 
-        # 3. Excel: encabezados, formato y datos
+        # 2. Excel: encabezados, formato y datos
         wb = Workbook()
         ws = wb.active
         ws.title = "Reporte Detallado"
@@ -191,13 +212,28 @@ class ReporteDetalladoPDF:
             "Fecha", "Conduce", "Cliente", "Operador", "Equipo", "Ubicación",
             "Horas", "Precio/Hora", "Monto", "Estado"
         ]
-        df_export = df[columnas_export].copy()
-        df_export['Estado'] = df_export['pagado'].apply(lambda x: 'Pagado' if x else 'Pendiente')
-        df_export = df_export.drop(columns=['pagado'])
-        df_export.columns = columnas_renombradas
+        ws.append(columnas_renombradas)
 
-        for r in dataframe_to_rows(df_export, index=False, header=True):
-            ws.append(r)
+        # 3. Datos: se recorren por lotes desde la BD, sin DataFrame intermedio
+        progreso("Alquileres", 10)
+        filas = 0
+        total_facturado = 0.0
+        total_abonado = 0.0
+        total_horas = 0.0
+        for lote in self.db.iterar_transacciones_por_proyecto(proyecto_id, filtros):
+            progreso(f"Alquileres ({filas} filas)", 10)
+            for row in lote:
+                ws.append([
+                    row[col] for col in columnas_export[:-1]
+                ] + ['Pagado' if row['pagado'] else 'Pendiente'])
+                monto = row['monto'] or 0.0
+                total_facturado += monto
+                if row['pagado'] == 1:
+                    total_abonado += monto
+                total_horas += row['horas'] or 0.0
+                filas += 1
+        if not filas:
+            return False, "No hay datos que coincidan con los filtros para generar el reporte."
 
         header_fill = PatternFill(start_color="4F81BD", end_color="4F81BD", fill_type="solid")
         header_font = Font(bold=True, color="FFFFFF")
@@ -213,10 +249,7 @@ class ReporteDetalladoPDF:
             ws[f'H{row_idx}'].number_format = formato_moneda
             ws[f'I{row_idx}'].number_format = formato_moneda
 
-        total_facturado = df['monto'].sum()
-        total_abonado = df[df['pagado'] == 1]['monto'].sum()
         total_pendiente = total_facturado - total_abonado
-        total_horas = df['horas'].sum()
         fila_inicio_totales = ws.max_row + 2
         ws.cell(row=fila_inicio_totales, column=8, value="Total Facturado:").font = Font(bold=True)
         ws.cell(row=fila_inicio_totales + 1, column=8, value="Total Pagado:").font = Font(bold=True, color="00B050")
@@ -239,6 +272,7 @@ class ReporteDetalladoPDF:
             adjusted_width = (max_length + 2)
             ws.column_dimensions[column_letter].width = adjusted_width
 
+        progreso("Guardando archivo", 90)
         try:
             wb.save(ruta_guardar)
             return True, ruta_guardar
@@ -11,11 +11,23 @@ import pandas as pd
 from datetime import datetime
 
 class ReporteOperadores:
-    def __init__(self, db):
+    def __init__(self, db, cache=None):
         self.db = db
-
-    def exportar_pdf(self, proyecto_id, filtros, ruta_guardar, moneda_symbol='RD$'):
+        # Opcional: cache_reportes.CacheReportes (ver ReporteDetalladoPDF)
+        self.cache = cache
+
+    def exportar_pdf(self, proyecto_id, filtros, ruta_guardar, moneda_symbol='RD$', progreso=None):
+        progreso = progreso or (lambda seccion, porcentaje: None)
+        if self.cache is not None:
+            return self.cache.obtener_o_generar(
+                self.db, "operadores_pdf", (proyecto_id, filtros, moneda_symbol), ruta_guardar,
+                lambda ruta: ReporteOperadores(self.db).exportar_pdf(
+                    proyecto_id, filtros, ruta, moneda_symbol, progreso=progreso
+                ),
+                progreso=progreso
+            )
         # --- 1. Obtener datos ---
+        progreso("Consultando ingresos y pagos", 5)
         ingresos_data = self.db.obtener_transacciones_por_proyecto(proyecto_id, filtros)
         pagos_data = self.db.obtener_pagos_a_operadores(proyecto_id, filtros)
         if not ingresos_data:
@@ -38,6 +50,7 @@ class ReporteOperadores:
         elementos.append(Spacer(1, 0.2 * inch))
 
         # 2. Procesar con pandas
+        progreso("Resumen por operador", 40)
         df = pd.DataFrame([dict(row) for row in ingresos_data])
         if df.empty:
             return False, "No hay datos para generar el reporte PDF."
@@ -67,6 +80,7 @@ class ReporteOperadores:
         )
 
         # Tabla PDF
+        progreso("Tabla de operadores", 60)
         tabla_data = [[
             Paragraph("<b>Operador</b>", estilos['TblCenter']),
             Paragraph("<b>Equipo</b>", estilos['TblCenter']),
@@ -108,6 +122,7 @@ class ReporteOperadores:
         ]))
         elementos.append(tabla)
 
+        progreso("Generando el PDF", 85)
         try:
             doc.build(elementos)
             return True, ruta_guardar
@@ -116,7 +131,17 @@ class ReporteOperadores:
         except Exception as e:
             return False, str(e)
 
-    def exportar_excel(self, proyecto_id, filtros, ruta_guardar, moneda_symbol="RD$"):
+    def exportar_excel(self, proyecto_id, filtros, ruta_guardar, moneda_symbol="RD$", progreso=None):
+        progreso = progreso or (lambda seccion, porcentaje: None)
+        if self.cache is not None:
+            return self.cache.obtener_o_generar(
+                self.db, "operadores_excel", (proyecto_id, filtros, moneda_symbol), ruta_guardar,
+                lambda ruta: ReporteOperadores(self.db).exportar_excel(
+                    proyecto_id, filtros, ruta, moneda_symbol, progreso=progreso
+                ),
+                progreso=progreso
+            )
+        progreso("Consultando ingresos y pagos", 5)
         ingresos_data = self.db.obtener_transacciones_por_proyecto(proyecto_id, filtros)
         pagos_data = self.db.obtener_pagos_a_operadores(proyecto_id, filtros)
         if not ingresos_data:
@@ -144,6 +169,7 @@ class ReporteOperadores:
             lambda row: (row['total_pagado'] / row['total_horas']) if row['total_horas'] > 0 else 0, axis=1
         )
 
+        progreso("Hoja de operadores", 50)
         wb = Workbook()
         ws = wb.active
         ws.title = "Reporte Operadores"
@@ -200,6 +226,7 @@ class ReporteOperadores:
             adjusted_width = (max_length + 2)
             ws.column_dimensions[column_letter].width = adjusted_width
 
+        progreso("Guardando archivo", 90)
         try:
             wb.save(ruta_guardar)
             return True, ruta_guardar
@@ -0,0 +1,164 @@
+"""
+Pruebas de los triggers de saldos (pagos -> monto_pagado/pagado), del abono
+general FIFO, del resumen mensual y de las migraciones, sobre una base
+temporal creada desde cero.
+
+    python -m pytest -q test_saldos_resumen.py
+"""
+import sqlite3
+
+import pytest
+
+import migraciones
+from logic import DatabaseManager
+
+PROYECTO = 1
+CLIENTE = 10
+CUENTA = 1
+
+
+@pytest.fixture
+def db(tmp_path):
+    db = DatabaseManager(str(tmp_path / "prueba.db"))
+    db.asegurar_esquema()
+    db.execute("INSERT OR IGNORE INTO proyectos (id, nombre) VALUES (?, 'Prueba')", (PROYECTO,))
+    db.execute("INSERT OR IGNORE INTO cuentas (id, nombre, tipo_cuenta) VALUES (?, 'Caja', 'Efectivo')", (CUENTA,))
+    yield db
+    db.cerrar()
+
+
+def _factura(db, trans_id, fecha, monto, equipo_id=1, cliente_id=CLIENTE):
+    db.execute("""
+        INSERT INTO transacciones (id, proyecto_id, cuenta_id, equipo_id, tipo, descripcion,
+                                   monto, fecha, cliente_id, horas)
+        VALUES (?, ?, ?, ?, 'Ingreso', 'Alquiler', ?, ?, ?, 8)
+    """, (trans_id, PROYECTO, CUENTA, equipo_id, monto, fecha, cliente_id))
+    db.execute(
+        "INSERT INTO equipos_alquiler_meta (transaccion_id, proyecto_id, cliente_id, horas) VALUES (?, ?, ?, 8)",
+        (trans_id, PROYECTO, cliente_id)
+    )
+
+
+def _pago(db, trans_id, monto, fecha="2024-03-01"):
+    return db.execute(
+        "INSERT INTO pagos (transaccion_id, cuenta_id, fecha, monto) VALUES (?, ?, ?, ?)",
+        (trans_id, CUENTA, fecha, monto)
+    )
+
+
+def _saldo(db, trans_id):
+    fila = db.fetchone("SELECT monto_pagado, pagado FROM transacciones WHERE id = ?", (trans_id,))
+    return fila["monto_pagado"], fila["pagado"]
+
+
+def _resumen(db):
+    # Los triggers dejan en cero (no borran) los meses que se vacían
+    return db.fetchall("""
+        SELECT * FROM resumen_mensual
+        WHERE ingresos <> 0 OR gastos <> 0 OR horas <> 0 OR pendiente <> 0
+        ORDER BY proyecto_id, equipo_id, mes
+    """)
+
+
+def test_triggers_pagos_mantienen_saldo(db):
+    _factura(db, "f1", "2024-01-10", 1000)
+    assert _saldo(db, "f1") == (0, 0)
+
+    p1 = _pago(db, "f1", 400)
+    assert _saldo(db, "f1") == (400, 0)
+    p2 = _pago(db, "f1", 600)
+    assert _saldo(db, "f1") == (1000, 1)
+
+    db.execute("UPDATE pagos SET monto = 500 WHERE id = ?", (p2,))
+    assert _saldo(db, "f1") == (900, 0)
+    db.execute("UPDATE pagos SET monto = 600 WHERE id = ?", (p2,))
+    assert _saldo(db, "f1") == (1000, 1)
+
+    db.execute("DELETE FROM pagos WHERE id = ?", (p1,))
+    assert _saldo(db, "f1") == (600, 0)
+
+
+def test_editar_monto_factura_recalcula_pagado(db):
+    _factura(db, "f1", "2024-01-10", 1000)
+    _pago(db, "f1", 1000)
+    assert _saldo(db, "f1") == (1000, 1)
+
+    db.execute("UPDATE transacciones SET monto = 1500 WHERE id = 'f1'")
+    assert _saldo(db, "f1") == (1000, 0)
+    db.execute("UPDATE transacciones SET monto = 800 WHERE id = 'f1'")
+    assert _saldo(db, "f1") == (1000, 1)
+
+
+def test_abono_general_fifo_con_sobrepago(db):
+    _factura(db, "f_feb", "2024-02-05", 300)
+    _factura(db, "f_ene", "2024-01-15", 500)
+    _factura(db, "f_mar", "2024-03-20", 200)
+    _factura(db, "otro", "2024-01-01", 999, cliente_id=CLIENTE + 1)
+    _pago(db, "f_ene", 100)
+
+    resultado = db.registrar_abono_general_cliente({
+        'proyecto_id': PROYECTO, 'cliente_id': CLIENTE, 'cuenta_id': CUENTA,
+        'fecha': "2024-04-01", 'monto': 1500, 'comentario': "Abono general",
+    })
+
+    assert resultado is True
+    # Se salda de la más antigua a la más reciente; el sobrante no se aplica
+    assert _saldo(db, "f_ene") == (500, 1)
+    assert _saldo(db, "f_feb") == (300, 1)
+    assert _saldo(db, "f_mar") == (200, 1)
+    assert _saldo(db, "otro") == (0, 0)
+    aplicado = db.fetchone("SELECT SUM(monto) AS total FROM pagos WHERE fecha = '2024-04-01'")["total"]
+    assert aplicado == 900
+
+    resultado = db.registrar_abono_general_cliente({
+        'proyecto_id': PROYECTO, 'cliente_id': CLIENTE, 'cuenta_id': CUENTA,
+        'fecha': "2024-04-02", 'monto': 50, 'comentario': "",
+    })
+    assert resultado == "Este cliente no tiene facturas pendientes de pago."
+
+
+def test_resumen_mensual_coincide_con_reconstruccion(db):
+    _factura(db, "f1", "2024-01-10", 1000, equipo_id=1)
+    _factura(db, "f2", "2024-01-25", 700, equipo_id=2)
+    _factura(db, "f3", "2024-02-03", 400, equipo_id=1)
+    db.execute("""
+        INSERT INTO transacciones (id, proyecto_id, cuenta_id, equipo_id, tipo, monto, fecha)
+        VALUES ('g1', ?, ?, 1, 'Gasto', 250, '2024-01-12')
+    """, (PROYECTO, CUENTA))
+    p = _pago(db, "f1", 1000)
+    _pago(db, "f2", 300)
+    db.execute("UPDATE transacciones SET monto = 900, fecha = '2024-02-10' WHERE id = 'f2'")
+    db.execute("UPDATE transacciones SET equipo_id = 2 WHERE id = 'f3'")
+    db.execute("DELETE FROM pagos WHERE id = ?", (p,))
+    db.execute("DELETE FROM transacciones WHERE id = 'g1'")
+
+    mantenido = _resumen(db)
+    db.reconstruir_resumen_mensual()
+    assert mantenido == _resumen(db)
+    assert mantenido
+
+
+def test_esquema_desde_cero_y_reaplicado(tmp_path):
+    ruta = str(tmp_path / "vacia.db")
+    db = DatabaseManager(ruta)
+    try:
+        assert db.fetchone("PRAGMA user_version")["user_version"] == 0
+        aplicadas = db.asegurar_esquema()
+        assert aplicadas == [m.version for m in migraciones.MIGRACIONES]
+        assert db.fetchone("PRAGMA user_version")["user_version"] == migraciones.VERSION_ACTUAL
+
+        esquema = db.fetchall("SELECT type, name, sql FROM sqlite_master ORDER BY type, name")
+        assert db.asegurar_esquema() == []
+        assert db.fetchone("PRAGMA user_version")["user_version"] == migraciones.VERSION_ACTUAL
+        assert db.fetchall("SELECT type, name, sql FROM sqlite_master ORDER BY type, name") == esquema
+    finally:
+        db.cerrar()
+
+    # Otra conexión al mismo archivo tampoco encuentra nada pendiente
+    db = DatabaseManager(ruta)
+    try:
+        assert db.asegurar_esquema() == []
+    finally:
+        db.cerrar()
+    with sqlite3.connect(ruta) as conn:
+        assert conn.execute("PRAGMA user_version").fetchone()[0] == migraciones.VERSION_ACTUAL
@@ -0,0 +1,278 @@
+"""
+Generación de reportes en segundo plano.
+
+Los reportes (PDF/Excel, con anexos de conduces) pueden tardar bastante; en
+lugar de construirlos en el hilo de la interfaz se lanzan como trabajos en un
+QThreadPool propio y la ventana sigue respondiendo:
+
+    self.reportes.lanzar("Estado de cuenta - Cliente X",
+                         lambda progreso: rg.to_pdf(ruta, progreso=progreso))
+
+La función recibe 'progreso(seccion, porcentaje)', que los generadores llaman
+al empezar cada sección, y devuelve (ok, resultado) como ya hacían los métodos
+de exportación. Cancelar es cooperativo: tras pedirlo, la siguiente llamada a
+progreso() lanza TrabajoCancelado y el trabajo termina en esa sección.
+
+Como en carga_async, la función corre en otro hilo: solo consulta la base
+(conexión de lectura propia por hilo) y escribe el archivo; nunca toca widgets.
+PanelReportes muestra los trabajos en curso y los terminados.
+"""
+import itertools
+import logging
+import os
+
+from PyQt6.QtCore import QObject, QRunnable, QThreadPool, QUrl, Qt, pyqtSignal
+from PyQt6.QtGui import QDesktopServices
+from PyQt6.QtWidgets import (
+    QDockWidget, QWidget, QVBoxLayout, QHBoxLayout, QTableWidget, QTableWidgetItem,
+    QHeaderView, QProgressBar, QPushButton, QAbstractItemView
+)
+
+logger = logging.getLogger(__name__)
+
+EN_CURSO = "En curso"
+TERMINADO = "Terminado"
+CANCELADO = "Cancelado"
+ERROR = "Error"
+
+# Reportes simultáneos; el resto espera turno. No se usa el pool global para
+# no quitarle hilos a las cargas de las pestañas.
+MAX_TRABAJOS_SIMULTANEOS = 2
+
+
+class TrabajoCancelado(BaseException):
+    """
+    La lanza progreso() cuando el usuario canceló el trabajo. Deriva de
+    BaseException para atravesar los 'except Exception' de los exportadores,
+    que la tratarían como un error más del reporte.
+    """
+
+
+class _SenalesTrabajo(QObject):
+    progreso = pyqtSignal(str, int)
+    terminado = pyqtSignal(bool, object)
+
+
+class _TareaReporte(QRunnable):
+    def __init__(self, trabajo, funcion, senales):
+        super().__init__()
+        self.trabajo = trabajo
+        self.funcion = funcion
+        self.senales = senales
+
+    def _progreso(self, seccion, porcentaje):
+        if self.trabajo.cancelacion_pedida:
+            raise TrabajoCancelado(seccion)
+        self.senales.progreso.emit(seccion, int(porcentaje))
+
+    def run(self):
+        if self.trabajo.cancelacion_pedida:
+            self.senales.terminado.emit(False, "Cancelado antes de empezar")
+            return
+        try:
+            ok, resultado = self.funcion(self._progreso)
+        except TrabajoCancelado:
+            ok, resultado = False, "Cancelado"
+        except Exception as e:
+            logger.exception("Error generando el reporte '%s'", self.trabajo.titulo)
+            ok, resultado = False, str(e)
+        self.senales.terminado.emit(ok, resultado)
+
+
+class TrabajoReporte(QObject):
+    """Un reporte lanzado: su estado, la última sección y el resultado."""
+    cambiado = pyqtSignal(object)
+
+    def __init__(self, id_trabajo, titulo, parent=None):
+        super().__init__(parent)
+        self.id = id_trabajo
+        self.titulo = titulo
+        self.estado = EN_CURSO
+        self.seccion = "En espera"
+        self.porcentaje = 0
+        self.resultado = None
+        self.cancelacion_pedida = False
+
+    @property
+    def activo(self):
+        return self.estado == EN_CURSO
+
+    def cancelar(self):
+        """Pide cancelar; el trabajo se detiene al empezar su siguiente sección."""
+        if self.activo and not self.cancelacion_pedida:
+            self.cancelacion_pedida = True
+            self.seccion = "Cancelando..."
+            self.cambiado.emit(self)
+
+    def _on_progreso(self, seccion, porcentaje):
+        if self.activo and not self.cancelacion_pedida:
+            self.seccion = seccion
+            self.porcentaje = porcentaje
+            self.cambiado.emit(self)
+
+    def _on_terminado(self, ok, resultado):
+        self.resultado = resultado
+        if self.cancelacion_pedida and not ok:
+            self.estado = CANCELADO
+            self.seccion = "Cancelado por el usuario"
+        elif ok:
+            self.estado = TERMINADO
+            self.seccion = "Listo"
+            self.porcentaje = 100
+        else:
+            self.estado = ERROR
+            self.seccion = str(resultado)
+        self.cambiado.emit(self)
+
+
+class ServicioReportes(QObject):
+    """Lanza trabajos de reporte y avisa ('trabajo_agregado') de cada uno nuevo."""
+    trabajo_agregado = pyqtSignal(object)
+
+    _contador = itertools.count(1)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._pool = QThreadPool(self)
+        self._pool.setMaxThreadCount(MAX_TRABAJOS_SIMULTANEOS)
+        self.trabajos = []
+        # Se guardan las señales hasta que la tarea termine (si no, Python las libera)
+        self._senales = {}
+
+    def lanzar(self, titulo, funcion):
+        """Encola 'funcion(progreso)' -> (ok, resultado); devuelve el TrabajoReporte."""
+        trabajo = TrabajoReporte(next(self._contador), titulo, self)
+        senales = _SenalesTrabajo()
+        senales.progreso.connect(trabajo._on_progreso)
+        senales.terminado.connect(trabajo._on_terminado)
+        trabajo.cambiado.connect(self._on_trabajo_cambiado)
+        self._senales[trabajo.id] = senales
+        self.trabajos.append(trabajo)
+        self.trabajo_agregado.emit(trabajo)
+        self._pool.start(_TareaReporte(trabajo, funcion, senales))
+        return trabajo
+
+    def _on_trabajo_cambiado(self, trabajo):
+        if not trabajo.activo:
+            self._senales.pop(trabajo.id, None)
+
+    def hay_activos(self):
+        return any(trabajo.activo for trabajo in self.trabajos)
+
+    def cancelar_todos(self):
+        for trabajo in self.trabajos:
+            trabajo.cancelar()
+
+    def esperar(self, milisegundos=-1):
+        """Espera a que terminen los trabajos (al cerrar la aplicación)."""
+        return self._pool.waitForDone(milisegundos)
+
+    def quitar_terminados(self):
+        self.trabajos = [trabajo for trabajo in self.trabajos if trabajo.activo]
+
+
+class PanelReportes(QDockWidget):
+    """
+    Panel "Reportes en curso": una fila por trabajo con su sección y progreso.
+    Cancelar detiene el trabajo; en los terminados, doble clic abre el archivo.
+    """
+    COL_REPORTE, COL_ESTADO, COL_PROGRESO = range(3)
+
+    def __init__(self, servicio, parent=None):
+        super().__init__("Reportes en curso", parent)
+        self.servicio = servicio
+        self.setObjectName("panel_reportes")
+        self.setAllowedAreas(Qt.DockWidgetArea.BottomDockWidgetArea | Qt.DockWidgetArea.RightDockWidgetArea)
+
+        contenido = QWidget()
+        layout = QVBoxLayout(contenido)
+        layout.setContentsMargins(4, 4, 4, 4)
+
+        self.tabla = QTableWidget(0, 3)
+        self.tabla.setHorizontalHeaderLabels(["Reporte", "Estado", "Progreso"])
+        self.tabla.setEditTriggers(QAbstractItemView.EditTrigger.NoEditTriggers)
+        self.tabla.setSelectionBehavior(QAbstractItemView.SelectionBehavior.SelectRows)
+        self.tabla.verticalHeader().setVisible(False)
+        header = self.tabla.horizontalHeader()
+        header.setSectionResizeMode(self.COL_REPORTE, QHeaderView.ResizeMode.Stretch)
+        header.setSectionResizeMode(self.COL_ESTADO, QHeaderView.ResizeMode.Stretch)
+        header.setSectionResizeMode(self.COL_PROGRESO, QHeaderView.ResizeMode.ResizeToContents)
+        layout.addWidget(self.tabla)
+
+        botones = QHBoxLayout()
+        self.btn_cancelar = QPushButton("Cancelar")
+        self.btn_abrir = QPushButton("Abrir")
+        self.btn_limpiar = QPushButton("Quitar terminados")
+        botones.addWidget(self.btn_cancelar)
+        botones.addWidget(self.btn_abrir)
+        botones.addStretch()
+        botones.addWidget(self.btn_limpiar)
+        layout.addLayout(botones)
+        self.setWidget(contenido)
+
+        self._filas = {}  # id de trabajo -> TrabajoReporte, en el orden de la tabla
+        self.btn_cancelar.clicked.connect(self._cancelar_seleccionado)
+        self.btn_abrir.clicked.connect(self._abrir_seleccionado)
+        self.btn_limpiar.clicked.connect(self._quitar_terminados)
+        self.tabla.cellDoubleClicked.connect(lambda _fila, _col: self._abrir_seleccionado())
+        self.tabla.itemSelectionChanged.connect(self._actualizar_botones)
+        servicio.trabajo_agregado.connect(self._agregar)
+        self._actualizar_botones()
+
+    def _agregar(self, trabajo):
+        fila = self.tabla.rowCount()
+        self.tabla.insertRow(fila)
+        self.tabla.setItem(fila, self.COL_REPORTE, QTableWidgetItem(trabajo.titulo))
+        self.tabla.setItem(fila, self.COL_ESTADO, QTableWidgetItem())
+        barra = QProgressBar()
+        barra.setRange(0, 100)
+        self.tabla.setCellWidget(fila, self.COL_PROGRESO, barra)
+        self._filas[trabajo.id] = trabajo
+        trabajo.cambiado.connect(self._actualizar)
+        self._actualizar(trabajo)
+        self.tabla.selectRow(fila)
+        self.show()
+
+    def _fila_de(self, trabajo):
+        return list(self._filas).index(trabajo.id)
+
+    def _actualizar(self, trabajo):
+        if trabajo.id not in self._filas:
+            return
+        fila = self._fila_de(trabajo)
+        texto = trabajo.seccion if trabajo.estado == EN_CURSO else f"{trabajo.estado}: {trabajo.seccion}"
+        self.tabla.item(fila, self.COL_ESTADO).setText(texto)
+        self.tabla.item(fila, self.COL_ESTADO).setToolTip(texto)
+        self.tabla.cellWidget(fila, self.COL_PROGRESO).setValue(trabajo.porcentaje)
+        self._actualizar_botones()
+
+    def _seleccionado(self):
+        fila = self.tabla.currentRow()
+        if 0 <= fila < len(self._filas):
+            return list(self._filas.values())[fila]
+        return None
+
+    def _actualizar_botones(self):
+        trabajo = self._seleccionado()
+        self.btn_cancelar.setEnabled(bool(trabajo and trabajo.activo and not trabajo.cancelacion_pedida))
+        self.btn_abrir.setEnabled(bool(trabajo and trabajo.estado == TERMINADO))
+
+    def _cancelar_seleccionado(self):
+        trabajo = self._seleccionado()
+        if trabajo:
+            trabajo.cancelar()
+
+    def _abrir_seleccionado(self):
+        trabajo = self._seleccionado()
+        if trabajo and trabajo.estado == TERMINADO and isinstance(trabajo.resultado, str) \
+                and os.path.exists(trabajo.resultado):
+            QDesktopServices.openUrl(QUrl.fromLocalFile(trabajo.resultado))
+
+    def _quitar_terminados(self):
+        for fila in reversed(range(self.tabla.rowCount())):
+            trabajo = list(self._filas.values())[fila]
+            if not trabajo.activo:
+                self.tabla.removeRow(fila)
+                del self._filas[trabajo.id]
+        self.servicio.quitar_terminados()
+        self._actualizar_botones()
@@ -3,11 +3,12 @@ from datetime import datetime
 
 def limpiar_nombre(nombre):
     """
-    Elimina tildes y caracteres no válidos, 
+    Elimina tildes y caracteres no válidos (también los que no admite un
+    nombre de archivo, como / o :), 
     reemplaza espacios por guiones bajos y pone en mayúsculas.
     """
     nfkd = unicodedata.normalize('NFKD', nombre)
-    solo_ascii = "".join([c for c in nfkd if not unicodedata.combining(c)])
+    solo_ascii = "".join([c for c in nfkd if not unicodedata.combining(c) and c not in '<>:"/\\|?*'])
     return solo_ascii.replace(" ", "_").upper()
 
 def generar_nombre_archivo(cliente_nombre, prefijo="Estado_Cuenta"):
@@ -6,6 +6,7 @@ from PyQt6.QtWidgets import (
 from PyQt6.QtCore import Qt, QDate
 from datetime import datetime, date
 from PyQt6.QtCore import pyqtSignal
+from carga_async import CargadorDatos, IndicadorCarga
 
 class VentanaGestionAbonos(QDialog):
     """
@@ -18,6 +19,7 @@ class VentanaGestionAbonos(QDialog):
         self.proyecto = proyecto  # <--- ES UN sqlite3.Row, acceso con ['id']
         self.setWindowTitle("Gestión de Abonos Registrados")
         self.resize(1050, 650)
+        self.cargador = CargadorDatos(self, nombre="abonos")
         self.clientes_mapa = {}
         self.total_abonos_var = "Monto Total Filtrado: 0.00"
 
@@ -66,6 +68,7 @@ class VentanaGestionAbonos(QDialog):
         self.lbl_total = QLabel(self.total_abonos_var)
         self.lbl_total.setStyleSheet("font-weight:bold;")
         acciones_layout.addWidget(self.lbl_total)
+        acciones_layout.addWidget(IndicadorCarga(self.cargador, parent=self))
 
         btn_nuevo = QPushButton("Registrar Abono")
         btn_editar = QPushButton("Editar Abono")
@@ -89,11 +92,20 @@ class VentanaGestionAbonos(QDialog):
         self.table.itemDoubleClicked.connect(self.abrir_dialogo_editar_abono)
 
         self.cargar_abonos()
-
+        # Abonos registrados, editados o borrados desde aquí o desde otra vista
+        cancelar_aviso = self.db.cambios.suscribir(self._on_cambio_datos, tablas=("pagos",))
+        self.finished.connect(cancelar_aviso)
+        self.destroyed.connect(cancelar_aviso)
+
+    def _on_cambio_datos(self, cambio):
+        """Recarga la lista solo si el cambio cae en el proyecto y las fechas filtradas."""
+        desde = self.fecha_inicio.date().toString("yyyy-MM-dd")
+        hasta = self.fecha_fin.date().toString("yyyy-MM-dd")
+        if cambio.afecta(self.proyecto['id'], desde, hasta):
+            self.cargar_abonos()
 
     def cargar_abonos(self):
         """Carga y muestra los abonos filtrados en la tabla."""
-        self.table.setRowCount(0)
         filtros = {
             'fecha_inicio': self.fecha_inicio.date().toString("yyyy-MM-dd"),
             'fecha_fin': self.fecha_fin.date().toString("yyyy-MM-dd")
@@ -102,7 +114,12 @@ class VentanaGestionAbonos(QDialog):
         if cliente_sel != "Todos":
             filtros['cliente_id'] = self.clientes_mapa[cliente_sel]
 
-        abonos = self.db.obtener_lista_abonos(self.proyecto['id'], filtros)
+        proyecto_id = self.proyecto['id']
+        self.cargador.solicitar(lambda: self.db.obtener_lista_abonos(proyecto_id, filtros),
+                                self._mostrar_abonos, self._error_carga)
+
+    def _mostrar_abonos(self, abonos):
+        self.table.setRowCount(0)
         total = 0.0
         for abono in abonos:
             row = self.table.rowCount()
@@ -119,10 +136,12 @@ class VentanaGestionAbonos(QDialog):
             total += abono['monto']
         self.lbl_total.setText(f"Monto Total Filtrado: {self.proyecto['moneda']} {total:,.2f}")
 
+    def _error_carga(self, mensaje):
+        QMessageBox.warning(self, "Error", f"No se pudieron cargar los abonos:\n{mensaje}")
+
     def abrir_dialogo_nuevo_abono(self):
         dlg = DialogoRegistroAbono(self.db, self.proyecto, parent=self)
-        if dlg.exec():
-            self.cargar_abonos()
+        dlg.exec()  # la lista se recarga con el aviso de db.cambios
 
     def abrir_dialogo_editar_abono(self):
         selected_rows = self.table.selectionModel().selectedRows()
@@ -138,8 +157,7 @@ class VentanaGestionAbonos(QDialog):
             QMessageBox.warning(self, "Error", "No se pudo cargar el abono.")
             return
         dlg = DialogoEditarAbono(self.db, self.proyecto, datos, parent=self)
-        if dlg.exec():
-            self.cargar_abonos()
+        dlg.exec()
 
     def eliminar_abonos(self):
         selected_rows = self.table.selectionModel().selectedRows()
@@ -152,7 +170,6 @@ class VentanaGestionAbonos(QDialog):
         if QMessageBox.question(self, "Confirmar Eliminación", msg, QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No) == QMessageBox.StandardButton.Yes:
             if self.db.eliminar_abono(pago_ids):
                 QMessageBox.information(self, "Éxito", "Abono(s) eliminado(s) correctamente.")
-                self.cargar_abonos()
             else:
                 QMessageBox.warning(self, "Error", "No se pudieron eliminar los abonos.")
 
@@ -247,7 +264,7 @@ class DialogoRegistroAbono(QDialog):
 
         # Facturas pendientes
         self.tree_pendientes = QTableWidget(0, 3)
-        self.tree_pendientes.setHorizontalHeaderLabels(["Fecha", "Descripción", "Monto"])
+        self.tree_pendientes.setHorizontalHeaderLabels(["Fecha", "Descripción", "Saldo"])
         self.tree_pendientes.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Stretch)
         layout.addWidget(QLabel("Facturas Pendientes de Pago"))
         layout.addWidget(self.tree_pendientes)
@@ -283,8 +300,8 @@ class DialogoRegistroAbono(QDialog):
             self.tree_pendientes.insertRow(row)
             self.tree_pendientes.setItem(row, 0, QTableWidgetItem(str(trans['fecha'])))
             self.tree_pendientes.setItem(row, 1, QTableWidgetItem(str(trans['descripcion'])))
-            self.tree_pendientes.setItem(row, 2, QTableWidgetItem(f"{self.proyecto['moneda']} {trans['monto']:,.2f}"))
-            total += trans['monto']
+            self.tree_pendientes.setItem(row, 2, QTableWidgetItem(f"{self.proyecto['moneda']} {trans['saldo']:,.2f}"))
+            total += trans['saldo']
         self.lbl_total_pendiente.setText(f"Total Pendiente: {self.proyecto['moneda']} {total:,.2f}")
 
 
@@ -65,11 +65,6 @@ class VentanaGestionMantenimientos(QDialog):
         self.table_estado.setRowCount(0)
         estado_equipos = self.db.obtener_estado_mantenimiento_equipos(self.proyecto_actual['id'])
 
-        print("=== DEBUG: Equipos recibidos en refrescar_estado_equipos ===")
-        for eq in estado_equipos:
-            print(eq)
-        print("============================================================")
-
         for eq in estado_equipos:
             row = self.table_estado.rowCount()
             self.table_estado.insertRow(row)